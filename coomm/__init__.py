@@ -5,4 +5,6 @@ from coomm.forces import *
 from coomm.frames import *
 from coomm.objects import *
 from coomm.povray import *
+from coomm.recorders import *
+from coomm.scenarios import *
 from coomm import *
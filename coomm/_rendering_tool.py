@@ -4,10 +4,10 @@ Processing scripts for the rendering
 
 import os, shutil
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 @njit(cache=True)
-def process_position(position, offset, rotation):
+def process_position(position, offset, rotation, scale=1.0):
     blocksize = position.shape[1]
     output_position = np.zeros((3, blocksize))
     for n in range(blocksize):
@@ -16,6 +16,7 @@ def process_position(position, offset, rotation):
                 output_position[i, n] += (
                     rotation[i, j] * (position[j, n] - offset[j])
                 )
+            output_position[i, n] *= scale
     return output_position
 
 @njit(cache=True)
@@ -31,9 +32,233 @@ def process_director(director, rotation):
                     )
     return output_director
 
-def check_folder(folder_name):
+@njit(cache=True)
+def decimation_indices(points, tolerance):
+    """decimation_indices.
+    Ramer-Douglas-Peucker decimation of a polyline: the kept points are
+    dense where the polyline bends and sparse where it is straight, and
+    every dropped point is within tolerance of the segment between the
+    kept points around it.
+
+    Parameters
+    ----------
+    points :
+        shape (dim, n_points), e.g. positions stacked with radii.
+    tolerance : float
+
+    Returns
+    -------
+    indices :
+        Increasing indices of the kept points, including both ends.
+    """
+    n_points = points.shape[1]
+    keep = np.zeros(n_points, dtype=np.bool_)
+    keep[0] = True
+    keep[n_points-1] = True
+    stack = [(0, n_points-1)]
+    while len(stack) > 0:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[:, end] - points[:, start]
+        segment_length_square = np.sum(segment * segment)
+        max_distance = -1.0
+        max_index = start
+        for n in range(start+1, end):
+            offset = points[:, n] - points[:, start]
+            ratio = 0.0
+            if segment_length_square > 0:
+                ratio = min(max(
+                    np.sum(offset * segment) / segment_length_square, 0.0
+                ), 1.0)
+            distance = np.sqrt(np.sum((offset - ratio * segment)**2))
+            if distance > max_distance:
+                max_distance = distance
+                max_index = n
+        if max_distance > tolerance:
+            keep[max_index] = True
+            stack.append((start, max_index))
+            stack.append((max_index, end))
+    return np.nonzero(keep)[0]
+
+@njit(cache=True)
+def profile_decimation_indices(values, tolerance):
+    """profile_decimation_indices.
+    Ramer-Douglas-Peucker decimation of a profile sampled at consecutive
+    indices (e.g. a muscle activation along the arm): every dropped sample
+    is within tolerance of the linear interpolation between the kept
+    samples around it.
+
+    Parameters
+    ----------
+    values :
+        shape (n_points,)
+    tolerance : float
+
+    Returns
+    -------
+    indices :
+        Increasing indices of the kept samples, including both ends.
+    """
+    n_points = values.shape[0]
+    keep = np.zeros(n_points, dtype=np.bool_)
+    keep[0] = True
+    keep[n_points-1] = True
+    stack = [(0, n_points-1)]
+    while len(stack) > 0:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        slope = (values[end] - values[start]) / (end - start)
+        max_distance = -1.0
+        max_index = start
+        for n in range(start+1, end):
+            distance = abs(values[n] - values[start] - slope * (n - start))
+            if distance > max_distance:
+                max_distance = distance
+                max_index = n
+        if max_distance > tolerance:
+            keep[max_index] = True
+            stack.append((start, max_index))
+            stack.append((max_index, end))
+    return np.nonzero(keep)[0]
+
+def lod_profile_indices(values, tolerance):
+    """lod_profile_indices.
+    Indices of the samples of a profile kept at the level of detail given
+    by tolerance, all of them if tolerance is None.
+
+    Parameters
+    ----------
+    values :
+        shape (n_points,)
+    tolerance : Union[float, None]
+    """
+    if tolerance is None:
+        return np.arange(values.shape[0])
+    return profile_decimation_indices(
+        np.ascontiguousarray(values, dtype=np.float64), tolerance
+    )
+
+def lod_indices(points, tolerance, min_points=2):
+    """lod_indices.
+    Indices of the points kept at the level of detail given by tolerance,
+    all of them if tolerance is None.
+
+    Parameters
+    ----------
+    points :
+        shape (dim, n_points)
+    tolerance : Union[float, None]
+    min_points : int
+        Minimum number of kept points, e.g. 4 for a b-spline, filled in
+        evenly when the decimation keeps fewer.
+    """
+    n_points = points.shape[1]
+    if tolerance is None:
+        return np.arange(n_points)
+    indices = decimation_indices(
+        np.ascontiguousarray(points, dtype=np.float64), tolerance
+    )
+    if indices.shape[0] < min(min_points, n_points):
+        indices = np.union1d(
+            indices,
+            np.round(np.linspace(0, n_points-1, min_points)).astype(np.int64)
+        )
+    return indices
+
+@njit(cache=True, parallel=True)
+def process_position_trajectory_kernel(
+    position, offset, rotation, scale, output_position
+):
+    n_frames, _, blocksize = position.shape
+    for t in prange(n_frames):
+        for n in range(blocksize):
+            for i in range(3):
+                value = 0.0
+                for j in range(3):
+                    value += rotation[i, j] * (position[t, j, n] - offset[j])
+                output_position[t, i, n] = value * scale
+
+@njit(cache=True, parallel=True)
+def process_director_trajectory_kernel(director, rotation, output_director):
+    n_frames = director.shape[0]
+    blocksize = director.shape[3]
+    for t in prange(n_frames):
+        for n in range(blocksize):
+            for i in range(3):
+                for j in range(3):
+                    value = 0.0
+                    for k in range(3):
+                        value += rotation[i, k] * director[t, k, j, n]
+                    output_director[t, i, j, n] = value
+
+def process_position_trajectory(
+    position, offset, rotation, scale=1.0, output_position=None
+):
+    """process_position_trajectory.
+    process_position of every frame of a trajectory, with the scaling (e.g.
+    by the inverse reference length) fused in, frames in parallel.
+
+    Parameters
+    ----------
+    position :
+        shape (n_frames, 3, n)
+    offset :
+        shape (3,)
+    rotation :
+        shape (3, 3)
+    scale : float
+    output_position :
+        Preallocated output of shape (n_frames, 3, n), allocated if None.
+
+    Returns
+    -------
+    output_position :
+        scale * rotation @ (position - offset) for every frame.
+    """
+    position = np.asarray(position, dtype=np.float64)
+    if output_position is None:
+        output_position = np.empty(position.shape)
+    process_position_trajectory_kernel(
+        position, np.asarray(offset, dtype=np.float64),
+        np.asarray(rotation, dtype=np.float64), float(scale),
+        output_position
+    )
+    return output_position
+
+def process_director_trajectory(director, rotation, output_director=None):
+    """process_director_trajectory.
+    process_director of every frame of a trajectory, frames in parallel.
+
+    Parameters
+    ----------
+    director :
+        shape (n_frames, 3, 3, n)
+    rotation :
+        shape (3, 3)
+    output_director :
+        Preallocated output of shape (n_frames, 3, 3, n), allocated if None.
+
+    Returns
+    -------
+    output_director :
+        rotation @ director for every frame.
+    """
+    director = np.asarray(director, dtype=np.float64)
+    if output_director is None:
+        output_director = np.empty(director.shape)
+    process_director_trajectory_kernel(
+        director, np.asarray(rotation, dtype=np.float64), output_director
+    )
+    return output_director
+
+def check_folder(folder_name, clean=True):
     if not (folder_name is None):
         if os.path.exists(folder_name):
+            if not clean:
+                # keep the files, e.g. to resume an interrupted run
+                return
             print('Clean up files in: {}/'.format(folder_name))
             shutil.rmtree(folder_name)
         print('Create the directory: {}/'.format(folder_name))
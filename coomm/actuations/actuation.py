@@ -13,6 +13,7 @@ from elastica.external_forces import inplace_addition
 from elastica.external_forces import NoForces
 
 from coomm._rod_tool import _lab_to_material, _material_to_lab, average2D
+from coomm.recorders import record, AdaptiveRecording
 
 @njit(cache=True)
 def _internal_to_external_load(
@@ -73,7 +74,8 @@ class ApplyActuations(NoForces):
     """ApplyActuations"""
 
     def __init__(
-        self, actuations, step_skip: int, callback_params_list: list | None = None
+        self, actuations, step_skip: int, callback_params_list: list | None = None,
+        recording_policy: AdaptiveRecording | None = None
     ):
         """
         TODO : need documentation on how to initialize
@@ -83,11 +85,15 @@ class ApplyActuations(NoForces):
         actuations :
         step_skip : int
         callback_params_list : Dictionary[list], Optional
+        recording_policy : AdaptiveRecording, Optional
+            Record when the activation or load of the actuations changed
+            instead of every step_skip steps.
         """
         self.current_step = 0
         self.actuations = actuations
         self.every = step_skip
         self.callback_params_list = callback_params_list
+        self.recording_policy = recording_policy
 
     def apply_torques(self, system, time: np.float64 = 0.0):
         """apply_torques.
@@ -107,12 +113,24 @@ class ApplyActuations(NoForces):
             )
 
         if self.callback_params_list is not None:
-            self.make_callback()
+            self.make_callback(time)
 
-    def make_callback(self):
+    def make_callback(self, time: np.float64 = 0.0):
         """make_callback.
+
+        Parameters
+        ----------
+        time : np.float64
         """
-        if self.current_step % self.every == 0:
+        if self.recording_policy is None:
+            record_now = self.current_step % self.every == 0
+        else:
+            record_now = self.recording_policy(
+                self.current_step, *self.actuations
+            )
+        if record_now:
+            for callback_params in self.callback_params_list:
+                record(callback_params, 'time', time)
             self.callback_func(
                 self.actuations,
                 self.callback_params_list
@@ -130,15 +148,7 @@ class ApplyActuations(NoForces):
         for actuation, callback_params in zip(
             actuations, callback_params_list
         ):
-            callback_params['internal_force'].append(
-                actuation.internal_force.copy()
-            )
-            callback_params['internal_couple'].append(
-                actuation.internal_couple.copy()
-            )
-            callback_params['external_force'].append(
-                actuation.external_forces.copy()
-            )
-            callback_params['external_couple'].append(
-                actuation.external_couple.copy()
-            )
+            record(callback_params, 'internal_force', actuation.internal_force)
+            record(callback_params, 'internal_couple', actuation.internal_couple)
+            record(callback_params, 'external_force', actuation.external_forces)
+            record(callback_params, 'external_couple', actuation.external_couple)
@@ -4,7 +4,6 @@ Muscle base class implementation.
 
 from typing import Union, Iterable, Dict
 
-from collections import defaultdict
 import numpy as np
 from numba import njit
 
@@ -13,6 +12,7 @@ from elastica._linalg import _batch_cross
 from elastica._calculus import quadrature_kernel
 from elastica.external_forces import inplace_addition
 from coomm._rod_tool import average2D, difference2D, sigma_to_shear
+from coomm.recorders import record, new_callback_params, AdaptiveRecording
 
 from coomm.actuations.actuation import (
     _force_induced_couple,
@@ -178,11 +178,13 @@ class Muscle(MuscleInfo, ContinuousActuation):
     def calculate_muscle_tangent(muscle_tangent, muscle_strain):
         blocksize = muscle_strain.shape[1]
         for i in range(blocksize):
-            muscle_tangent[:, i] = muscle_strain[:, i] / np.sqrt(
+            muscle_strain_norm = np.sqrt(
                 muscle_strain[0, i] ** 2
                 + muscle_strain[1, i] ** 2
                 + muscle_strain[2, i] ** 2
             )
+            for j in range(3):
+                muscle_tangent[j, i] = muscle_strain[j, i] / muscle_strain_norm
 
     @staticmethod
     @njit(cache=True)
@@ -437,7 +439,8 @@ class ApplyMuscles(ApplyActuations):
     """ApplyMuscles."""
 
     def __init__(
-        self, muscles: Iterable[Muscle], step_skip: int, callback_params_list: list
+        self, muscles: Iterable[Muscle], step_skip: int, callback_params_list: list,
+        recording_policy: AdaptiveRecording = None
     ):
         """__init__.
 
@@ -446,8 +449,11 @@ class ApplyMuscles(ApplyActuations):
         muscles : Iterable[Muscle]
         step_skip : int
         callback_params_list : list
+        recording_policy : AdaptiveRecording, Optional
         """
-        super().__init__(muscles, step_skip, callback_params_list)
+        super().__init__(
+            muscles, step_skip, callback_params_list, recording_policy
+        )
         for m, muscle in enumerate(muscles):
             muscle.index = m
 
@@ -462,28 +468,31 @@ class ApplyMuscles(ApplyActuations):
         callback_params_list : Iterable[Dict]
         """
         for muscle, callback_params in zip(muscles, callback_params_list):
-            callback_params["muscle_info"].append(str(muscle))
-            callback_params["s_activation"].append(muscle.s_activation.copy())
-            callback_params["activation"].append(muscle.activation.copy())
-            callback_params["muscle_length"].append(muscle.muscle_length.copy())
-            callback_params["muscle_normalized_length"].append(
-                muscle.muscle_normalized_length.copy()
+            record(callback_params, "muscle_info", str(muscle))
+            record(callback_params, "s_activation", muscle.s_activation)
+            record(callback_params, "activation", muscle.activation)
+            record(callback_params, "muscle_length", muscle.muscle_length)
+            record(
+                callback_params, "muscle_normalized_length",
+                muscle.muscle_normalized_length
             )
-            callback_params["force_length_weight"].append(
-                muscle.force_length_weight(muscle.muscle_normalized_length).copy()
+            record(
+                callback_params, "force_length_weight",
+                muscle.force_length_weight(muscle.muscle_normalized_length)
             )
-            callback_params["muscle_position"].append(muscle.muscle_position.copy())
-            callback_params["internal_force"].append(muscle.internal_force.copy())
-            callback_params["internal_couple"].append(muscle.internal_couple.copy())
-            callback_params["external_force"].append(muscle.external_force.copy())
-            callback_params["external_couple"].append(muscle.external_couple.copy())
+            record(callback_params, "muscle_position", muscle.muscle_position)
+            record(callback_params, "internal_force", muscle.internal_force)
+            record(callback_params, "internal_couple", muscle.internal_couple)
+            record(callback_params, "external_force", muscle.external_force)
+            record(callback_params, "external_couple", muscle.external_couple)
 
 
 class ApplyMuscleGroups(ApplyMuscles):
     """ApplyMuscleGroups."""
 
     def __init__(
-        self, muscle_groups: MuscleGroup, step_skip: int, callback_params_list: list
+        self, muscle_groups: MuscleGroup, step_skip: int, callback_params_list: list,
+        recording_policy: AdaptiveRecording = None
     ):
         """__init__.
 
@@ -492,13 +501,17 @@ class ApplyMuscleGroups(ApplyMuscles):
         muscle_groups : MuscleGroup
         step_skip : int
         callback_params_list : list
+        recording_policy : AdaptiveRecording, Optional
         """
-        super().__init__(muscle_groups, step_skip, callback_params_list)
+        super().__init__(
+            muscle_groups, step_skip, callback_params_list, recording_policy
+        )
         for muscle_group, callback_params in zip(
             muscle_groups, self.callback_params_list
         ):
             callback_params["muscles"] = [
-                defaultdict(list) for _ in muscle_group.muscles
+                new_callback_params(callback_params, "muscles/{}".format(m))
+                for m in range(len(muscle_group.muscles))
             ]
 
     def callback_func(
@@ -512,16 +525,16 @@ class ApplyMuscleGroups(ApplyMuscles):
         callback_params_list : Iterable[Dict]
         """
         for muscle_group, callback_params in zip(muscle_groups, callback_params_list):
-            callback_params["muscle_group_info"].append(str(muscle_group))
-            callback_params["s_activation"].append(muscle_group.s_activation.copy())
-            callback_params["activation"].append(muscle_group.activation.copy())
-            callback_params["internal_force"].append(muscle_group.internal_force.copy())
-            callback_params["internal_couple"].append(
-                muscle_group.internal_couple.copy()
+            record(callback_params, "muscle_group_info", str(muscle_group))
+            record(callback_params, "s_activation", muscle_group.s_activation)
+            record(callback_params, "activation", muscle_group.activation)
+            record(callback_params, "internal_force", muscle_group.internal_force)
+            record(
+                callback_params, "internal_couple", muscle_group.internal_couple
             )
-            callback_params["external_force"].append(muscle_group.external_force.copy())
-            callback_params["external_couple"].append(
-                muscle_group.external_couple.copy()
+            record(callback_params, "external_force", muscle_group.external_force)
+            record(
+                callback_params, "external_couple", muscle_group.external_couple
             )
             ApplyMuscles.callback_func(
                 self, muscle_group.muscles, callback_params["muscles"]
@@ -2,6 +2,8 @@ __doc__ = """
 Forward Backward algorithm module.
 """
 
+import time
+from collections import deque
 from tqdm import tqdm
 import numpy as np
 
@@ -24,6 +26,15 @@ class ForwardBackward(Algorithm):
         self.stepsize = self.config.get('stepsize', 1e-8)
         self.iteration = 0
         self.done = False
+        # durations of the recent updates, measured by run and step_budget
+        # or given by the iteration_time config, whose maximum estimates the
+        # duration of the next update
+        self.iteration_times = deque(maxlen=16)
+        self.iteration_time = self.config.get('iteration_time', None)
+        if self.iteration_time is not None:
+            self.iteration_times.append(self.iteration_time)
+        # duration of the last refresh
+        self.refresh_time = 0.0
 
         self.objects = kwargs.get('objects', kwargs.get('object', None))
 
@@ -36,23 +47,108 @@ class ForwardBackward(Algorithm):
         """
         return iteration+1
 
-    def run(self, max_iter_number=100_000, **kwargs):
+    def run(self, max_iter_number=100_000, progress=True, **kwargs):
         """run.
 
         Parameters
         ----------
         max_iter_number :
+        progress : bool
+            Whether to show a progress bar.
         kwargs :
         """
         print("Running the algorithm with objects:", self.objects)
-        for _ in tqdm(range(max_iter_number)):
-            self.iteration = self.update(self.iteration)
+        for _ in tqdm(range(max_iter_number), disable=not progress):
+            self.timed_update()
             if self.done:
                 print("Finishing the algorithm at iternation", self.iteration)
                 break
         print("Finishing the algorithm at maximum iternation", self.iteration)
         return
 
+    def timed_update(self,):
+        """timed_update.
+        Update and record its duration.
+        """
+        update_start_time = time.perf_counter()
+        self.iteration = self.update(self.iteration)
+        self.iteration_times.append(time.perf_counter() - update_start_time)
+        self.iteration_time = max(self.iteration_times)
+
+    def refresh(self,):
+        """refresh.
+        Prepare an incremental solve after the objects changed, see
+        step_budget.
+        """
+        pass
+
+    def step_budget(self, n_iterations=None, time_budget=None):
+        """step_budget.
+        Incremental solve for tracking moving objects, e.g. once per control
+        tick. The solve is warm-started from the current state of the
+        algorithm and stops after n_iterations updates, when no further
+        update fits in time_budget, or when the algorithm converged.
+
+        Parameters
+        ----------
+        n_iterations : int
+            Maximum number of updates, None for no limit.
+        time_budget : float
+            Wall time in seconds the solve is allowed to take, None for no
+            limit. The refresh of the objects and every update are only
+            started if their expected duration still fits in the remaining
+            time, so a call may do no update. The duration of an update is
+            estimated by the longest of the recent updates, which requires a
+            run or the iteration_time config beforehand. A call fitting no
+            update forgets the longest duration, so that a single slow update
+            (e.g. compilation) does not block all later calls.
+
+        Returns
+        -------
+        n_updates : int
+            Number of updates done.
+        """
+        if n_iterations is None and time_budget is None:
+            raise ValueError("step_budget needs n_iterations or time_budget")
+        if time_budget is not None and self.iteration_time is None:
+            raise ValueError(
+                "step_budget with a time_budget needs an estimate of the "
+                "duration of an update, run the algorithm first or set "
+                "iteration_time in algo_config"
+            )
+        start_time = time.perf_counter()
+        if time_budget is not None and (
+            self.refresh_time + self.iteration_time > time_budget
+        ):
+            self.forget_iteration_time()
+            return 0
+        self.done = False
+        self.refresh()
+        self.refresh_time = time.perf_counter() - start_time
+        n_updates = 0
+        while n_iterations is None or n_updates < n_iterations:
+            if (
+                time_budget is not None and
+                time.perf_counter() - start_time + self.iteration_time
+                > time_budget
+            ):
+                break
+            self.timed_update()
+            n_updates += 1
+            if self.done:
+                break
+        if n_updates == 0:
+            self.forget_iteration_time()
+        return n_updates
+
+    def forget_iteration_time(self,):
+        """forget_iteration_time.
+        Drop the longest recorded update duration, keeping at least one.
+        """
+        if len(self.iteration_times) > 1:
+            self.iteration_times.remove(max(self.iteration_times))
+            self.iteration_time = max(self.iteration_times)
+
 class Costate:
     """Costate.
     """
@@ -37,6 +37,25 @@ class ForwardBackwardMuscle(ForwardBackward):
         """
         ForwardBackward.__init__(self, rod, algo_config, **kwargs)
         self.activation_diff_tolerance = self.config['activation_diff_tolerance']
+
+        # Armijo backtracking on the total cost instead of the fixed stepsize
+        self.line_search = self.config.get('line_search', False)
+        self.armijo_coefficient = self.config.get('armijo_coefficient', 1e-4)
+        self.backtracking_factor = self.config.get('backtracking_factor', 0.5)
+        self.stepsize_growth = self.config.get('stepsize_growth', 2.0)
+        self.min_stepsize = self.config.get('min_stepsize', self.stepsize)
+        self.max_stepsize = self.config.get('max_stepsize', 1.0)
+        # with the line search, the equilibrium is solved from the rest
+        # configuration until the strains change less than the tolerance
+        self.equilibrium_tolerance = self.config.get(
+            'equilibrium_tolerance', 1e-10
+        )
+        self.max_equilibrium_iterations = self.config.get(
+            'max_equilibrium_iterations', 100
+        )
+        # total cost of the current activations, None when the forward path
+        # has to be (re)computed
+        self.cost = None
         self.muscles = muscles
         self.s_activations = []
         self.activations = []
@@ -68,6 +87,100 @@ class ForwardBackwardMuscle(ForwardBackward):
         """
         self.save_to_prev_activations(self.activations)
 
+        # the last trial of the line search already computed the forward path
+        # of the current activations
+        if self.cost is None:
+            self.cost = self.forward()
+
+        # backward path
+        self.discrete_cost_gradient_condition()
+        self.continuous_cost_gradient_condition()
+
+        self.costate_backward_evolution(
+            self.static_rod.rest_lengths, 
+            self.static_rod.director_collection, 
+            self.static_rod.sigma,
+            self.costate.internal_force_discrete_jump,
+            self.costate.internal_couple_discrete_jump,
+            self.costate.internal_force_derivative,
+            self.costate.internal_couple_derivative,
+            self.costate.internal_force, self.costate.internal_couple
+        )
+        
+        # update activations
+        if self.line_search:
+            self.cost = self.backtracking_line_search(
+                self.find_target_activations()
+            )
+        else:
+            self.update_activations(
+                self.find_target_activations()
+            )
+            self.cost = None
+
+        # check if the updated activations are similar with previous ones
+        self.done = self.check_activations_difference()
+
+        return ForwardBackward.update(self, iteration)
+
+    def run(self, max_iter_number=100_000, **kwargs):
+        """run.
+
+        Parameters
+        ----------
+        max_iter_number :
+        kwargs :
+        """
+        # the objects or activations may have changed since the last run
+        self.cost = None
+        return ForwardBackward.run(self, max_iter_number, **kwargs)
+
+    def forward(self,):
+        """forward.
+        Find the equilibrium of the current muscle activations and update
+        the cost and cost gradient of the objects.
+
+        Without the line search, a single equilibrium step is taken from the
+        equilibrium of the previous activations. With the line search, the
+        equilibrium is solved from the rest configuration to the
+        equilibrium_tolerance, so that the compared costs only depend on the
+        activations.
+
+        Returns
+        -------
+        cost : float
+            Total cost of the current activations.
+        """
+        if not self.line_search:
+            self.equilibrium_step()
+            return self.evaluate_objects()
+
+        self.reset_static_rod()
+        for _ in range(self.max_equilibrium_iterations):
+            prev_sigma = self.static_rod.sigma.copy()
+            prev_kappa = self.static_rod.kappa.copy()
+            self.equilibrium_step()
+            strain_difference = max(
+                np.abs(self.static_rod.sigma - prev_sigma).max(),
+                np.abs(self.static_rod.kappa - prev_kappa).max()
+            )
+            if strain_difference < self.equilibrium_tolerance:
+                break
+        return self.evaluate_objects()
+
+    def reset_static_rod(self,):
+        """reset_static_rod.
+        Bring the static rod back to its rest configuration.
+        """
+        self.static_rod.update_from_strain(
+            self.static_rod.rest_sigma, self.static_rod.rest_kappa
+        )
+
+    def equilibrium_step(self,):
+        """equilibrium_step.
+        Equilibrium strains of the current muscle activations, linearized
+        about the current configuration of the static rod.
+        """
         # find the equlibrium for the current muscle activations
         self.find_equilibrium_strain(
             self.static_rod.sigma, self.static_rod.kappa,
@@ -81,37 +194,89 @@ class ForwardBackwardMuscle(ForwardBackward):
             self.static_rod.sigma, self.static_rod.kappa
         )
 
+    def evaluate_objects(self,):
+        """evaluate_objects.
+        Update the cost and cost gradient of the objects for the current
+        equilibrium.
+
+        Returns
+        -------
+        cost : float
+            Total cost of the current activations.
+        """
         # update cost-related terms in objects
         self.objects(
             position=self.static_rod.position_collection,
             director=self.static_rod.director_collection,
             radius=self.static_rod.radius
         )
+        return self.calculate_total_cost()
 
-        # backward path
-        self.discrete_cost_gradient_condition()
-        self.continuous_cost_gradient_condition()
+    def refresh(self,):
+        """refresh.
+        The equilibrium of the current activations is kept, only the
+        objects, which may have moved, are evaluated again.
+        """
+        if self.cost is not None:
+            self.cost = self.evaluate_objects()
 
-        self.costate_backward_evolution(
-            self.static_rod.rest_lengths, 
-            self.static_rod.director_collection, 
-            self.static_rod.sigma,
-            self.costate.internal_force_discrete_jump,
-            self.costate.internal_couple_discrete_jump,
-            self.costate.internal_force_derivative,
-            self.costate.internal_couple_derivative,
-            self.costate.internal_force, self.costate.internal_couple
-        )
-        
-        # update activations
-        self.update_activations(
-            self.find_target_activations()
-        )
+    def calculate_total_cost(self,):
+        """calculate_total_cost.
+        Cost of the objects plus the quadratic cost of the activations,
+        whose gradient (activation - target_activation) drives the update.
+        """
+        lengths = self.static_rod.lengths
+        activation_cost = 0
+        for activation in self.activations:
+            activation_cost += 0.5 * np.sum(activation**2 * lengths)
+        return self.objects.cost.total(lengths) + activation_cost
+
+    def backtracking_line_search(self, target_activations):
+        """backtracking_line_search.
+        Start from the accepted stepsize of the previous iteration times
+        stepsize_growth and backtrack until the Armijo condition holds for
+        the projected step. If it does not hold down to min_stepsize, the
+        previous activations are restored, which stops the algorithm.
 
-        # check if the updated activations are similar with previous ones
-        self.done = self.check_activations_difference()
+        Parameters
+        ----------
+        target_activations :
 
-        return ForwardBackward.update(self, iteration)
+        Returns
+        -------
+        cost : float
+            Total cost of the accepted activations, whose forward path is
+            the last one computed.
+        """
+        lengths = self.static_rod.lengths.copy()
+        stepsize = min(self.stepsize * self.stepsize_growth, self.max_stepsize)
+        while True:
+            decrease = 0
+            for activation, prev_activation, target_activation in zip(
+                self.activations, self.prev_activations, target_activations
+            ):
+                activation[:] = np.clip(
+                    prev_activation + stepsize * (target_activation - prev_activation),
+                    0, 1
+                )
+                decrease += np.sum(
+                    (target_activation - prev_activation) *
+                    (activation - prev_activation) * lengths
+                )
+            cost = self.forward()
+            if cost <= self.cost - self.armijo_coefficient * decrease:
+                break
+            if stepsize <= self.min_stepsize:
+                # no step decreases the cost, keep the previous activations
+                for activation, prev_activation in zip(
+                    self.activations, self.prev_activations
+                ):
+                    activation[:] = prev_activation
+                cost = self.forward()
+                break
+            stepsize = max(stepsize * self.backtracking_factor, self.min_stepsize)
+        self.stepsize = stepsize
+        return cost
 
     def calculate_total_muscle_forces_couples(self):
         """calculate_total_muscle_forces_couples.
@@ -6,87 +6,120 @@ from collections import defaultdict
 
 from elastica.callback_functions import CallBackBaseClass
 
+from coomm.recorders import Recorder, AdaptiveRecording, record, to_arrays
+
 class BasicCallBackBaseClass(CallBackBaseClass):
-    def __init__(self, step_skip: int, callback_params: dict):
+    def __init__(
+        self, step_skip: int, callback_params: dict,
+        recording_policy: AdaptiveRecording = None
+    ):
         CallBackBaseClass.__init__(self)
         self.every = step_skip
         self.callback_params = callback_params
+        self.recording_policy = recording_policy
 
     def make_callback(self, system, time, current_step: int):
-        if current_step % self.every == 0:
+        if self.recording_policy is None:
+            record_now = current_step % self.every == 0
+        else:
+            # record when the system changed, see AdaptiveRecording
+            record_now = self.recording_policy(current_step, system)
+        if record_now:
             self.save_params(system, time)
     
     def save_params(self, system, time):
         return NotImplementedError
 
 class RodCallBack(BasicCallBackBaseClass):
-    def __init__(self, step_skip: int, callback_params: dict):
-        BasicCallBackBaseClass.__init__(self, step_skip, callback_params)
+    def __init__(
+        self, step_skip: int, callback_params: dict,
+        recording_policy: AdaptiveRecording = None
+    ):
+        BasicCallBackBaseClass.__init__(
+            self, step_skip, callback_params, recording_policy
+        )
 
     def save_params(self, system, time):
-        self.callback_params["time"].append(time)
-        self.callback_params["radius"].append(system.radius.copy())
-        self.callback_params["dilatation"].append(system.dilatation.copy())
-        self.callback_params["voronoi_dilatation"].append(system.voronoi_dilatation.copy())
-        self.callback_params["position"].append(system.position_collection.copy())
-        self.callback_params["director"].append(system.director_collection.copy())
-        self.callback_params["velocity"].append(system.velocity_collection.copy())
-        self.callback_params["omega"].append(system.omega_collection.copy())
-        self.callback_params["sigma"].append(system.sigma.copy())
-        self.callback_params["kappa"].append(system.kappa.copy())
+        record(self.callback_params, "time", time)
+        record(self.callback_params, "radius", system.radius)
+        record(self.callback_params, "dilatation", system.dilatation)
+        record(self.callback_params, "voronoi_dilatation", system.voronoi_dilatation)
+        record(self.callback_params, "position", system.position_collection)
+        record(self.callback_params, "director", system.director_collection)
+        record(self.callback_params, "velocity", system.velocity_collection)
+        record(self.callback_params, "omega", system.omega_collection)
+        record(self.callback_params, "sigma", system.sigma)
+        record(self.callback_params, "kappa", system.kappa)
 
 class ExternalLoadCallBack(BasicCallBackBaseClass):
-    def __init__(self, step_skip: int, callback_params: dict):
-        BasicCallBackBaseClass.__init__(self, step_skip, callback_params)
+    def __init__(
+        self, step_skip: int, callback_params: dict,
+        recording_policy: AdaptiveRecording = None
+    ):
+        BasicCallBackBaseClass.__init__(
+            self, step_skip, callback_params, recording_policy
+        )
 
     def save_params(self, system, time):
-        self.callback_params["time"].append(time)
-        self.callback_params['external_force'].append(system.external_forces.copy())
-        self.callback_params['external_couple'].append(system.external_torques.copy())
+        record(self.callback_params, "time", time)
+        record(self.callback_params, 'external_force', system.external_forces)
+        record(self.callback_params, 'external_couple', system.external_torques)
 
 class CylinderCallBack(BasicCallBackBaseClass):
-    def __init__(self, step_skip: int, callback_params: dict):
-        BasicCallBackBaseClass.__init__(self, step_skip, callback_params)
+    def __init__(
+        self, step_skip: int, callback_params: dict,
+        recording_policy: AdaptiveRecording = None
+    ):
+        BasicCallBackBaseClass.__init__(
+            self, step_skip, callback_params, recording_policy
+        )
 
     def save_params(self, system, time):
-        self.callback_params["time"].append(time)
-        self.callback_params["radius"].append(system.radius)
-        self.callback_params["height"].append(system.length)
-        self.callback_params["position"].append(system.position_collection.copy())
-        self.callback_params['director'].append(system.director_collection.copy())
+        record(self.callback_params, "time", time)
+        record(self.callback_params, "radius", system.radius)
+        record(self.callback_params, "height", system.length)
+        record(self.callback_params, "position", system.position_collection)
+        record(self.callback_params, 'director', system.director_collection)
 
 class SphereCallBack(BasicCallBackBaseClass):
-    def __init__(self, step_skip: int, callback_params: dict):
-        BasicCallBackBaseClass.__init__(self, step_skip, callback_params)
+    def __init__(
+        self, step_skip: int, callback_params: dict,
+        recording_policy: AdaptiveRecording = None
+    ):
+        BasicCallBackBaseClass.__init__(
+            self, step_skip, callback_params, recording_policy
+        )
 
     def save_params(self, system, time):
-        self.callback_params["time"].append(time)
-        self.callback_params["radius"].append(system.radius)
-        self.callback_params["position"].append(system.position_collection.copy())
-        self.callback_params["director"].append(system.director_collection.copy())
+        record(self.callback_params, "time", time)
+        record(self.callback_params, "radius", system.radius)
+        record(self.callback_params, "position", system.position_collection)
+        record(self.callback_params, "director", system.director_collection)
 
 class AlgorithmCallBack(BasicCallBackBaseClass):
-    def __init__(self, step_skip: int):
-        callback_params = defaultdict(list)
+    def __init__(self, step_skip: int, n_records: int = None):
+        callback_params = (
+            defaultdict(list) if n_records is None else Recorder(n_records)
+        )
         BasicCallBackBaseClass.__init__(self, step_skip, callback_params)
 
     def save_params(self, system, time):
-        self.callback_params["time"].append(time)
-        self.callback_params["radius"].append(system.static_rod.radius.copy())
-        self.callback_params["dilatation"].append(system.static_rod.dilatation.copy())
-        self.callback_params["voronoi_dilatation"].append(system.static_rod.voronoi_dilatation.copy())
-        self.callback_params["position"].append(system.static_rod.position_collection.copy())
-        self.callback_params["director"].append(system.static_rod.director_collection.copy())
-        self.callback_params["sigma"].append(system.static_rod.sigma.copy())
-        self.callback_params["kappa"].append(system.static_rod.kappa.copy())
+        record(self.callback_params, "time", time)
+        record(self.callback_params, "radius", system.static_rod.radius)
+        record(self.callback_params, "dilatation", system.static_rod.dilatation)
+        record(self.callback_params, "voronoi_dilatation", system.static_rod.voronoi_dilatation)
+        record(self.callback_params, "position", system.static_rod.position_collection)
+        record(self.callback_params, "director", system.static_rod.director_collection)
+        record(self.callback_params, "sigma", system.static_rod.sigma)
+        record(self.callback_params, "kappa", system.static_rod.kappa)
 
 class AlgorithmMuscleCallBack(AlgorithmCallBack):
-    def __init__(self, step_skip: int):
-        AlgorithmCallBack.__init__(self, step_skip)
+    def __init__(self, step_skip: int, n_records: int = None):
+        AlgorithmCallBack.__init__(self, step_skip, n_records)
 
     def save_params(self, system, time):
         AlgorithmCallBack.save_params(self, system, time)
-        self.callback_params["activations"].append(system.activations.copy())
+        record(self.callback_params, "activations", system.activations)
 
 class OthersCallBack:
     def __init__(self, step_skip: int, callback_params: dict):
@@ -100,10 +133,10 @@ class OthersCallBack:
         self.current_step += 1
 
     def callback_func(self, time, **kwargs):
-        self.callback_params['time'].append(time)
+        record(self.callback_params, 'time', time)
         for key, value in kwargs.items():
             # make sure value is a numpy array
-            self.callback_params[key].append(value.copy())
+            record(self.callback_params, key, value)
 
     def save_data(self, **kwargs):
 
@@ -113,7 +146,7 @@ class OthersCallBack:
 
         with open("simulation_others.pickle", "wb") as others_file:
             data = dict(
-                time_series_data=self.callback_params,
+                time_series_data=to_arrays(self.callback_params),
                 **kwargs
             )
             pickle.dump(data, others_file)
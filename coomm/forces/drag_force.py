@@ -11,6 +11,7 @@ from elastica.external_forces import inplace_addition
 from elastica.external_forces import NoForces
 
 from coomm._rod_tool import _lab_to_material, _material_to_lab, average2D
+from coomm.recorders import record, AdaptiveRecording
 
 
 class DragForce(NoForces):
@@ -19,7 +20,8 @@ class DragForce(NoForces):
 
     def __init__(self, rho_environment,
         c_per, c_tan, system,
-        step_skip: int, callback_params: dict
+        step_skip: int, callback_params: dict,
+        recording_policy: AdaptiveRecording = None
     ):
         """__init__.
 
@@ -31,6 +33,9 @@ class DragForce(NoForces):
         system :
         step_skip : int
         callback_params : dict
+        recording_policy : AdaptiveRecording, Optional
+            Record when the velocity of the system changed instead of every
+            step_skip steps. The time of the records is then stored as well.
         """
 
         self.rho_environment = rho_environment
@@ -47,6 +52,7 @@ class DragForce(NoForces):
         self.step = 0
         self.every = step_skip
         self.callback_params = callback_params
+        self.recording_policy = recording_policy
     
     def apply_torques(self, system, time: np.float64 = 0.0):
         """apply_torques.
@@ -65,23 +71,34 @@ class DragForce(NoForces):
             self.drag_force_material_frame, self.drag_force,
         )
         inplace_addition(system.external_forces, self.drag_force)
-        self.callback()
+        self.callback(system, time)
 
-    def callback(self):
+    def callback(self, system=None, time: np.float64 = 0.0):
         """callback.
+
+        Parameters
+        ----------
+        system :
+        time : np.float64
         """
-        if self.step % self.every == 0:
+        if self.recording_policy is None:
+            if self.step % self.every == 0:
+                self.callback_func()
+        elif self.recording_policy(self.step, system):
+            record(self.callback_params, 'time', time)
             self.callback_func()
         self.step += 1
 
     def callback_func(self):
         """callback_func.
         """
-        self.callback_params['velocity_material_frame'].append(
-            self.velocity_material_frame.copy()
+        record(
+            self.callback_params, 'velocity_material_frame',
+            self.velocity_material_frame
         )
-        self.callback_params['drag_froce_material_frame'].append(
-            self.drag_force_material_frame.copy()
+        record(
+            self.callback_params, 'drag_froce_material_frame',
+            self.drag_force_material_frame
         )
 
     @staticmethod
@@ -7,3 +7,4 @@ from .frame import *
 from .rod_frame import *
 from .muscle_frame import *
 from .rigidbody_frame import *
+from .render import *
@@ -2,17 +2,129 @@ __doc__ = """
 Frame base class
 """
 
-import os
+import subprocess
+from contextlib import contextmanager
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import gridspec
 
 from coomm._rendering_tool import check_folder
 
+class MovieWriter:
+    """MovieWriter.
+    Pipe the rendered canvas of every frame into an ffmpeg process encoding
+    the movie, without writing image files.
+    """
+
+    def __init__(self, frame_rate, movie_name, ffmpeg="ffmpeg"):
+        """__init__.
+
+        Parameters
+        ----------
+        frame_rate :
+        movie_name :
+            Name of the movie, without the .mov extension.
+        ffmpeg : str
+            ffmpeg executable.
+        """
+        self.frame_rate = frame_rate
+        self.movie_name = movie_name
+        self.ffmpeg = ffmpeg
+        self.process = None
+        self.frame_shape = None
+        self.closed = False
+
+    def start(self, width, height):
+        """start.
+
+        Parameters
+        ----------
+        width :
+        height :
+        """
+        cmd = [
+            self.ffmpeg, "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba",
+            "-s", "{}x{}".format(width, height),
+            "-r", str(self.frame_rate),
+            "-i", "-",
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-b:v", "90M", "-c:v", "libx264", "-pix_fmt", "yuv420p",
+            "-f", "mov", "-y", self.movie_name + ".mov"
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, fig):
+        """write.
+
+        Parameters
+        ----------
+        fig :
+            Figure to be rendered as the next frame of the movie.
+        """
+        if self.closed:
+            raise RuntimeError(
+                "the movie {} is already closed".format(self.movie_name + ".mov")
+            )
+        fig.canvas.draw()
+        frame = np.asarray(fig.canvas.buffer_rgba())
+        if self.process is None:
+            self.frame_shape = frame.shape
+            self.start(width=frame.shape[1], height=frame.shape[0])
+        elif frame.shape != self.frame_shape:
+            raise ValueError(
+                "frame size {} differs from the movie size {}".format(
+                    frame.shape[1::-1], self.frame_shape[1::-1]
+                )
+            )
+        try:
+            self.process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            # ffmpeg exited before the movie is complete, no frame can be
+            # written anymore
+            returncode = self.close(check=False)
+            raise RuntimeError(
+                "ffmpeg stopped reading frames (exit status {}) while "
+                "writing {}".format(returncode, self.movie_name + ".mov")
+            )
+
+    def close(self, check=True):
+        """close.
+        Finish the movie and check the exit status of ffmpeg. Frames can not
+        be written after the writer is closed.
+
+        Parameters
+        ----------
+        check : bool
+            Raise if ffmpeg exited with an error.
+
+        Returns
+        -------
+        returncode : Union[int, None]
+            Exit status of ffmpeg, None if no frame was written.
+        """
+        self.closed = True
+        if self.process is None:
+            return None
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        self.process = None
+        if check and returncode != 0:
+            raise RuntimeError(
+                "ffmpeg exited with status {} while writing {}".format(
+                    returncode, self.movie_name + ".mov"
+                )
+            )
+        return returncode
+
 class FrameBase:
     """FrameBase.
     """
 
-    def __init__(self, file_dict, fig_dict, gs_dict):
+    def __init__(self, file_dict, fig_dict, gs_dict, persistent_artists=False):
         """__init__.
 
         Parameters
@@ -20,6 +132,12 @@ class FrameBase:
         file_dict :
         fig_dict :
         gs_dict :
+        persistent_artists : bool
+            Keep the figure and its axes between frames. The axes are built
+            once and the lines and fills of the frame helpers (plot_line,
+            fill_between) are updated with the new data of every frame, while
+            other artists drawn on the axes are removed by reset. Axes limits
+            are not rescaled to the updated data and should be set.
         """
         self.figure_name = file_dict["figure_name"]
         self.folder_name = file_dict.get("folder_name", None)
@@ -28,6 +146,8 @@ class FrameBase:
         self.gs_dict = gs_dict
         self.fig = None
         self.gs = None
+        self.persistent_artists = persistent_artists
+        self.movie_writer = None
 
         if file_dict.get("check_folder_flag", True):
             check_folder(self.folder_name)
@@ -42,6 +162,68 @@ class FrameBase:
                 figure=self.fig,
                 **self.gs_dict
             )
+        elif self.persistent_artists:
+            self.clear_frame_artists()
+
+    def is_built(self, axes):
+        """is_built.
+        Whether axes (an ax, or a list or dict of them) are already on the
+        current figure, in which case a persistent frame keeps them.
+
+        Parameters
+        ----------
+        axes :
+        """
+        while isinstance(axes, (list, dict)):
+            if len(axes) == 0:
+                return False
+            axes = (
+                next(iter(axes.values())) if isinstance(axes, dict)
+                else axes[0]
+            )
+        return (
+            self.persistent_artists and axes is not None
+            and axes.figure is self.fig
+        )
+
+    def keep_axes(self,):
+        """keep_axes.
+        Mark the artists currently on the axes of the figure (e.g. spines,
+        arrows, reference configurations) as static. To be called once the
+        axes are built.
+        """
+        if not self.persistent_artists:
+            return
+        for ax in self.fig.axes:
+            ax.static_artists = set(ax.get_children())
+            ax.frame_artists = []
+            ax.frame_artist_index = 0
+
+    def clear_frame_artists(self,):
+        """clear_frame_artists.
+        Remove the artists drawn in the previous frame other than the ones
+        kept to be updated.
+        """
+        for ax in self.fig.axes:
+            if not hasattr(ax, "static_artists"):
+                continue
+            kept_artists = set(ax.frame_artists)
+            for artist in ax.get_children():
+                if not (
+                    artist in ax.static_artists or artist in kept_artists
+                ):
+                    artist.remove()
+            ax.frame_artist_index = 0
+
+    def hide_unused_artists(self,):
+        """hide_unused_artists.
+        Hide the kept artists that were not updated in the current frame.
+        """
+        for ax in self.fig.axes:
+            if not hasattr(ax, "frame_artists"):
+                continue
+            for artist in ax.frame_artists[ax.frame_artist_index:]:
+                artist.set_visible(False)
 
     def show(self,):
         """show.
@@ -56,7 +238,12 @@ class FrameBase:
         show :
         frame_count :
         """
-        if self.folder_name is None:
+        if self.persistent_artists:
+            self.hide_unused_artists()
+        if self.movie_writer is not None:
+            self.movie_writer.write(self.fig)
+            self.frame_count += 1
+        elif self.folder_name is None:
             self.fig.savefig(self.figure_name)
         else:
             frame_count = (
@@ -69,11 +256,41 @@ class FrameBase:
             self.frame_count += 1
         if show:
             self.show()
-        else:
+        if not self.persistent_artists:
+            self.close()
+
+    def close(self,):
+        """close.
+        """
+        if self.fig is not None:
             plt.close(self.fig)
         self.fig = None
         self.gs = None
 
+    @contextmanager
+    def stream_movie(self, frame_rate, movie_name, ffmpeg="ffmpeg"):
+        """stream_movie.
+        Within the context, save streams the frames into the movie instead
+        of writing image files. The frames have to be saved in order.
+
+        Parameters
+        ----------
+        frame_rate :
+        movie_name :
+        ffmpeg :
+        """
+        print("Creating movie:", movie_name+".mov")
+        self.movie_writer = MovieWriter(frame_rate, movie_name, ffmpeg)
+        try:
+            yield self.movie_writer
+        except BaseException:
+            # stop ffmpeg without hiding the error raised within the context
+            movie_writer, self.movie_writer = self.movie_writer, None
+            movie_writer.close(check=False)
+            raise
+        movie_writer, self.movie_writer = self.movie_writer, None
+        movie_writer.close()
+
     def movie(self, frame_rate, movie_name, start_number=0):
         """movie.
 
@@ -91,7 +308,13 @@ class FrameBase:
         cmd += " -i " + self.folder_name + "/" + figure_name
         cmd += " -b:v 90M -c:v libx264 -pix_fmt yuv420p -f mov"
         cmd += " -y " + movie_name + ".mov"
-        os.system(cmd)
+        returncode = subprocess.run(cmd, shell=True).returncode
+        if returncode != 0:
+            raise RuntimeError(
+                "ffmpeg exited with status {} while writing {}".format(
+                    returncode, movie_name + ".mov"
+                )
+            )
 
 # TODO: What is this??
 # -vf "pad=ceil(iw/2)*2:ceil(ih/2)*2"
@@ -3,6 +3,8 @@ Frame tool implementations
 """
 import numpy as np
 import matplotlib.colors as mcolors
+from matplotlib.lines import Line2D
+from matplotlib.collections import PolyCollection
 
 # TODO: maybe combine default plotting parameters?
 default_colors = mcolors.TABLEAU_COLORS
@@ -211,3 +213,96 @@ def add_y_ticks(ax, yticks, ticks_xpos, length, linewidth, color='black'):
             linewidth=linewidth,
             color=color
         )
+
+def frame_artist(ax, artist_type):
+    """frame_artist.
+    Take the next artist drawn on ax in the previous frame, when the axes are
+    kept between frames (see FrameBase persistent_artists).
+
+    Parameters
+    ----------
+    ax :
+    artist_type :
+
+    Returns
+    -------
+    index : int
+        Position of the artist among the artists of the frame, None when ax
+        is not kept.
+    artist :
+        Artist to be updated, None when a new one has to be drawn.
+    """
+    if not hasattr(ax, "frame_artists"):
+        return None, None
+    index = ax.frame_artist_index
+    ax.frame_artist_index += 1
+    if index >= len(ax.frame_artists):
+        return index, None
+    artist = ax.frame_artists[index]
+    if not isinstance(artist, artist_type):
+        artist.remove()
+        return index, None
+    artist.set_visible(True)
+    return index, artist
+
+def keep_frame_artist(ax, index, artist):
+    """keep_frame_artist.
+
+    Parameters
+    ----------
+    ax :
+    index :
+    artist :
+    """
+    if index is None:
+        return artist
+    if index < len(ax.frame_artists):
+        ax.frame_artists[index] = artist
+    else:
+        ax.frame_artists.append(artist)
+    return artist
+
+def plot_line(ax, *data, **kwargs):
+    """plot_line.
+    Same as ax.plot for a single line, but updates the line of the previous
+    frame instead of drawing a new one when the axes are kept.
+
+    Parameters
+    ----------
+    ax :
+    data :
+        x, y (and z for 3d axes) of the line.
+    """
+    index, line = frame_artist(ax, Line2D)
+    if line is None:
+        line, = ax.plot(*data, **kwargs)
+        return keep_frame_artist(ax, index, line)
+    line.set_data(data[0], data[1])
+    if len(data) == 3:
+        line.set_3d_properties(data[2])
+    line.set(**kwargs)
+    return line
+
+def fill_between(ax, x, y, **kwargs):
+    """fill_between.
+    Same as ax.fill_between(x, y), but updates the vertices of the polygon of
+    the previous frame instead of drawing a new one when the axes are kept.
+
+    Parameters
+    ----------
+    ax :
+    x :
+    y :
+    """
+    index, polygon = frame_artist(ax, PolyCollection)
+    if polygon is None:
+        polygon = ax.fill_between(x, y, **kwargs)
+        return keep_frame_artist(ax, index, polygon)
+    polygon.set_verts([
+        np.column_stack([
+            np.concatenate([x, x[::-1]]),
+            np.concatenate([y, np.zeros_like(y)])
+        ])
+    ])
+    polygon.set(**kwargs)
+    return polygon
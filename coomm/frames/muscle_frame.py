@@ -14,7 +14,9 @@ from coomm.frames.frame_tools import (
     change_box_to_arrow_axes,
     change_box_to_only_x_line_ax,
     change_box_to_only_y_arrow_ax,
-    add_y_ticks
+    add_y_ticks,
+    plot_line,
+    fill_between,
 )
 
 from coomm._rendering_tool import (
@@ -52,7 +54,8 @@ class MuscleFrameBase(FrameBase):
             self,
             file_dict=file_dict,
             fig_dict=fig_dict,
-            gs_dict=gs_dict
+            gs_dict=gs_dict,
+            persistent_artists=kwargs.get("persistent_artists", False)
         )
 
         self.fontsize = kwargs.get("fontsize", default_label_fontsize)
@@ -64,6 +67,7 @@ class MuscleFrameBase(FrameBase):
             n_elems=kwargs.get("n_elems", 100)
         )
 
+        self.ax_muscles = None
         self.ax_muscles_info = kwargs["ax_muscles_info"]
 
     def set_n_elems(self, n_elems):
@@ -101,6 +105,7 @@ class MuscleFrameBase(FrameBase):
         ax.get_xaxis().set_visible(False)
         ax.get_yaxis().set_visible(False)
         self.ax_muscles = ax
+        self.keep_axes()
         return self.ax_muscles
 
     def reset(self, axes_muscle_info=None):
@@ -112,6 +117,8 @@ class MuscleFrameBase(FrameBase):
         """
         FrameBase.reset(self,)
         if axes_muscle_info is None:
+            if self.is_built(self.ax_muscles):
+                return self.ax_muscles
             return self.ax_muscles_reset()
 
         axes_muscle = []
@@ -215,6 +222,7 @@ class MuscleFrameBase(FrameBase):
             ax.set_position(bbox)
             axes_muscle.append(ax)
 
+        self.keep_axes()
         return dict(
             muscle=axes_muscle,
             activation=axes_muscle_activation,
@@ -234,14 +242,14 @@ class MuscleFrameBase(FrameBase):
         """
         alpha = kwargs.get("alpha", 1)
         if kwargs.get('fill', True):
-            ax.fill_between(
-                s, activation,
+            fill_between(
+                ax, s, activation,
                 color=kwargs["color"],
                 alpha=alpha,
             )
         else:
-            ax.plot(
-                s, activation,
+            plot_line(
+                ax, s, activation,
                 color=kwargs["color"],
                 alpha=alpha,
             )
@@ -249,16 +257,16 @@ class MuscleFrameBase(FrameBase):
 
     @classmethod
     def plot_muscle_length(cls, ax, s, muscle_length, **kwargs):
-        ax.plot(
-            s, muscle_length,
+        plot_line(
+            ax, s, muscle_length,
             color=kwargs.get("color", muscle_length_color)
         )
         return ax
 
     @classmethod
     def plot_force_weight(cls, ax, s, force_weight, **kwargs):
-        ax.plot(
-            s, force_weight,
+        plot_line(
+            ax, s, force_weight,
             color=kwargs.get("color", muscle_force_weight_color)
         )
         return ax
@@ -285,11 +293,15 @@ class TransverseMuscleFrame(MuscleFrameBase):
             **kwargs
         )
 
+        self.axes_TM = None
         self.axes_TM_info = kwargs["axes_TM_info"]
     
     def reset(self,):
         """reset.
         """
+        FrameBase.reset(self,)
+        if self.is_built(self.axes_TM):
+            return
         self.axes_TM = MuscleFrameBase.reset(self, self.axes_TM_info)
 
 class LongitudinalMuscleFrame(MuscleFrameBase):
@@ -313,11 +325,15 @@ class LongitudinalMuscleFrame(MuscleFrameBase):
             **kwargs
         )
 
+        self.axes_LM = None
         self.axes_LM_info = kwargs["axes_LM_info"]
     
     def reset(self,):
         """reset.
         """
+        FrameBase.reset(self,)
+        if self.is_built(self.axes_LM):
+            return
         self.axes_LM = MuscleFrameBase.reset(self, self.axes_LM_info)
 
 class ObliqueMuscleFrame(MuscleFrameBase):
@@ -333,6 +349,7 @@ class ObliqueMuscleFrame(MuscleFrameBase):
             **kwargs
         )
 
+        self.axes_OM = None
         self.axes_OM_info = kwargs["axes_OM_info"]
     
     def reset(self,):
@@ -344,4 +361,7 @@ class ObliqueMuscleFrame(MuscleFrameBase):
         fig_dict :
         gs_dict :
         """
+        FrameBase.reset(self,)
+        if self.is_built(self.axes_OM):
+            return
         self.axes_OM = MuscleFrameBase.reset(self, self.axes_OM_info)
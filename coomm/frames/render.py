@@ -0,0 +1,65 @@
+__doc__ = """
+Parallel rendering of frames.
+
+The frame indices are split across a process pool. Every worker calls
+`setup` once to build its own frame (figure) and load the data, then calls
+`render` for each of its frame indices. `render` saves frame k with
+`frame.save(frame_count=k)`, so the numbered files are the same as the ones
+of a serial run and can be turned into a movie with `FrameBase.movie`.
+"""
+__all__ = ['render_frames']
+
+import multiprocessing
+from functools import partial
+
+worker_state = None
+
+def initialize_worker(setup):
+    global worker_state
+    import matplotlib
+    matplotlib.use("Agg")
+    worker_state = setup()
+
+def render_frame(render, k):
+    render(worker_state, k)
+    return k
+
+def render_frames(setup, render, frame_indices, n_workers=None, chunksize=1):
+    """render_frames.
+
+    Parameters
+    ----------
+    setup :
+        Picklable callable without arguments (e.g. a module level function
+        or a functools.partial of one) returning the state of a worker,
+        e.g. the frame and the recorded data. The frame should not clean up
+        the frame folder, which is the job of the calling process.
+    render :
+        Picklable callable render(state, k) plotting and saving frame k.
+    frame_indices :
+        Indices of the frames to be rendered.
+    n_workers : int
+        Number of processes, None for the number of CPUs and 1 to render in
+        the calling process.
+    chunksize : int
+        Number of frames sent to a worker at once.
+
+    Yields
+    ------
+    k : int
+        Index of every rendered frame, in order of completion.
+    """
+    frame_indices = list(frame_indices)
+    if n_workers == 1:
+        state = setup()
+        for k in frame_indices:
+            render(state, k)
+            yield k
+        return
+
+    with multiprocessing.Pool(
+        n_workers, initializer=initialize_worker, initargs=(setup,)
+    ) as pool:
+        yield from pool.imap_unordered(
+            partial(render_frame, render), frame_indices, chunksize
+        )
@@ -36,9 +36,11 @@ class RigidbodyFrame(FrameBase):
             self,
             file_dict=file_dict,
             fig_dict=fig_dict,
-            gs_dict=gs_dict
+            gs_dict=gs_dict,
+            persistent_artists=kwargs.get("persistent_artists", False)
         )
         
+        self.ax_main = None
         self.ax_main_info = kwargs["ax_main_info"]
         self.ax_main_indices = self.ax_main_info["indices"]
         self.ax_main_3d_flag = not self.ax_main_info.get("planner_flag", True)
@@ -67,6 +69,8 @@ class RigidbodyFrame(FrameBase):
         """reset.
         """
         FrameBase.reset(self,)
+        if self.is_built(self.ax_main):
+            return
         
         if self.ax_main_3d_flag:
             self.ax_main = self.fig.add_subplot(
@@ -83,6 +87,7 @@ class RigidbodyFrame(FrameBase):
                     self.ax_main_indices[1]
                 ]
             )
+        self.keep_axes()
 
     def plot_rigidybody2d(self, position, director, radius, color=None):
         """plot_rigidybody2d.
@@ -10,9 +10,11 @@ from coomm.frames.frame import FrameBase
 from coomm.frames.frame_tools import (
     base_colors, 
     default_label_fontsize,
+    plot_line,
 )
 from coomm._rendering_tool import (
-    process_position, process_director
+    process_position, process_director, lod_indices,
+    process_position_trajectory, process_director_trajectory
 )
 
 # TODO: Maybe combine into class
@@ -36,9 +38,11 @@ class RodFrame(FrameBase):
             self,
             file_dict=file_dict,
             fig_dict=fig_dict,
-            gs_dict=gs_dict
+            gs_dict=gs_dict,
+            persistent_artists=kwargs.get("persistent_artists", False)
         )
         
+        self.ax_main = None
         self.ax_main_info = kwargs["ax_main_info"]
         self.ax_main_indices = self.ax_main_info["indices"]
         self.ax_main_3d_flag = not self.ax_main_info.get("planner_flag", True)
@@ -50,8 +54,12 @@ class RodFrame(FrameBase):
         self.rod_color = kwargs.get("rod_color", rod_color)
         self.offset = kwargs.get("offset", np.zeros(3))
         self.rotation = kwargs.get("rotation", np.identity(3))
+        # level of detail: None to plot every element, otherwise the error
+        # (relative to the reference length) allowed when dropping elements
+        self.lod_tolerance = kwargs.get("lod_tolerance", None)
         self.reference_total_length = 1
         self.reference_configuration_flag = False
+        self.trajectory = None
         RodFrame.set_n_elems(self, kwargs.get("n_elems", 100))
 
     def set_n_elems(self, n_elems):
@@ -68,6 +76,8 @@ class RodFrame(FrameBase):
         """reset.
         """
         FrameBase.reset(self,)
+        if self.is_built(self.ax_main):
+            return
         
         if self.ax_main_3d_flag:
             self.ax_main = self.fig.add_subplot(
@@ -87,6 +97,7 @@ class RodFrame(FrameBase):
         
         if self.reference_configuration_flag:
             RodFrame.plot_ref_configuration(self)
+        self.keep_axes()
 
     def set_ref_configuration(self, position):
         """set_ref_configuration.
@@ -110,8 +121,9 @@ class RodFrame(FrameBase):
         """
         line_position = process_position(
             self.reference_position,
-            self.offset, self.rotation
-        ) / self.reference_total_length
+            self.offset, self.rotation,
+            1 / self.reference_total_length
+        )
         
         if self.ax_main_3d_flag:
             self.ax_main.plot(
@@ -124,42 +136,84 @@ class RodFrame(FrameBase):
                 color="grey", linestyle="--"
             )
 
-    def calculate_line_position(self, position, director, radius):
-        """calculate_line_position.
+    def set_trajectory(self, position, director, radius):
+        """set_trajectory.
+        Transform all frames of a recorded rod at once, so that the frames
+        can be plotted by their index (see plot_rod). Set the reference
+        configuration first, as its length scales the trajectory.
 
         Parameters
         ----------
         position :
+            shape (n_frames, 3, n_elems+1)
         director :
+            shape (n_frames, 3, 3, n_elems)
         radius :
+            shape (n_frames, n_elems)
         """
-        line_center = process_position(
-            position, self.offset, self.rotation
-        ) / self.reference_total_length
-        line_position = process_position(
-            (position[:, :-1] + position[:, 1:])/2,
-            self.offset, self.rotation
-        )
-        line_director = process_director(director, self.rotation)
-        line_up = (
-            (line_position + line_director[1, :, :] * radius) 
-            / self.reference_total_length
-        )
-        line_down = (
-            (line_position - line_director[1, :, :] * radius) 
-            / self.reference_total_length
-        )
-        line_left = (
-            (line_position + line_director[0, :, :] * radius)
-            / self.reference_total_length
-        )
-        line_right = (
-            (line_position - line_director[0, :, :] * radius)
-            / self.reference_total_length
+        position = np.asarray(position, dtype=np.float64)
+        scale = 1 / self.reference_total_length
+        self.trajectory = dict(
+            center=process_position_trajectory(
+                position, self.offset, self.rotation, scale
+            ),
+            position=process_position_trajectory(
+                (position[:, :, :-1] + position[:, :, 1:])/2,
+                self.offset, self.rotation, scale
+            ),
+            director=process_director_trajectory(director, self.rotation),
+            radius=np.asarray(radius) * scale,
         )
-        return line_center, [line_up, line_right, line_down, line_left]
 
-    def plot_rod2d(self, position, director, radius, **kwargs):
+    def calculate_line_position(
+        self, position, director, radius, frame_index=None
+    ):
+        """calculate_line_position.
+
+        Parameters
+        ----------
+        position :
+        director :
+        radius :
+        frame_index :
+            Index of the frame of the trajectory to be used instead of
+            position, director and radius, see set_trajectory.
+        """
+        if frame_index is not None:
+            line_center = self.trajectory["center"][frame_index]
+            line_position = self.trajectory["position"][frame_index]
+            line_director = self.trajectory["director"][frame_index]
+            line_radius = self.trajectory["radius"][frame_index]
+        else:
+            scale = 1 / self.reference_total_length
+            line_center = process_position(
+                position, self.offset, self.rotation, scale
+            )
+            line_position = process_position(
+                (position[:, :-1] + position[:, 1:])/2,
+                self.offset, self.rotation, scale
+            )
+            line_director = process_director(director, self.rotation)
+            line_radius = radius * scale
+        line_up = line_position + line_director[1, :, :] * line_radius
+        line_down = line_position - line_director[1, :, :] * line_radius
+        line_left = line_position + line_director[0, :, :] * line_radius
+        line_right = line_position - line_director[0, :, :] * line_radius
+        lines = [line_up, line_right, line_down, line_left]
+        if self.lod_tolerance is not None:
+            line_center = line_center[
+                :, lod_indices(line_center, self.lod_tolerance)
+            ]
+            lines = [
+                line[:, lod_indices(line, self.lod_tolerance)]
+                for line in lines
+            ]
+        return line_center, lines
+
+    def plot_rod2d(
+        self, position=None, director=None, radius=None, frame_index=None,
+        **kwargs
+    ):
         """plot_rod2d.
 
         Parameters
@@ -167,24 +221,30 @@ class RodFrame(FrameBase):
         position :
         director :
         radius :
+        frame_index :
+            Index of the frame of the trajectory to be plotted instead of
+            position, director and radius, see set_trajectory.
         """
         color = kwargs.get("color", self.rod_color)
         alpha = kwargs.get("alpha", 1)
         line_center, lines = self.calculate_line_position(
-            position, director, radius
+            position, director, radius, frame_index
         )
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             line_center[0], line_center[1], 
             color=color,
             alpha=alpha,
             linestyle="--"
         )
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             lines[0][0], lines[0][1],
             color=color,
             alpha=alpha,
         )
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             lines[2][0], lines[2][1],
             color=color,
             alpha=alpha,
@@ -199,7 +259,8 @@ class RodFrame(FrameBase):
         #     color=color,
         #     alpha=alpha,
         # )
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             [lines[0][0, -1], line_center[0, -1], lines[2][0, -1]],
             [lines[0][1, -1], line_center[1, -1], lines[2][1, -1]],
             color=color,
@@ -214,7 +275,10 @@ class RodFrame(FrameBase):
         # )
         return self.ax_main
 
-    def plot_rod3d(self, position, director, radius, **kwargs):
+    def plot_rod3d(
+        self, position=None, director=None, radius=None, frame_index=None,
+        **kwargs
+    ):
         """plot_rod3d.
 
         Parameters
@@ -222,25 +286,31 @@ class RodFrame(FrameBase):
         position :
         director :
         radius :
+        frame_index :
+            Index of the frame of the trajectory to be plotted instead of
+            position, director and radius, see set_trajectory.
         """
         color = kwargs.get("color", self.rod_color)
         alpha = kwargs.get("alpha", 1)
         line_center, lines = self.calculate_line_position(
-            position, director, radius
+            position, director, radius, frame_index
         )
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             line_center[0], line_center[1], line_center[2],
             color=color,
             alpha=alpha,
             linestyle="--"
         )
         for line in lines:    
-            self.ax_main.plot(
+            plot_line(
+                self.ax_main,
                 line[0], line[1], line[2],
                 color=color,
                 alpha=alpha,
             ) 
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             [lines[0][0, -1], line_center[0, -1], lines[2][0, -1]],
             [lines[0][1, -1], line_center[1, -1], lines[2][1, -1]],
             [lines[0][2, -1], line_center[2, -1], lines[2][2, -1]],
@@ -248,7 +318,8 @@ class RodFrame(FrameBase):
             alpha=alpha,
             label='sim'
         )
-        self.ax_main.plot(
+        plot_line(
+            self.ax_main,
             [lines[1][0, -1], line_center[0, -1], lines[3][0, -1]],
             [lines[1][1, -1], line_center[1, -1], lines[3][1, -1]],
             [lines[1][2, -1], line_center[2, -1], lines[3][2, -1]],
@@ -308,9 +379,12 @@ class StrainFrame(FrameBase):
             self,
             file_dict=file_dict,
             fig_dict=fig_dict,
-            gs_dict=gs_dict
+            gs_dict=gs_dict,
+            persistent_artists=kwargs.get("persistent_artists", False)
         )
 
+        self.axes_kappa = []
+        self.axes_shear = []
         self.axes_strain_info = kwargs["axes_strain_info"]
         self.axes_kappa_indices = self.axes_strain_info["axes_kappa_indices"]
         self.axes_shear_indices = self.axes_strain_info["axes_shear_indices"]
@@ -337,6 +411,8 @@ class StrainFrame(FrameBase):
         """reset.
         """
         FrameBase.reset(self,)
+        if self.is_built(self.axes_kappa):
+            return
         
         self.axes_kappa = []
         self.axes_shear = []
@@ -363,6 +439,7 @@ class StrainFrame(FrameBase):
         
         if self.reference_configuration_flag:
             StrainFrame.plot_ref_configuration(self,)
+        self.keep_axes()
 
     def set_ref_configuration(self, shear, kappa):
         """set_ref_configuration.
@@ -405,12 +482,14 @@ class StrainFrame(FrameBase):
         color :
         """
         for index_i in range(3):
-            self.axes_shear[index_i].plot(
+            plot_line(
+                self.axes_shear[index_i],
                 self.s_shear,
                 shear[index_i],
                 color=self.rod_color if color is None else color
             )
-            self.axes_kappa[index_i].plot(
+            plot_line(
+                self.axes_kappa[index_i],
                 self.s_kappa,
                 kappa[index_i],
                 color=self.rod_color if color is None else color
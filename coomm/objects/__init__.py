@@ -8,3 +8,5 @@ from .target import *
 from .point import *
 from .director_constraint import *
 from .cylinder import *
+from .obstacles import *
+from .mesh import *
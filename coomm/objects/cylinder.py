@@ -3,14 +3,68 @@ Cylinder object implementation
 """
 
 import numpy as np
+from numba import njit
 
 from coomm.objects.object import Object
 from coomm.objects.target import Target
 
+def element_values(value, n_elements):
+    """element_values.
+    View of a scalar or per element quantity (e.g. a cost weight or the
+    radius of the rod) with one value per element, for the njit kernels.
+    """
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n_elements,))
+
+def scalar_value(value):
+    """scalar_value.
+    Float of a scalar or one-element array (e.g. the radius of a pyelastica
+    Cylinder), for the njit kernels.
+    """
+    return float(np.asarray(value, dtype=np.float64).item())
+
+@njit(cache=True)
+def _add_cylinder_cost_gradient(
+    position, k, radius,
+    cylinder_position, cylinder_axis,
+    cylinder_radius, cylinder_length,
+    weight, horizontal_position_diff, cost, cost_gradient
+    ):
+    # penalize element k inside the cylinder with the squared penetration
+    # depth 0.5*weight*(dist-(radius+cylinder_radius))**2 of its horizontal
+    # distance to the axis, horizontal_position_diff is a scratch array of
+    # size 3
+    vertical_dist = 0.0
+    for i in range(3):
+        horizontal_position_diff[i] = (
+            0.5*(position[i, k]+position[i, k+1]) - cylinder_position[i]
+        )
+        vertical_dist += horizontal_position_diff[i] * cylinder_axis[i]
+    position_dist = 0.0
+    for i in range(3):
+        horizontal_position_diff[i] -= vertical_dist * cylinder_axis[i]
+        position_dist += horizontal_position_diff[i]**2
+    position_dist = np.sqrt(position_dist)
+    adjust_distance_ratio = (
+        (position_dist-(radius+cylinder_radius))/position_dist
+    )
+    if (
+        adjust_distance_ratio > 0 or
+        vertical_dist > cylinder_length/2 or
+        -vertical_dist > cylinder_length/2
+    ):
+        adjust_distance_ratio = 0.0
+    cost[k] += 0.5 * weight * (adjust_distance_ratio * position_dist)**2
+    for i in range(3):
+        cost_gradient[i, k] += (
+            weight * adjust_distance_ratio * horizontal_position_diff[i]
+        )
+
 class Cylinder(Object):
     """Cylinder.
     """
 
+    element_indices = dict(continuous=None, discrete=[])
+
     def __init__(self, position, director, radius, length, n_elements, cost_weight):
         """__init__.
 
@@ -34,6 +88,9 @@ class Cylinder(Object):
         self.director = director.copy()
         self.radius = radius
         self.length = length
+        # counts the pose updates, e.g. for CylinderObstacles to know when
+        # its grid is outdated
+        self.pose_version = 0
 
     def update_pose_from_sphere(self, sphere):
         """update_pose_from_sphere.
@@ -55,6 +112,7 @@ class Cylinder(Object):
             position
         """
         self.position = position.copy()
+        self.pose_version += 1
 
     def update_director(self, director):
         """update_director.
@@ -65,6 +123,7 @@ class Cylinder(Object):
             director
         """
         self.director = director.copy()
+        self.pose_version += 1
 
     @classmethod
     def get_cylinder(cls, cylinder, n_elements, cost_weight):
@@ -88,20 +147,34 @@ class Cylinder(Object):
     def calculate_continuous_cost_gradient_wrt_position(self, **kwargs):
         """calculate_continuous_cost_gradient_wrt_position.
         """
-        position = 0.5*(kwargs['position'][:, :-1]+kwargs['position'][:, 1:])
-        radius = kwargs['radius']
-        position_diff = position-self.position[:, None]
-        vertical_dist = np.einsum("ij, i -> j", position_diff, self.director[2, :])
-        horizontal_position_diff = position_diff - vertical_dist * self.director[2, :, None]
-        position_dist = np.linalg.norm(horizontal_position_diff, axis=0)
-        adjust_distance_ratio = (position_dist-(radius+self.radius))/position_dist
-        adjust_distance_ratio[adjust_distance_ratio>0] = 0
-        adjust_distance_ratio[vertical_dist>self.length/2] = 0
-        adjust_distance_ratio[-vertical_dist>self.length/2] = 0
-        self.cost_gradient.continuous.wrt_position[:, :] = (
-            self.cost_weight['position'] * horizontal_position_diff * adjust_distance_ratio
+        n_elements = kwargs['position'].shape[1]-1
+        self._calculate_cylinder_cost_gradient_wrt_position(
+            kwargs['position'],
+            element_values(kwargs['radius'], n_elements),
+            self.position, self.director[2, :],
+            scalar_value(self.radius), scalar_value(self.length),
+            element_values(self.cost_weight['position'], n_elements),
+            self.cost.continuous.wrt_position,
+            self.cost_gradient.continuous.wrt_position
         )
 
+    @staticmethod
+    @njit(cache=True)
+    def _calculate_cylinder_cost_gradient_wrt_position(
+        position, radius,
+        cylinder_position, cylinder_axis,
+        cylinder_radius, cylinder_length,
+        weight, cost, cost_gradient
+        ):
+        horizontal_position_diff = np.zeros(3)
+        for k in range(radius.shape[0]):
+            _add_cylinder_cost_gradient(
+                position, k, radius[k],
+                cylinder_position, cylinder_axis,
+                cylinder_radius, cylinder_length,
+                weight[k], horizontal_position_diff, cost, cost_gradient
+            )
+
     def calculate_continuous_cost_gradient_wrt_director(self, **kwargs):
         """calculate_continuous_cost_gradient_wrt_director.
         """
@@ -165,27 +238,44 @@ class CylinderTarget(Cylinder, Target):
         """calculate_continuous_cost_gradient_wrt_position.
         """
         Cylinder.calculate_continuous_cost_gradient_wrt_position(self, **kwargs)
-        position = 0.5*(kwargs['position'][:, :-1]+kwargs['position'][:, 1:])
-        radius = kwargs['radius']
-        position_diff = position-self.position[:, None]
-        
-        # vertical_dist = np.einsum("ij, i -> j", position_diff, self.director[2, :])
-        # horizontal_position_diff = position_diff - vertical_dist * self.director[2, :, None]
-        # position_dist = np.linalg.norm(horizontal_position_diff, axis=0)
-        # adjust_distance_ratio = (position_dist-(radius+self.radius))/position_dist
-        # adjust_distance_ratio[adjust_distance_ratio<0] = 0
-        # self.cost_gradient.continuous.wrt_position[:, :] += (
-        #     self.cost_weight['position'] * horizontal_position_diff * adjust_distance_ratio
-        # )
-
-        position_dist = np.linalg.norm(position_diff, axis=0)
-        adjust_distance_ratio = (position_dist-(radius+self.radius))/position_dist
-        
-        adjust_distance_ratio[adjust_distance_ratio<0] = 0
-        self.cost_gradient.continuous.wrt_position[:, :] += (
-            self.target_cost_weight['position'] * position_diff * adjust_distance_ratio
+        n_elements = kwargs['position'].shape[1]-1
+        self._calculate_target_cost_gradient_wrt_position(
+            kwargs['position'],
+            element_values(kwargs['radius'], n_elements),
+            self.position, scalar_value(self.radius),
+            element_values(self.target_cost_weight['position'], n_elements),
+            self.cost.continuous.wrt_position,
+            self.cost_gradient.continuous.wrt_position
         )
-    
+
+    @staticmethod
+    @njit(cache=True)
+    def _calculate_target_cost_gradient_wrt_position(
+        position, radius,
+        target_position, target_radius,
+        weight, cost, cost_gradient
+        ):
+        # pull the elements out of reach towards the target, the cost is
+        # 0.5*weight*(dist-(radius+target_radius))**2
+        for k in range(radius.shape[0]):
+            position_dist = 0.0
+            for i in range(3):
+                position_diff = (
+                    0.5*(position[i, k]+position[i, k+1]) - target_position[i]
+                )
+                position_dist += position_diff**2
+            position_dist = np.sqrt(position_dist)
+            adjust_distance_ratio = (
+                (position_dist-(radius[k]+target_radius))/position_dist
+            )
+            if adjust_distance_ratio < 0:
+                adjust_distance_ratio = 0.0
+            cost[k] += 0.5 * weight[k] * (adjust_distance_ratio * position_dist)**2
+            for i in range(3):
+                cost_gradient[i, k] += weight[k] * adjust_distance_ratio * (
+                    0.5*(position[i, k]+position[i, k+1]) - target_position[i]
+                )
+
     """ The first method """
     # def calculate_continuous_cost_gradient_wrt_director(self, **kwargs):
     #     """calculate_continuous_cost_gradient_wrt_director.
@@ -226,8 +316,7 @@ class CylinderTarget(Cylinder, Target):
     def calculate_continuous_cost_gradient_wrt_director(self, **kwargs):
         """calculate_continuous_cost_gradient_wrt_director.
         """
-        position = 0.5*(kwargs['position'][:, :-1]+kwargs['position'][:, 1:])
-        director = kwargs['director'][:, :, :]
+        director = kwargs['director']
         n_elems = director.shape[2]
 
         # vector = np.zeros((3, n_elems))
@@ -252,18 +341,12 @@ class CylinderTarget(Cylinder, Target):
 
 
         """ The second method """
-        vector = np.zeros((3, n_elems))
-        coefficient = np.zeros(n_elems)
-        for n in range(n_elems):
-            position_diff = self.position - position[:, n]
-            position_diff = position_diff / np.linalg.norm(position_diff)
-            vector[1, n] = - np.dot(director[2, :, n], -position_diff)
-            vector[2, n] = np.dot(director[1, :, n], -position_diff)
-            # coefficient[n] = 1-np.dot(director[0, :, n], position_diff)
-            coefficient[n] = 1
-            self.cost_gradient.continuous.wrt_director[:, n] = (
-                self.target_cost_weight['director'][n] * coefficient[n] * director[:, :, n].T @ vector[:, n]
-            )
+        self._calculate_target_cost_gradient_wrt_director(
+            kwargs['position'], director, self.position,
+            element_values(self.target_cost_weight['director'], n_elems),
+            self.cost.continuous.wrt_director,
+            self.cost_gradient.continuous.wrt_director
+        )
 
         """ The third method """
         # vector = np.zeros((3, n_elems))
@@ -281,6 +364,40 @@ class CylinderTarget(Cylinder, Target):
         #         self.target_cost_weight['director'][n] * coefficient[n] * director[:, :, n].T @ vector[:, n]
         #     )
 
+    @staticmethod
+    @njit(cache=True)
+    def _calculate_target_cost_gradient_wrt_director(
+        position, director, target_position,
+        weight, cost, cost_gradient
+        ):
+        # rotate the normal (d1) of every element towards the target, the
+        # cost is weight*(1 - d1 . u) with u the unit vector from the element
+        # to the target and its gradient director.T @ (0, d3 . u, -d2 . u)
+        direction = np.zeros(3)
+        for n in range(director.shape[2]):
+            position_dist = 0.0
+            for i in range(3):
+                direction[i] = (
+                    target_position[i] - 0.5*(position[i, n]+position[i, n+1])
+                )
+                position_dist += direction[i]**2
+            position_dist = np.sqrt(position_dist)
+            alignment = 0.0
+            vector_1 = 0.0
+            vector_2 = 0.0
+            for i in range(3):
+                alignment += director[0, i, n] * direction[i]
+                vector_1 += director[2, i, n] * direction[i]
+                vector_2 -= director[1, i, n] * direction[i]
+            alignment /= position_dist
+            vector_1 /= position_dist
+            vector_2 /= position_dist
+            cost[n] += weight[n] * (1 - alignment)
+            for i in range(3):
+                cost_gradient[i, n] += weight[n] * (
+                    director[1, i, n] * vector_1 + director[2, i, n] * vector_2
+                )
+
     def calculate_discrete_cost_gradient_wrt_position(self, **kwargs):
         """calculate_discrete_cost_gradient_wrt_position.
         """
@@ -11,6 +11,8 @@ class DirectorConstraint(Object, Target):
     """DirectorConstraint.
     """
 
+    element_indices = dict(continuous=[], discrete=None)
+
     def __init__(self, director, n_elements, cost_weight, target_cost_weight, **kwargs):
         """__init__.
 
@@ -102,7 +104,12 @@ class DirectorConstraint(Object, Target):
         vector[0, :] = skew_symmetric_matrix[1, 2, :]
         vector[1, :] = -skew_symmetric_matrix[0, 2, :]
         vector[2, :] = skew_symmetric_matrix[0, 1, :]
-        self.cost_gradient.discrete.wrt_director[:, :] = (
+        # cost 0.5*|director-self.director|^2 = 3-trace(director @ self.director.T)
+        self.cost.discrete.wrt_director[:] += (
+            self.target_cost_weight['director'] *
+            (3 - np.einsum('ijn,ijn->n', director, self.director))
+        )
+        self.cost_gradient.discrete.wrt_director[:, :] += (
             self.target_cost_weight['director'] * np.einsum('jik,jk->ik', director, vector)
         )
         # print("director")
@@ -0,0 +1,646 @@
+__doc__ = """
+Triangle mesh obstacle object implementation.
+
+The signed distance field (negative inside) of the mesh and its gradient are
+sampled on a voxel grid around the mesh once, when the obstacle is created,
+with a bounding volume hierarchy of the triangles, and can be cached on disk
+keyed by the hash of the mesh and grid settings.
+The cost of the elements of the rod is the squared penetration depth
+0.5*weight*(sdf-radius)**2 of the elements closer to the surface than their
+radius, evaluated by trilinear interpolation of the grid, like Cylinder
+does with its analytic distance.
+"""
+__all__ = ['MeshObstacle', 'load_mesh', 'signed_distance_field']
+
+import os, hashlib
+import numpy as np
+from numba import njit, prange
+
+from coomm.objects.object import Object
+from coomm.objects.cylinder import element_values
+
+def load_obj(file_name):
+    vertices, faces = [], []
+    with open(file_name, "r") as f:
+        for line in f:
+            words = line.split()
+            if len(words) == 0:
+                continue
+            if words[0] == "v":
+                vertices.append([float(word) for word in words[1:4]])
+            elif words[0] == "f":
+                # "f v/vt/vn ...", 1-based or negative indices, polygons are
+                # triangulated as fans
+                indices = [int(word.split("/")[0]) for word in words[1:]]
+                indices = [
+                    index-1 if index > 0 else len(vertices)+index
+                    for index in indices
+                ]
+                for i in range(1, len(indices)-1):
+                    faces.append([indices[0], indices[i], indices[i+1]])
+    return np.array(vertices, dtype=np.float64), np.array(faces, dtype=np.int64)
+
+def load_stl(file_name):
+    with open(file_name, "rb") as f:
+        data = f.read()
+    n_faces = int(np.frombuffer(data[80:84], dtype="<u4")[0]) if len(data) >= 84 else 0
+    if len(data) == 84 + 50 * n_faces:
+        records = np.frombuffer(
+            data[84:], dtype=np.dtype([
+                ("normal", "<f4", 3), ("vertices", "<f4", (3, 3)),
+                ("attribute", "<u2")
+            ])
+        )
+        corners = records["vertices"].astype(np.float64)
+    else:
+        corners = np.array([
+            [float(word) for word in line.split()[1:4]]
+            for line in data.decode().splitlines()
+            if line.strip().startswith("vertex")
+        ], dtype=np.float64).reshape(-1, 3, 3)
+    # STL files repeat the vertices of every face
+    vertices, faces = np.unique(
+        corners.reshape(-1, 3), axis=0, return_inverse=True
+    )
+    return vertices, faces.reshape(-1, 3).astype(np.int64)
+
+def load_mesh(file_name):
+    """load_mesh.
+
+    Parameters
+    ----------
+    file_name : str
+        Wavefront .obj or (ASCII or binary) .stl file.
+
+    Returns
+    -------
+    vertices : np.ndarray
+        shape (n_vertices, 3)
+    faces : np.ndarray
+        shape (n_faces, 3), vertex indices of the triangles
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == ".obj":
+        return load_obj(file_name)
+    if extension == ".stl":
+        return load_stl(file_name)
+    raise ValueError(f"unsupported mesh file format {extension}")
+
+def build_triangle_tree(triangles, leaf_size=4):
+    """build_triangle_tree.
+    Bounding volume hierarchy of the triangles, split at the median centroid
+    along the longest side of the centroid bounds. Every node covers the
+    contiguous range start:end of the reordered triangles.
+
+    Parameters
+    ----------
+    triangles : np.ndarray
+        shape (n_faces, 3, 3), vertices of the triangles
+    leaf_size : int
+        Maximum number of triangles of a leaf.
+
+    Returns
+    -------
+    order : np.ndarray
+        shape (n_faces,), order of the triangles in the tree
+    node_range : np.ndarray
+        shape (n_nodes, 2), start and end of the triangles of the nodes
+    node_children : np.ndarray
+        shape (n_nodes, 2), child nodes, -1 for the leaves
+    """
+    centroids = triangles.mean(axis=1)
+    order = np.arange(triangles.shape[0])
+    node_range = [(0, triangles.shape[0])]
+    node_children = [(-1, -1)]
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        start, end = node_range[node]
+        if end - start <= leaf_size:
+            continue
+        node_centroids = centroids[order[start:end]]
+        axis = np.argmax(node_centroids.max(axis=0)-node_centroids.min(axis=0))
+        middle = (start + end) // 2
+        order[start:end] = order[start:end][
+            np.argpartition(node_centroids[:, axis], middle-start)
+        ]
+        node_children[node] = (len(node_range), len(node_range)+1)
+        for child_range in ((start, middle), (middle, end)):
+            stack.append(len(node_range))
+            node_range.append(child_range)
+            node_children.append((-1, -1))
+    return (
+        order, np.array(node_range, dtype=np.int64),
+        np.array(node_children, dtype=np.int64)
+    )
+
+@njit(cache=True)
+def triangle_tree_bounds(triangles, node_range):
+    # bounding box of every node and the dipole of the fast winding number,
+    # Barill et al. (2018): the area weighted normal, the area weighted
+    # centroid and the radius around it of the triangles of the node
+    n_nodes = node_range.shape[0]
+    node_lower = np.empty((n_nodes, 3))
+    node_upper = np.empty((n_nodes, 3))
+    node_normal = np.zeros((n_nodes, 3))
+    node_center = np.zeros((n_nodes, 3))
+    node_radius = np.zeros(n_nodes)
+    for node in range(n_nodes):
+        area_sum = 0.0
+        for i in range(3):
+            node_lower[node, i] = np.inf
+            node_upper[node, i] = -np.inf
+        for f in range(node_range[node, 0], node_range[node, 1]):
+            e1 = triangles[f, 1] - triangles[f, 0]
+            e2 = triangles[f, 2] - triangles[f, 0]
+            normal = 0.5 * np.cross(e1, e2)
+            area = np.sqrt(np.dot(normal, normal))
+            area_sum += area
+            for i in range(3):
+                node_normal[node, i] += normal[i]
+                centroid = (
+                    triangles[f, 0, i] + triangles[f, 1, i] + triangles[f, 2, i]
+                ) / 3
+                node_center[node, i] += area * centroid
+                for v in range(3):
+                    node_lower[node, i] = min(node_lower[node, i], triangles[f, v, i])
+                    node_upper[node, i] = max(node_upper[node, i], triangles[f, v, i])
+        for i in range(3):
+            if area_sum > 0:
+                node_center[node, i] /= area_sum
+            else:
+                node_center[node, i] = 0.5 * (node_lower[node, i] + node_upper[node, i])
+        for f in range(node_range[node, 0], node_range[node, 1]):
+            for v in range(3):
+                node_radius[node] = max(node_radius[node], np.sqrt(
+                    (triangles[f, v, 0] - node_center[node, 0])**2 +
+                    (triangles[f, v, 1] - node_center[node, 1])**2 +
+                    (triangles[f, v, 2] - node_center[node, 2])**2
+                ))
+    return node_lower, node_upper, node_normal, node_center, node_radius
+
+@njit(cache=True)
+def closest_point_squared_distance(point, triangle):
+    # squared distance from point to the triangle, Ericson, Real-Time
+    # Collision Detection, 5.1.5, in scalars to avoid temporary arrays
+    abx = triangle[1, 0] - triangle[0, 0]
+    aby = triangle[1, 1] - triangle[0, 1]
+    abz = triangle[1, 2] - triangle[0, 2]
+    acx = triangle[2, 0] - triangle[0, 0]
+    acy = triangle[2, 1] - triangle[0, 1]
+    acz = triangle[2, 2] - triangle[0, 2]
+    apx = point[0] - triangle[0, 0]
+    apy = point[1] - triangle[0, 1]
+    apz = point[2] - triangle[0, 2]
+    d1 = abx*apx + aby*apy + abz*apz
+    d2 = acx*apx + acy*apy + acz*apz
+    if d1 <= 0 and d2 <= 0:
+        return apx*apx + apy*apy + apz*apz
+    bpx = point[0] - triangle[1, 0]
+    bpy = point[1] - triangle[1, 1]
+    bpz = point[2] - triangle[1, 2]
+    d3 = abx*bpx + aby*bpy + abz*bpz
+    d4 = acx*bpx + acy*bpy + acz*bpz
+    if d3 >= 0 and d4 <= d3:
+        return bpx*bpx + bpy*bpy + bpz*bpz
+    vc = d1*d4 - d3*d2
+    if vc <= 0 and d1 >= 0 and d3 <= 0:
+        v = d1 / (d1-d3)
+        return (apx-v*abx)**2 + (apy-v*aby)**2 + (apz-v*abz)**2
+    cpx = point[0] - triangle[2, 0]
+    cpy = point[1] - triangle[2, 1]
+    cpz = point[2] - triangle[2, 2]
+    d5 = abx*cpx + aby*cpy + abz*cpz
+    d6 = acx*cpx + acy*cpy + acz*cpz
+    if d6 >= 0 and d5 <= d6:
+        return cpx*cpx + cpy*cpy + cpz*cpz
+    vb = d5*d2 - d1*d6
+    if vb <= 0 and d2 >= 0 and d6 <= 0:
+        w = d2 / (d2-d6)
+        return (apx-w*acx)**2 + (apy-w*acy)**2 + (apz-w*acz)**2
+    va = d3*d6 - d5*d4
+    if va <= 0 and (d4-d3) >= 0 and (d5-d6) >= 0:
+        w = (d4-d3) / ((d4-d3)+(d5-d6))
+        return (
+            (bpx - w*(acx-abx))**2 + (bpy - w*(acy-aby))**2 +
+            (bpz - w*(acz-abz))**2
+        )
+    denominator = 1 / (va + vb + vc)
+    v = vb * denominator
+    w = vc * denominator
+    return (
+        (apx - v*abx - w*acx)**2 + (apy - v*aby - w*acy)**2 +
+        (apz - v*abz - w*acz)**2
+    )
+
+@njit(cache=True)
+def solid_angle(point, triangle):
+    # signed solid angle of the triangle seen from point, Van Oosterom and
+    # Strackee (1983)
+    ax = triangle[0, 0] - point[0]
+    ay = triangle[0, 1] - point[1]
+    az = triangle[0, 2] - point[2]
+    bx = triangle[1, 0] - point[0]
+    by = triangle[1, 1] - point[1]
+    bz = triangle[1, 2] - point[2]
+    cx = triangle[2, 0] - point[0]
+    cy = triangle[2, 1] - point[1]
+    cz = triangle[2, 2] - point[2]
+    la = np.sqrt(ax*ax + ay*ay + az*az)
+    lb = np.sqrt(bx*bx + by*by + bz*bz)
+    lc = np.sqrt(cx*cx + cy*cy + cz*cz)
+    numerator = ax*(by*cz-bz*cy) + ay*(bz*cx-bx*cz) + az*(bx*cy-by*cx)
+    denominator = (
+        la*lb*lc + (ax*bx+ay*by+az*bz)*lc + (ax*cx+ay*cy+az*cz)*lb
+        + (bx*cx+by*cy+bz*cz)*la
+    )
+    return 2 * np.arctan2(numerator, denominator)
+
+@njit(cache=True)
+def box_squared_distance(point, lower, upper):
+    squared_distance = 0.0
+    for i in range(3):
+        if point[i] < lower[i]:
+            squared_distance += (lower[i] - point[i])**2
+        elif point[i] > upper[i]:
+            squared_distance += (point[i] - upper[i])**2
+    return squared_distance
+
+@njit(cache=True)
+def tree_squared_distance(
+    point, triangles, node_range, node_children, node_lower, node_upper, stack
+):
+    # nearest triangle, skipping the nodes whose bounding box is farther
+    # than the nearest triangle found so far
+    best = np.inf
+    stack[0] = 0
+    top = 1
+    while top > 0:
+        top -= 1
+        node = stack[top]
+        if box_squared_distance(point, node_lower[node], node_upper[node]) >= best:
+            continue
+        left, right = node_children[node, 0], node_children[node, 1]
+        if left < 0:
+            for f in range(node_range[node, 0], node_range[node, 1]):
+                best = min(best, closest_point_squared_distance(point, triangles[f]))
+            continue
+        # visit the nearer child first
+        left_distance = box_squared_distance(
+            point, node_lower[left], node_upper[left]
+        )
+        right_distance = box_squared_distance(
+            point, node_lower[right], node_upper[right]
+        )
+        if left_distance < right_distance:
+            left, right = right, left
+        stack[top] = left
+        stack[top+1] = right
+        top += 2
+    return best
+
+@njit(cache=True)
+def tree_solid_angle(
+    point, triangles, node_range, node_children,
+    node_normal, node_center, node_radius, accuracy, stack
+):
+    # total solid angle of the triangles, approximating the nodes farther
+    # than accuracy times their radius by their dipole
+    total = 0.0
+    stack[0] = 0
+    top = 1
+    while top > 0:
+        top -= 1
+        node = stack[top]
+        dx = node_center[node, 0] - point[0]
+        dy = node_center[node, 1] - point[1]
+        dz = node_center[node, 2] - point[2]
+        distance = np.sqrt(dx*dx + dy*dy + dz*dz)
+        if distance > accuracy * node_radius[node]:
+            total += (
+                dx*node_normal[node, 0] + dy*node_normal[node, 1] +
+                dz*node_normal[node, 2]
+            ) / distance**3
+            continue
+        if node_children[node, 0] < 0:
+            for f in range(node_range[node, 0], node_range[node, 1]):
+                total += solid_angle(point, triangles[f])
+            continue
+        stack[top] = node_children[node, 0]
+        stack[top+1] = node_children[node, 1]
+        top += 2
+    return total
+
+@njit(cache=True, parallel=True)
+def signed_distance_kernel(
+    points, triangles, node_range, node_children,
+    node_lower, node_upper, node_normal, node_center, node_radius,
+    accuracy, distance
+):
+    block_size = 256
+    n_blocks = (points.shape[0] + block_size - 1) // block_size
+    for block in prange(n_blocks):
+        # traversal stack shared by the points of the block, which holds
+        # at most two nodes per level of the median split tree
+        stack = np.empty(256, dtype=np.int64)
+        for n in range(
+            block * block_size, min((block+1) * block_size, points.shape[0])
+        ):
+            unsigned_distance = np.sqrt(tree_squared_distance(
+                points[n], triangles, node_range, node_children,
+                node_lower, node_upper, stack
+            ))
+            winding_number = tree_solid_angle(
+                points[n], triangles, node_range, node_children,
+                node_normal, node_center, node_radius, accuracy, stack
+            ) / (4 * np.pi)
+            # the winding number is 1 inside a closed mesh and 0 outside
+            if abs(winding_number) > 0.5:
+                distance[n] = -unsigned_distance
+            else:
+                distance[n] = unsigned_distance
+
+def signed_distance_field(vertices, faces, points, accuracy=2.0):
+    """signed_distance_field.
+    Signed distance, negative inside, of the points to a closed triangle
+    mesh. The nearest triangle is searched in a bounding volume hierarchy of
+    the triangles. The inside is decided by the generalized winding number,
+    so the orientation of the faces does not matter, which is evaluated by
+    the fast winding number of Barill et al. (2018) on the same hierarchy.
+
+    Parameters
+    ----------
+    vertices : np.ndarray
+        shape (n_vertices, 3)
+    faces : np.ndarray
+        shape (n_faces, 3)
+    points : np.ndarray
+        shape (n_points, 3)
+    accuracy : float
+        Nodes of the hierarchy farther from a point than accuracy times
+        their radius contribute to the winding number by their dipole.
+
+    Returns
+    -------
+    distance : np.ndarray
+        shape (n_points,)
+    """
+    triangles = np.asarray(vertices, dtype=np.float64)[faces]
+    order, node_range, node_children = build_triangle_tree(triangles)
+    triangles = np.ascontiguousarray(triangles[order])
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    distance = np.zeros(points.shape[0])
+    signed_distance_kernel(
+        points, triangles, node_range, node_children,
+        *triangle_tree_bounds(triangles, node_range),
+        float(accuracy), distance
+    )
+    return distance
+
+class MeshObstacle(Object):
+    """MeshObstacle.
+    """
+
+    element_indices = dict(continuous=None, discrete=[])
+
+    def __init__(
+        self, vertices, faces, n_elements, cost_weight,
+        position=None, director=None,
+        resolution=32, padding=None, cache_folder=None
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        vertices : np.ndarray
+            shape (n_vertices, 3), in the frame of the obstacle
+        faces : np.ndarray
+            shape (n_faces, 3), vertex indices of the triangles of a closed
+            mesh
+        n_elements :
+            n_elements
+        cost_weight :
+            cost_weight
+        position : np.ndarray
+            Position of the obstacle frame, the origin by default.
+        director : np.ndarray
+            Director of the obstacle frame (rows are the frame vectors in
+            the lab frame), the identity by default.
+        resolution : int
+            Number of voxels along the longest side of the grid.
+        padding : float
+            Margin of the grid around the bounding box of the mesh, which
+            must exceed the radius of the rod; 10% of the largest side of
+            the bounding box by default. Elements outside the grid are
+            not penalized.
+        cache_folder : str
+            Folder the grid is cached in, None for no cache.
+        """
+        Object.__init__(self, n_elements, cost_weight)
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.faces = np.asarray(faces, dtype=np.int64)
+        self.position = (
+            np.zeros(3) if position is None else np.array(position, dtype=np.float64)
+        )
+        self.director = (
+            np.eye(3) if director is None else np.array(director, dtype=np.float64)
+        )
+        self.load_field(resolution, padding, cache_folder)
+
+    @classmethod
+    def from_file(cls, file_name, n_elements, cost_weight, scale=1.0, **kwargs):
+        """from_file.
+
+        Parameters
+        ----------
+        file_name : str
+            Wavefront .obj or .stl file.
+        n_elements :
+            n_elements
+        cost_weight :
+            cost_weight
+        scale : float
+            Factor from the units of the file to the units of the rod.
+        kwargs :
+            Keyword arguments of MeshObstacle.
+        """
+        vertices, faces = load_mesh(file_name)
+        return cls(vertices * scale, faces, n_elements, cost_weight, **kwargs)
+
+    def field_key(self, resolution, padding):
+        key = hashlib.sha1()
+        key.update(np.ascontiguousarray(self.vertices).tobytes())
+        key.update(np.ascontiguousarray(self.faces).tobytes())
+        key.update(np.array([resolution, padding], dtype=np.float64).tobytes())
+        return key.hexdigest()
+
+    def load_field(self, resolution, padding, cache_folder):
+        """load_field.
+        Sample the signed distance field and its gradient on the voxel grid,
+        or load them from the cache.
+        """
+        lower = self.vertices.min(axis=0)
+        upper = self.vertices.max(axis=0)
+        if padding is None:
+            padding = 0.1 * np.max(upper-lower)
+        cache_file = None
+        if cache_folder is not None:
+            cache_file = os.path.join(
+                cache_folder, "sdf_"+self.field_key(resolution, padding)+".npz"
+            )
+            if os.path.exists(cache_file):
+                with np.load(cache_file) as data:
+                    self.origin = data["origin"]
+                    self.voxel_size = float(data["voxel_size"])
+                    self.field = data["field"]
+                return
+
+        self.voxel_size = float(np.max(upper-lower) + 2*padding) / resolution
+        self.origin = lower - padding
+        shape = (
+            np.ceil((upper+padding-self.origin)/self.voxel_size).astype(np.int64) + 1
+        )
+        axes = [
+            self.origin[i] + self.voxel_size * np.arange(shape[i])
+            for i in range(3)
+        ]
+        points = np.stack(
+            np.meshgrid(*axes, indexing="ij"), axis=-1
+        ).reshape(-1, 3)
+        distance = signed_distance_field(
+            self.vertices, self.faces, points
+        ).reshape(shape)
+        # channels: signed distance and its gradient
+        self.field = np.stack(
+            [distance] + list(np.gradient(distance, self.voxel_size))
+        )
+
+        if cache_file is not None:
+            os.makedirs(cache_folder, exist_ok=True)
+            temporary_file = cache_file[:-len(".npz")] + ".tmp.npz"
+            np.savez(
+                temporary_file, origin=self.origin,
+                voxel_size=np.array(self.voxel_size), field=self.field
+            )
+            os.replace(temporary_file, cache_file)
+
+    def update_pose_from_sphere(self, sphere):
+        """update_pose_from_sphere.
+
+        Parameters
+        ----------
+        sphere :
+            sphere
+        """
+        self.update_position(sphere.position_collection[:, 0])
+        self.update_director(sphere.director_collection[:, :, 0])
+
+    def update_position(self, position):
+        """update_position.
+
+        Parameters
+        ----------
+        position :
+            position
+        """
+        self.position = position.copy()
+
+    def update_director(self, director):
+        """update_director.
+
+        Parameters
+        ----------
+        director :
+            director
+        """
+        self.director = director.copy()
+
+    def calculate_continuous_cost_gradient_wrt_position(self, **kwargs):
+        """calculate_continuous_cost_gradient_wrt_position.
+        """
+        n_elements = kwargs['position'].shape[1]-1
+        self._calculate_mesh_cost_gradient_wrt_position(
+            kwargs['position'],
+            element_values(kwargs['radius'], n_elements),
+            self.position, self.director,
+            self.origin, self.voxel_size, self.field,
+            element_values(self.cost_weight['position'], n_elements),
+            self.cost.continuous.wrt_position,
+            self.cost_gradient.continuous.wrt_position
+        )
+
+    @staticmethod
+    @njit(cache=True)
+    def _calculate_mesh_cost_gradient_wrt_position(
+        position, radius,
+        mesh_position, mesh_director,
+        origin, voxel_size, field,
+        weight, cost, cost_gradient
+        ):
+        position_diff = np.zeros(3)
+        sample = np.zeros(4)
+        lower = np.zeros(3, dtype=np.int64)
+        fraction = np.zeros(3)
+        for k in range(radius.shape[0]):
+            for i in range(3):
+                position_diff[i] = (
+                    0.5*(position[i, k]+position[i, k+1]) - mesh_position[i]
+                )
+            # trilinear interpolation of the grid at the element position in
+            # the frame of the mesh
+            inside = True
+            for i in range(3):
+                coordinate = (
+                    mesh_director[i, 0]*position_diff[0] +
+                    mesh_director[i, 1]*position_diff[1] +
+                    mesh_director[i, 2]*position_diff[2] - origin[i]
+                ) / voxel_size
+                if not (0 <= coordinate <= field.shape[i+1]-1):
+                    inside = False
+                    break
+                lower[i] = min(int(np.floor(coordinate)), field.shape[i+1]-2)
+                fraction[i] = coordinate - lower[i]
+            if not inside:
+                continue
+            sample[:] = 0
+            for corner in range(8):
+                corner_weight = 1.0
+                for i in range(3):
+                    if (corner >> i) & 1:
+                        corner_weight *= fraction[i]
+                    else:
+                        corner_weight *= 1 - fraction[i]
+                for channel in range(4):
+                    sample[channel] += corner_weight * field[
+                        channel,
+                        lower[0] + (corner & 1),
+                        lower[1] + ((corner >> 1) & 1),
+                        lower[2] + ((corner >> 2) & 1)
+                    ]
+
+            penetration = sample[0] - radius[k]
+            if penetration >= 0:
+                continue
+            cost[k] += 0.5 * weight[k] * penetration**2
+            for i in range(3):
+                # gradient of the distance back in the lab frame
+                cost_gradient[i, k] += weight[k] * penetration * (
+                    mesh_director[0, i]*sample[1] +
+                    mesh_director[1, i]*sample[2] +
+                    mesh_director[2, i]*sample[3]
+                )
+
+    def calculate_continuous_cost_gradient_wrt_director(self, **kwargs):
+        """calculate_continuous_cost_gradient_wrt_director.
+        """
+        pass
+
+    def calculate_discrete_cost_gradient_wrt_position(self, **kwargs):
+        """calculate_discrete_cost_gradient_wrt_position.
+        """
+        pass
+
+    def calculate_discrete_cost_gradient_wrt_director(self, **kwargs):
+        """calculate_discrete_cost_gradient_wrt_director.
+        """
+        pass
@@ -6,8 +6,18 @@ import numpy as np
 
 class Object:  # FIXME: To general name.
     """Object.
+
+    The cost and cost gradient of an object are accumulated into `cost` and
+    `cost_gradient`, which are shared by all objects registered in an
+    Objects. The cost holds the running cost density of every element
+    (continuous) and the terminal cost (discrete), split into the terms
+    related to position and to director. `element_indices` declares the
+    elements an object touches in the continuous and discrete parts (None for
+    all elements), so only those are reset.
     """
 
+    element_indices = dict(continuous=None, discrete=None)
+
     def __init__(self, n_elements, cost_weight=None):
         """__init__.
 
@@ -30,8 +40,24 @@ class Object:  # FIXME: To general name.
         # including running cost, terminal cost (might not just on terminal it should 
         # be extend to any or some specific s as well), running cost gradient and 
         # terminal cost gradient (similarly, should be extended to any or some specific s)
+        # The costs are computed alongside the gradients.
+        self.cost.reset(self.element_indices)
+        self.cost_gradient.reset(self.element_indices)
         self.calculate_cost_gradient(**kwargs)
 
+    def share_cost(self, cost, cost_gradient):
+        """share_cost.
+        Accumulate the cost and cost gradient of this object into cost and
+        cost_gradient.
+
+        Parameters
+        ----------
+        cost : Cost
+        cost_gradient : CostGradient
+        """
+        self.cost = cost
+        self.cost_gradient = cost_gradient
+
     # def calculate_cost(self, **kwargs):
     #     # should return all cost terms including running cost and terminal cost
     #     return NotImplementedError
@@ -71,11 +97,40 @@ class Cost:
         self.continuous = WRT_Pose(n_elements, n_elements, dim=1)
         self.discrete = WRT_Pose(n_elements, n_elements, dim=1)
 
-    def reset(self,):
+    def reset(self, element_indices=None):
         """reset.
+
+        Parameters
+        ----------
+        element_indices : dict
+            Elements to be reset in the continuous and discrete parts,
+            None for all elements.
         """
-        self.continuous.reset()
-        self.discrete.reset()
+        if element_indices is None:
+            element_indices = dict(continuous=None, discrete=None)
+        self.continuous.reset(element_indices['continuous'])
+        self.discrete.reset(element_indices['discrete'])
+
+    def total(self, lengths):
+        """total.
+
+        Parameters
+        ----------
+        lengths : np.ndarray
+            Lengths of the elements the running cost is integrated over.
+
+        Returns
+        -------
+        total_cost : float
+            Running cost integrated along the rod plus terminal cost.
+        """
+        return (
+            np.sum(
+                (self.continuous.wrt_position+self.continuous.wrt_director) *
+                lengths
+            ) +
+            np.sum(self.discrete.wrt_position+self.discrete.wrt_director)
+        )
 
 class CostGradient():
     """CostGradient.
@@ -92,11 +147,19 @@ class CostGradient():
         self.continuous = WRT_Pose(n_elements, n_elements)
         self.discrete = WRT_Pose(n_elements, n_elements)
 
-    def reset(self,):
+    def reset(self, element_indices=None):
         """reset.
+
+        Parameters
+        ----------
+        element_indices : dict
+            Elements to be reset in the continuous and discrete parts,
+            None for all elements.
         """
-        self.continuous.reset()
-        self.discrete.reset()
+        if element_indices is None:
+            element_indices = dict(continuous=None, discrete=None)
+        self.continuous.reset(element_indices['continuous'])
+        self.discrete.reset(element_indices['discrete'])
 
     def add(self, other):
         """add.
@@ -132,11 +195,20 @@ class WRT_Pose():
             self.wrt_position = np.zeros((dim, n_elements_for_position))
             self.wrt_director = np.zeros((dim, n_elements_for_director))
     
-    def reset(self,):
+    def reset(self, element_indices=None):
         """reset.
+
+        Parameters
+        ----------
+        element_indices :
+            Elements to be reset, None for all elements.
         """
-        self.wrt_position *= 0
-        self.wrt_director *= 0
+        if element_indices is None:
+            self.wrt_position *= 0
+            self.wrt_director *= 0
+        else:
+            self.wrt_position[..., element_indices] = 0
+            self.wrt_director[..., element_indices] = 0
     
     def add(self, other):
         """add.
@@ -149,8 +221,32 @@ class WRT_Pose():
         self.wrt_position += other.wrt_position
         self.wrt_director += other.wrt_director
 
+def union_element_indices(element_indices_list, n_elements):
+    """union_element_indices.
+
+    Parameters
+    ----------
+    element_indices_list : list
+        Element indices (None for all elements) of several objects.
+    n_elements : int
+
+    Returns
+    -------
+    element_indices : Union[np.ndarray, None]
+        Sorted non-negative indices touched by any of the objects, None if
+        one of them touches all elements.
+    """
+    if any(indices is None for indices in element_indices_list):
+        return None
+    all_indices = np.arange(n_elements)
+    return np.unique(np.concatenate(
+        [all_indices[indices] for indices in element_indices_list] +
+        [np.zeros(0, dtype=all_indices.dtype)]
+    ))
+
 class Objects(Object): # FIXME: we should be clear on naming.
     """Objects.
+    Registry of objects accumulating into one shared cost gradient.
     """
 
     def __init__(self, objects):
@@ -163,6 +259,38 @@ class Objects(Object): # FIXME: we should be clear on naming.
         """
         Object.__init__(self, objects[0].n_elements)
         self.objects = objects
+        self.register()
+
+    def register(self,):
+        """register.
+        Share the cost and cost gradient with every object and gather the
+        elements they touch.
+        """
+        for obj in self.objects:
+            obj.share_cost(self.cost, self.cost_gradient)
+        self.element_indices = {
+            part: union_element_indices(
+                [obj.element_indices[part] for obj in self.objects],
+                self.n_elements
+            ) for part in ('continuous', 'discrete')
+        }
+
+    def is_registered(self,):
+        return all(
+            obj.cost is self.cost and obj.cost_gradient is self.cost_gradient
+            for obj in self.objects
+        )
+
+    def share_cost(self, cost, cost_gradient):
+        """share_cost.
+
+        Parameters
+        ----------
+        cost : Cost
+        cost_gradient : CostGradient
+        """
+        Object.share_cost(self, cost, cost_gradient)
+        self.register()
     
     def __getitem__(self, key):
         if isinstance(key, slice):
@@ -193,15 +321,17 @@ class Objects(Object): # FIXME: we should be clear on naming.
         self.objects.append(value)
 
     def __call__(self, **kwargs):
-        self.reset()
-        for obj in self.objects:
-            obj(**kwargs)
-            self.cost_gradient.add(obj.cost_gradient)
+        # objects appended, replaced or registered in another Objects
+        # since the last call are (re)registered
+        if not self.is_registered():
+            self.register()
+        Object.__call__(self, **kwargs)
 
     def calculate_cost_gradient(self, **kwargs):
         """calculate_cost_gradient.
         """
-        pass
+        for obj in self.objects:
+            obj.calculate_cost_gradient(**kwargs)
 
     def calculate_continuous_cost_gradient_wrt_position(self, **kwargs):
         """calculate_continuous_cost_gradient_wrt_position.
@@ -0,0 +1,238 @@
+__doc__ = """
+Broad phase for environments with many cylinder obstacles.
+
+CylinderObstacles computes the same continuous cost gradient as the sum of
+its cylinders, but bins the axis-aligned bounding boxes of the cylinders
+into a uniform grid. Each element of the rod only checks the cylinders
+binned in the cells its bounding box (midpoint padded by its radius)
+overlaps, so the cost grows with the number of elements rather than with
+elements times obstacles. The grid is rebuilt when a cylinder is moved
+through update_position or update_director.
+"""
+__all__ = ['ObstacleGrid', 'CylinderObstacles']
+
+import numpy as np
+from numba import njit
+
+from coomm.objects.object import Object
+from coomm.objects.cylinder import (
+    element_values,
+    scalar_value,
+    _add_cylinder_cost_gradient
+)
+
+class ObstacleGrid:
+    """ObstacleGrid.
+    Uniform grid of obstacle bounding boxes in compressed sparse row form:
+    the obstacles binned in cell c are
+    cell_obstacles[cell_start[c]:cell_start[c+1]].
+    """
+
+    def __init__(self, lower, upper, cell_size=None, max_n_cells=2**18):
+        """__init__.
+
+        Parameters
+        ----------
+        lower : np.ndarray
+            shape (n_obstacles, 3), lower corners of the bounding boxes
+        upper : np.ndarray
+            shape (n_obstacles, 3), upper corners of the bounding boxes
+        cell_size : float
+            Edge length of the cells, None for the median size of the
+            bounding boxes.
+        max_n_cells : int
+            The cell size is doubled until the grid has at most this many
+            cells.
+        """
+        if cell_size is None:
+            cell_size = np.median(np.max(upper-lower, axis=1))
+        cell_size = max(float(cell_size), 1e-12)
+        self.origin = lower.min(axis=0)
+        extent = upper.max(axis=0) - self.origin
+        while np.prod(np.floor(extent/cell_size)+1) > max_n_cells:
+            cell_size *= 2
+        self.cell_size = cell_size
+        self.shape = (np.floor(extent/cell_size)+1).astype(np.int64)
+
+        lower_cell = self.cell_index(lower)
+        upper_cell = self.cell_index(upper)
+        cells, obstacles = [], []
+        for obstacle in range(lower.shape[0]):
+            ranges = [
+                np.arange(lower_cell[obstacle, i], upper_cell[obstacle, i]+1)
+                for i in range(3)
+            ]
+            cell = np.ravel_multi_index(
+                np.meshgrid(*ranges, indexing="ij"), self.shape
+            ).ravel()
+            cells.append(cell)
+            obstacles.append(np.full(cell.shape[0], obstacle))
+        cells = np.concatenate(cells)
+        order = np.argsort(cells, kind="stable")
+        self.cell_obstacles = np.concatenate(obstacles)[order]
+        self.cell_start = np.zeros(np.prod(self.shape)+1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(cells, minlength=np.prod(self.shape)),
+            out=self.cell_start[1:]
+        )
+
+    def cell_index(self, points):
+        return np.clip(
+            np.floor((points-self.origin)/self.cell_size).astype(np.int64),
+            0, self.shape-1
+        )
+
+class CylinderObstacles(Object):
+    """CylinderObstacles.
+    """
+
+    element_indices = dict(continuous=None, discrete=[])
+
+    def __init__(self, cylinders, cell_size=None):
+        """__init__.
+
+        Parameters
+        ----------
+        cylinders : list
+            Cylinder obstacles. Their poses are expected to change only
+            through update_position, update_director or
+            update_pose_from_sphere.
+        cell_size : float
+            Edge length of the grid cells, None for the median size of the
+            bounding boxes of the cylinders.
+        """
+        Object.__init__(self, cylinders[0].n_elements)
+        self.cylinders = list(cylinders)
+        self.cell_size = cell_size
+        self.grid = None
+        self.pose_versions = None
+
+    def __len__(self):
+        return len(self.cylinders)
+
+    def is_outdated(self,):
+        return self.pose_versions != [
+            (id(cylinder), cylinder.pose_version) for cylinder in self.cylinders
+        ]
+
+    def build(self,):
+        """build.
+        Gather the cylinders into arrays and bin their bounding boxes.
+        """
+        self.pose_versions = [
+            (id(cylinder), cylinder.pose_version) for cylinder in self.cylinders
+        ]
+        self.obstacle_position = np.array(
+            [cylinder.position for cylinder in self.cylinders], dtype=np.float64
+        )
+        self.obstacle_axis = np.array(
+            [cylinder.director[2, :] for cylinder in self.cylinders],
+            dtype=np.float64
+        )
+        self.obstacle_radius = np.array(
+            [scalar_value(cylinder.radius) for cylinder in self.cylinders]
+        )
+        self.obstacle_length = np.array(
+            [scalar_value(cylinder.length) for cylinder in self.cylinders]
+        )
+        self.obstacle_weight = np.array([
+            element_values(cylinder.cost_weight['position'], self.n_elements)
+            for cylinder in self.cylinders
+        ])
+
+        # bounding box of a cylinder: half of its axis along the length plus
+        # the radius of its caps, sqrt(1-axis_i^2) along each direction
+        half_extent = (
+            np.abs(self.obstacle_axis) * self.obstacle_length[:, None] / 2 +
+            np.sqrt(np.clip(1-self.obstacle_axis**2, 0, 1)) *
+            self.obstacle_radius[:, None]
+        )
+        self.grid = ObstacleGrid(
+            self.obstacle_position - half_extent,
+            self.obstacle_position + half_extent,
+            self.cell_size
+        )
+
+    def calculate_continuous_cost_gradient_wrt_position(self, **kwargs):
+        """calculate_continuous_cost_gradient_wrt_position.
+        """
+        if self.is_outdated():
+            self.build()
+        n_elements = kwargs['position'].shape[1]-1
+        self._calculate_obstacles_cost_gradient_wrt_position(
+            kwargs['position'],
+            element_values(kwargs['radius'], n_elements),
+            self.grid.origin, self.grid.cell_size, self.grid.shape,
+            self.grid.cell_start, self.grid.cell_obstacles,
+            self.obstacle_position, self.obstacle_axis,
+            self.obstacle_radius, self.obstacle_length,
+            self.obstacle_weight,
+            self.cost.continuous.wrt_position,
+            self.cost_gradient.continuous.wrt_position
+        )
+
+    @staticmethod
+    @njit(cache=True)
+    def _calculate_obstacles_cost_gradient_wrt_position(
+        position, radius,
+        origin, cell_size, grid_shape,
+        cell_start, cell_obstacles,
+        obstacle_position, obstacle_axis,
+        obstacle_radius, obstacle_length,
+        obstacle_weight, cost, cost_gradient
+        ):
+        horizontal_position_diff = np.zeros(3)
+        lower_cell = np.zeros(3, dtype=np.int64)
+        upper_cell = np.zeros(3, dtype=np.int64)
+        # last element each obstacle was checked against, so that obstacles
+        # binned in several cells are counted once
+        checked = -np.ones(obstacle_position.shape[0], dtype=np.int64)
+        for k in range(radius.shape[0]):
+            overlap = True
+            for i in range(3):
+                midpoint = 0.5*(position[i, k]+position[i, k+1])
+                lower_cell[i] = max(
+                    np.floor((midpoint-radius[k]-origin[i])/cell_size), 0
+                )
+                upper_cell[i] = min(
+                    np.floor((midpoint+radius[k]-origin[i])/cell_size),
+                    grid_shape[i]-1
+                )
+                if lower_cell[i] > upper_cell[i]:
+                    overlap = False
+            if not overlap:
+                continue
+            for cell_0 in range(lower_cell[0], upper_cell[0]+1):
+                for cell_1 in range(lower_cell[1], upper_cell[1]+1):
+                    for cell_2 in range(lower_cell[2], upper_cell[2]+1):
+                        cell = (cell_0*grid_shape[1]+cell_1)*grid_shape[2]+cell_2
+                        for j in range(cell_start[cell], cell_start[cell+1]):
+                            obstacle = cell_obstacles[j]
+                            if checked[obstacle] == k:
+                                continue
+                            checked[obstacle] = k
+                            _add_cylinder_cost_gradient(
+                                position, k, radius[k],
+                                obstacle_position[obstacle],
+                                obstacle_axis[obstacle],
+                                obstacle_radius[obstacle],
+                                obstacle_length[obstacle],
+                                obstacle_weight[obstacle, k],
+                                horizontal_position_diff, cost,
+                                cost_gradient
+                            )
+
+    def calculate_continuous_cost_gradient_wrt_director(self, **kwargs):
+        """calculate_continuous_cost_gradient_wrt_director.
+        """
+        pass
+
+    def calculate_discrete_cost_gradient_wrt_position(self, **kwargs):
+        """calculate_discrete_cost_gradient_wrt_position.
+        """
+        pass
+
+    def calculate_discrete_cost_gradient_wrt_director(self, **kwargs):
+        """calculate_discrete_cost_gradient_wrt_director.
+        """
+        pass
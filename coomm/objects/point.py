@@ -11,6 +11,8 @@ class Point(Object):
     """Point.
     """
 
+    element_indices = dict(continuous=[], discrete=[])
+
     def __init__(self, position, director, n_elements, cost_weight):
         """__init__.
 
@@ -84,6 +86,8 @@ class PointTarget(Point, Target):
     """PointTarget.
     """
 
+    element_indices = dict(continuous=[], discrete=[-1])
+
     def __init__(self, position, director, n_elements, cost_weight, target_cost_weight, **kwargs):
         """__init__.
 
@@ -138,8 +142,12 @@ class PointTarget(Point, Target):
             kwargs
         """
         position = 0.5*(kwargs['position'][:, -1]+kwargs['position'][:, -2])
-        self.cost_gradient.discrete.wrt_position[:, -1] = (
-            self.target_cost_weight['position'] * (position-self.position)
+        position_diff = position-self.position
+        self.cost.discrete.wrt_position[-1] += (
+            0.5 * self.target_cost_weight['position'] * np.dot(position_diff, position_diff)
+        )
+        self.cost_gradient.discrete.wrt_position[:, -1] += (
+            self.target_cost_weight['position'] * position_diff
         )
     
     def calculate_discrete_cost_gradient_wrt_director(self, **kwargs):
@@ -156,6 +164,10 @@ class PointTarget(Point, Target):
         vector[0] = skew_symmetric_matrix[1, 2]
         vector[1] = -skew_symmetric_matrix[0, 2]
         vector[2] = skew_symmetric_matrix[0, 1]
-        self.cost_gradient.discrete.wrt_director[:, -1] = (
+        # cost 0.5*|director-self.director|^2 = 3-trace(director @ self.director.T)
+        self.cost.discrete.wrt_director[-1] += (
+            self.target_cost_weight['director'] * (3 - np.sum(director * self.director))
+        )
+        self.cost_gradient.discrete.wrt_director[:, -1] += (
             self.target_cost_weight['director'] * director.T @ vector
         )
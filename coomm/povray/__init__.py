@@ -10,5 +10,7 @@ from .rod import *
 from .muscles import *
 from .sphere import *
 from .cylinder import *
+from .declare import *
+from .render_queue import *
 
 from .draw_sucker import *
@@ -0,0 +1,72 @@
+__doc__ = """
+Declare-once static scene objects.
+
+An object whose recorded data does not change across frames (e.g. the
+target of a reach or grasp run) is written once as a `#declare` in a shared
+include, and every frame only references the declared identifier.
+"""
+__all__ = ['POVRAYDeclaredObject', 'is_static']
+
+import io
+import numpy as np
+
+def is_static(*recorded_data):
+    """is_static.
+    Whether every recorded data is the same in all frames.
+
+    Parameters
+    ----------
+    recorded_data :
+        Records of the object, each of shape (n_frames, ...).
+    """
+    for data in recorded_data:
+        data = np.asarray(data)
+        if not np.all(data == data[:1]):
+            return False
+    return True
+
+class POVRAYDeclaredObject:
+    """POVRAYDeclaredObject.
+    """
+
+    def __init__(self, povray_object, identifier):
+        """__init__.
+
+        Parameters
+        ----------
+        povray_object :
+            Object with a write_to method, e.g. POVRAYSphere.
+        identifier : str
+            POV-Ray identifier the object is declared as.
+        """
+        self.povray_object = povray_object
+        self.identifier = identifier
+
+    def declare_to(self, file, **kwargs):
+        """declare_to.
+        Write the declaration of the object, with the data of any frame.
+
+        Parameters
+        ----------
+        file :
+        kwargs :
+            Data passed to the write_to method of the object.
+        """
+        buffer = io.StringIO()
+        self.povray_object.write_to(file=buffer, **kwargs)
+        file.writelines(
+            "#declare %s = object{\n%s}\n\n" % (
+                self.identifier, buffer.getvalue()
+            )
+        )
+
+    def write_to(self, file, **kwargs):
+        """write_to.
+        Reference the declared object. The data is ignored as it is the same
+        in all frames.
+
+        Parameters
+        ----------
+        file :
+        """
+        file.writelines("object{ %s }\n\n" % self.identifier)
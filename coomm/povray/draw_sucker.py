@@ -1,80 +1,124 @@
 import numpy as np
 import math
 
-time_wave = np.sin(np.linspace(0, 100000, 1000000)) * 0.0
-
-
-def draw_sucker(time_step, povray_data_folder, position, director, radius):
-    with open(povray_data_folder + '/frame_sucker%04d.inc' % time_step, 'w') as file_inc:
-
-        string = ""
-
-        # import matplotlib.pyplot as plt
-        # fig = plt.figure()
-        # ax = fig.add_subplot(projection='3d')
-        # ax.plot(position[0, :], position[1, :], position[2, :], 'k:')
-        XX_list = []
-
-        for j in [1,-1]:
-            XX_side = []
-            for k in [10,20,30, 40,50, 60,65,70,75, 80,85,90,92,94,96,98]:
-                Y = 0.5*radius[k] * np.sin(np.linspace(0, 380, 10) / 180 * np.pi)
-                Z = 0.5*radius[k] * np.cos(np.linspace(0, 380, 10) / 180 * np.pi)
-                X = np.zeros_like(Y)
-                circle = [X, Z, Y]
-                # ax.plot(circle[0], circle[1], circle[2], 'g')
-                a = np.dot(director[:, :, k].T, circle)
-
-                ah = (45 * j) / 180 * np.pi
-                Vh = director[2, :, k]
-                surface_direction = director[0, :, k] * radius[k]
-                # ax.plot([position[0, k], position[0, k] + 0.01 * surface_direction[0]],
-                #         [position[1, k], position[1, k] + 0.01 * surface_direction[1]],
-                #         [position[2, k], position[2, k] + 0.01 * surface_direction[2]], 'r')
-                # ax.plot([position[0, k], position[0, k] + 0.01 * Vh[0]],
-                #         [position[1, k], position[1, k] + 0.01 * Vh[1]],
-                #         [position[2, k], position[2, k] + 0.01 * Vh[2]], 'b')
-
-                R = rotation_matrix(Vh, ah)
-                XX = np.dot(R, surface_direction)
-                XX = XX + position[:, k]
-                # ax.plot(XX[0], XX[1], XX[2], 'ro')
-                XX_circle = XX[:, np.newaxis] + np.dot(R, a)
-
-                # ax.plot(XX_circle[0], XX_circle[1], XX_circle[2], 'go')
-
-                XX_side.append(XX_circle.T)
-            XX_list.append(XX_side)
-        # ax.set_xlim(-0.0, 0.2)
-        # ax.set_ylim(-0.1, 0.1)
-        # ax.set_zlim(-0.1, 0.1)
-        # plt.show()
-        # exit()
-        print(np.array(XX_list).shape)
-        # exit()
-        for j in [0,1]:
-            sucker_radius = np.linspace(0.003, 0.0005,len(XX_list[j]))
-            for body_part_index in range(len(XX_list[j])):
-                body_part = XX_list[j][body_part_index]
-                n_elem = len(body_part)
-                string += "sphere_sweep{\n\tb_spline %d" % n_elem
-
-                for n in range(n_elem):
-                    elem = body_part[n]
-                    fake_shift = time_wave[time_step] * n / n_elem * 0.025
-                    string += (",\n\t<%f,%f,%f>,%f" % (elem[0] ,#+ fake_shift * np.sin(time_step / 100),
-                                                       elem[1] ,#+ fake_shift * np.cos(time_step / 100),
-                                                       elem[2] ,#+ fake_shift * np.sin(time_step / 100) * np.cos(n),
-                                                       sucker_radius[body_part_index]))
-                string += "\n\ttexture{\n"
-                string += "\t\tpigment{ color Yellow transmit %f }\n" % 0.0 #rgb < 0.45, 0.39, 1 >
-                string += "\t\tfinish{ phong 1 }\n\t}\n"
-                string += "\tscale<16,16,16>\n}\n"
-
-        file_inc.writelines(
-            string
-        )
-
+from coomm.povray.povray_base import format_rows, escape_format
+from coomm.povray.render_queue import write_if_changed
+
+default_sucker_element_indices = [
+    10, 20, 30, 40, 50, 60, 65, 70, 75, 80, 85, 90, 92, 94, 96, 98
+]
+
+def sucker_string(
+    position, director, radius, element_indices=None,
+    sucker_radius=(0.003, 0.0005), ring_radius_ratio=0.5, side_angle=45,
+    n_nodes=10, color="Yellow", scale=16
+):
+    """sucker_string.
+    POV-Ray text of the suckers of the arm: on each of the two sides of every
+    selected element, a ring tilted by +/-side_angle about the tangent of the
+    element. All rings are computed at once.
+
+    Parameters
+    ----------
+    position :
+        shape (3, n_elements+1)
+    director :
+        shape (3, 3, n_elements)
+    radius :
+        shape (n_elements,)
+    element_indices :
+        Elements carrying a sucker on each side.
+    sucker_radius :
+        Radius of the ring of the first and the last sucker, in between the
+        radius is linearly interpolated.
+    ring_radius_ratio : float
+        Radius of the ring relative to the radius of its element.
+    side_angle : float
+        Angle [deg] of the suckers from the first director.
+    n_nodes : int
+        Number of nodes of each ring.
+    color : str
+    scale : float
+    """
+    element_indices = np.asarray(
+        default_sucker_element_indices if element_indices is None
+        else element_indices
+    )
+    n_suckers = element_indices.shape[0]
+    element_director = director[:, :, element_indices]
+    element_radius = radius[element_indices]
+
+    # rings in the cross section of the elements, shape (n_suckers, 3, n_nodes)
+    angle = np.linspace(0, 380, n_nodes) / 180 * np.pi
+    circle = np.zeros((n_suckers, 3, n_nodes))
+    circle[:, 1, :] = ring_radius_ratio * element_radius[:, None] * np.cos(angle)
+    circle[:, 2, :] = ring_radius_ratio * element_radius[:, None] * np.sin(angle)
+    circle = np.einsum('jik,kjn->kin', element_director, circle)
+
+    # rotations about the tangent of the elements, one per side, shape
+    # (2, n_suckers, 3, 3)
+    rotation = rotation_matrices(
+        element_director[2, :, :].T[None, :, :],
+        (side_angle * np.array([1, -1]) / 180 * np.pi)[:, None]
+    )
+    surface_direction = element_director[0, :, :].T * element_radius[:, None]
+    center = (
+        np.einsum('skij,kj->ski', rotation, surface_direction)
+        + position[:, element_indices].T
+    )
+    nodes = (
+        center[:, :, None, :]
+        + np.einsum('skij,kjn->skni', rotation, circle)
+    )
+
+    node_radius = np.broadcast_to(
+        np.linspace(sucker_radius[0], sucker_radius[1], n_suckers)[None, :, None, None],
+        nodes.shape[:3] + (1,)
+    )
+    sucker_format = (
+        "sphere_sweep{\n\tb_spline " + ("%d" % n_nodes) +
+        ",\n\t<%f,%f,%f>,%f" * n_nodes +
+        "\n\ttexture{\n"
+        "\t\tpigment{ color " + escape_format(color) + " transmit %f }\n"
+        "\t\tfinish{ phong 1 }\n\t}\n"
+        "\tscale<" + ("%g,%g,%g" % (scale, scale, scale)) + ">\n}\n"
+    )
+    return format_rows(
+        sucker_format,
+        np.column_stack([
+            np.concatenate([nodes, node_radius], axis=3).reshape(
+                2 * n_suckers, -1
+            ),
+            np.zeros(2 * n_suckers)
+        ])
+    )
+
+def draw_sucker(time_step, povray_data_folder, position, director, radius, **kwargs):
+    """draw_sucker.
+    Write the suckers of frame time_step into frame_sucker%04d.inc, see
+    sucker_string for the keyword arguments.
+    """
+    write_if_changed(
+        povray_data_folder + '/frame_sucker%04d.inc' % time_step,
+        sucker_string(position, director, radius, **kwargs)
+    )
+
+def rotation_matrices(axis, theta):
+    """rotation_matrices.
+    Batched rotation_matrix: rotation matrices about axis by theta, with
+    axis of shape (..., 3) and theta of shape (...) broadcast together.
+    """
+    axis = axis / np.sqrt(np.sum(axis * axis, axis=-1, keepdims=True))
+    theta = np.asarray(theta)[..., None]
+    a = np.cos(theta / 2.0)[..., 0]
+    b, c, d = np.moveaxis(-axis * np.sin(theta / 2.0), -1, 0)
+    aa, bb, cc, dd = a * a, b * b, c * c, d * d
+    bc, ad, ac, ab, bd, cd = b * c, a * d, a * c, a * b, b * d, c * d
+    return np.stack([
+        np.stack([aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac)], axis=-1),
+        np.stack([2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab)], axis=-1),
+        np.stack([2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc], axis=-1),
+    ], axis=-2)
 
 def rotation_matrix(axis, theta):
     """
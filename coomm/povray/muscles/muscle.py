@@ -5,6 +5,9 @@ Created on Feb. 21, 2021
 
 import numpy as np
 from coomm._rod_tool import _material_to_lab
+from coomm.povray.povray_base import (
+    format_rows, escape_format, lod_indices, lod_profile_indices
+)
 
 class POVRAYMuscle:
     def __init__(self, muscle_color, activation_color):
@@ -16,6 +19,10 @@ class POVRAYSlenderMuscle(POVRAYMuscle):
         muscle_color = kwargs["muscle_color"]
         POVRAYMuscle.__init__(self, muscle_color, kwargs.get("activation_color", muscle_color))
         self.muscle_label = "// muscle data\n"
+        # with a level of detail, the activation is kept within this error
+        self.lod_activation_tolerance = kwargs.get(
+            "lod_activation_tolerance", 0.05
+        )
 
     def write_to(self, file, position_data, director_data, muscle_position_data, radius_data, muscle_activation=None, alpha=1.0):
         position = (position_data[:, :-1]+position_data[:, 1:])/2 
@@ -24,63 +31,52 @@ class POVRAYSlenderMuscle(POVRAYMuscle):
         radius = radius_data.copy()
         n_elements = position.shape[1]
 
-        if muscle_activation is None:
-            muscle_activation = np.ones(n_elements)
+        muscle_activation = (
+            np.ones(n_elements) if muscle_activation is None
+            else np.asarray(muscle_activation)
+        )
 
         start_index = 0
         end_index = n_elements - 2
+        nodes = slice(start_index, end_index)
+        nodes = start_index + lod_indices(
+            np.vstack([position[:, nodes], radius[nodes]]),
+            self.lod_tolerance
+        )
+        if self.lod_tolerance is not None:
+            nodes = np.union1d(nodes, start_index + lod_profile_indices(
+                muscle_activation[start_index:end_index],
+                self.lod_activation_tolerance
+            ))
+        cones = nodes[:-1]
+        next_cones = nodes[1:]
+
+        cone_format = (
+            "\tcone{\n"
+            "\t\t<%f, %f, %f>, %f,\n"
+            "\t\t<%f, %f, %f>, %f\n"
+            "\t\ttexture{\n"
+            "\t\t\tpigment{ color rgb " + escape_format(self.color_string) +
+            " transmit %f }\n"
+            "\t\t\tfinish{ phong 1 }\n"
+            "\t\t}\n"
+            "\t\tscale<1, 1, 1>*" + ("%f" % self.scale) + "\n"
+            "\t}\n"
+        )
+        transmit = self.alpha_to_transmit(
+            alpha*(muscle_activation[cones]+muscle_activation[next_cones])/2
+        )
 
         string = self.muscle_label
         string += "union{\n"
-
-        for n in range(start_index, end_index-1):
-            # string += "\tsphere{\n"
-            # string += "\t\t<%f, %f, %f>, %f\n" % (
-            #     position[0, n],
-            #     position[1, n],
-            #     position[2, n],
-            #     radius[n]
-            # )
-            # string += "\t\ttexture{\n"
-            # string += "\t\t\tpigment{ color rgb " + self.color_string 
-            # string += " transmit %f }\n" % self.alpha_to_transmit(alpha*muscle_activation[n])
-            # string += "\t\t\tfinish{ phong 1 }\n"
-            # string += "\t\t}\n"
-            # string += "\t\tscale<1, 1, 1>*%f\n" % self.scale
-            # string += "\t}\n"
-
-            string += "\tcone{\n"
-            string += "\t\t<%f, %f, %f>, %f,\n" % (
-                position[0, n], position[1, n], position[2, n], radius[n]
-            )
-            string += "\t\t<%f, %f, %f>, %f\n" % (
-                position[0, n+1], position[1, n+1], position[2, n+1], radius[n+1]
-            )
-            string += "\t\ttexture{\n"
-            string += "\t\t\tpigment{ color rgb " + self.color_string 
-            string += " transmit %f }\n" % self.alpha_to_transmit(
-                alpha*(muscle_activation[n]+muscle_activation[n+1])/2
-            )
-            string += "\t\t\tfinish{ phong 1 }\n"
-            string += "\t\t}\n"
-            string += "\t\tscale<1, 1, 1>*%f\n" % self.scale
-            string += "\t}\n"
-
-            # string += "\tsphere{\n"
-            # string += "\t\t<%f, %f, %f>, %f\n" % (
-            #     position[0, n+1],
-            #     position[1, n+1],
-            #     position[2, n+1],
-            #     radius[n+1]
-            # )
-            # string += "\t\ttexture{\n"
-            # string += "\t\t\tpigment{ color rgb " + self.color_string 
-            # string += " transmit %f }\n" % self.alpha_to_transmit(alpha*muscle_activation[n+1])
-            # string += "\t\t\tfinish{ phong 1 }\n"
-            # string += "\t\t}\n"
-            # string += "\t\tscale<1, 1, 1>*%f\n" % self.scale
-            # string += "\t}\n"
-
+        string += format_rows(
+            cone_format,
+            np.column_stack([
+                position[:, cones].T, radius[cones],
+                position[:, next_cones].T, radius[next_cones],
+                transmit
+            ])
+        )
         string += "}\n\n"
 
         file.writelines(string)
@@ -103,33 +99,51 @@ class POVRAYRingMuscle(POVRAYMuscle):
         major_radius = radius_data.copy()
         minor_radius = np.linalg.norm(position_difference, axis=0)
         
-        for n in range(n_elements):
-            minor_radius[n] = np.min([major_radius[n]/2, minor_radius[n]])
-        
-
-        if muscle_activation is None:
-            muscle_activation = np.ones(n_elements)
+        minor_radius = np.minimum(major_radius/2, minor_radius)
+
+        muscle_activation = (
+            np.ones(n_elements) if muscle_activation is None
+            else np.asarray(muscle_activation)
+        )
+
+        # nodes of the ring of every element, shape (n_elements, n_nodes, 3)
+        theta = np.arange(self.n_muscle_nodes+1)/self.n_muscle_nodes*2*np.pi
+        ring_position = (
+            position.T[:, None, :] +
+            (major_radius-minor_radius)[:, None, None] * (
+                np.cos(theta)[None, :, None]*director_data[0, :, :].T[:, None, :] +
+                np.sin(theta)[None, :, None]*director_data[1, :, :].T[:, None, :]
+            )
+        )
+        ring_nodes = np.concatenate([
+            ring_position,
+            np.broadcast_to(
+                minor_radius[:, None, None], ring_position.shape[:2]+(1,)
+            )
+        ], axis=2)
+
+        ring_format = (
+            "sphere_sweep{\n"
+            "\tb_spline " + ("%d" % (self.n_muscle_nodes+1)) +
+            ",\n\t<%f, %f, %f>, %f" * (self.n_muscle_nodes+1) +
+            "\n\ttexture{\n"
+            "\t\tpigment{ color rgb " + escape_format(self.color_string) +
+            " transmit %f }\n"
+            "\t\tfinish{ phong 1 }\n"
+            "\t}\n"
+            "\tscale<1, 1, 1>*" + ("%f" % self.scale) + "\n"
+            "}\n"
+        )
+        rings = slice(0, n_elements-1)
 
         string = self.muscle_label
-        for n in range(n_elements-1):
-            string += "sphere_sweep{\n"
-            string += "\tb_spline %d" % (self.n_muscle_nodes+1)
-            for nn in range(self.n_muscle_nodes+1):
-                theta = nn/self.n_muscle_nodes*2*np.pi
-                position_muscle = position[:, n] + (major_radius[n]-minor_radius[n]) * (
-                    np.cos(theta)*director_data[0, :, n]+np.sin(theta)*director_data[1, :, n]
-                )
-                string += ",\n\t<%f, %f, %f>, %f" % (
-                    position_muscle[0], position_muscle[1], position_muscle[2], minor_radius[n]
-                )
-            string += "\n\ttexture{\n"
-            string += "\t\tpigment{ color rgb " + self.color_string 
-            string += " transmit %f }\n" % self.alpha_to_transmit(alpha*muscle_activation[n])
-            string += "\t\tfinish{ phong 1 }\n"
-            string += "\t}\n"
-            string += "\tscale<1, 1, 1>*%f\n" % self.scale
-            string += "}\n"
-
+        string += format_rows(
+            ring_format,
+            np.column_stack([
+                ring_nodes[rings].reshape(n_elements-1, -1),
+                self.alpha_to_transmit(alpha*muscle_activation[rings])
+            ])
+        )
         string += "\n"
 
         file.writelines(string)
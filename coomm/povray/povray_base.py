@@ -7,15 +7,40 @@ from numba import njit
 import numpy as np
 
 from coomm._rendering_tool import (
-    process_position, process_director
+    process_position, process_director, lod_indices, lod_profile_indices
 )
 
+def format_rows(row_format, values):
+    """format_rows.
+    Format every row of values with row_format in a single formatting
+    operation instead of one per row.
+
+    Parameters
+    ----------
+    row_format : str
+        %-format of one row, e.g. ",\n\t<%f, %f, %f>, %f".
+    values :
+        shape (n_rows, n_fields)
+
+    Returns
+    -------
+    string : str
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return (row_format * values.shape[0]) % tuple(values.ravel().tolist())
+
+def escape_format(string):
+    return string.replace("%", "%%")
+
 class POVRAYBase:
     def __init__(self, **kwargs):
         self.color_string = self.to_color_string(kwargs.get("color", [0.45, 0.39, 1.0]))
         self.scale = kwargs.get("scale", 16)
         self.rotation_matrix = kwargs.get("rotation_matrix", np.eye(3))
         self.offset = kwargs.get("offset", np.zeros(3))
+        # level of detail: None for all elements, otherwise the geometric
+        # error (in the units of position) allowed when dropping elements
+        self.lod_tolerance = kwargs.get("lod_tolerance", None)
     
     @staticmethod
     def alpha_to_transmit(alpha):
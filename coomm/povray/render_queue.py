@@ -0,0 +1,192 @@
+__doc__ = """
+Parallel, resumable rendering of exported POV-Ray frames.
+
+The frames are exported first and then rendered by a pool of concurrent
+povray processes. A frame whose image exists and is newer than its .pov file
+(and the files it includes) is skipped, so an interrupted export can be
+resumed. povray renders into a temporary image which replaces the image of
+the frame only if the render succeeded, so a crashed or killed render never
+leaves a partial image behind. Scene files are written with `write_if_changed`, which keeps the
+modification time of unchanged files.
+"""
+__all__ = ['POVRAYRenderQueue', 'write_if_changed']
+
+import os, subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+default_povray_options = ["-H1080", "-W1080", "Quality=11", "Antialias=on"]
+
+def write_if_changed(file_name, string):
+    """write_if_changed.
+
+    Parameters
+    ----------
+    file_name : str
+    string : str
+        Content of the file.
+
+    Returns
+    -------
+    changed : bool
+        Whether the file was (re)written.
+    """
+    if os.path.exists(file_name):
+        with open(file_name, 'r') as file:
+            if file.read() == string:
+                return False
+    with open(file_name, 'w') as file:
+        file.write(string)
+    return True
+
+class POVRAYRenderQueue:
+    """POVRAYRenderQueue.
+    """
+
+    def __init__(
+        self, povray_options=None, n_workers=None,
+        povray="povray", image_extension=".png"
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        povray_options : list
+            Command line options of povray, e.g. ["-H1080", "-W1080"].
+        n_workers : int
+            Number of concurrent povray processes, None for the number of
+            CPUs. Add "+WT1" to the options to keep each process on one
+            thread.
+        povray : str
+            povray executable.
+        image_extension : str
+            Extension of the rendered images.
+        """
+        self.povray_options = list(
+            default_povray_options if povray_options is None
+            else povray_options
+        )
+        self.n_workers = os.cpu_count() if n_workers is None else n_workers
+        self.povray = povray
+        self.image_extension = image_extension
+        self.jobs = []
+        self.failures = []
+        self.n_skipped = 0
+
+    def image_file_name(self, povray_file_name):
+        return os.path.splitext(povray_file_name)[0] + self.image_extension
+
+    def temporary_image_file_name(self, povray_file_name):
+        return (
+            os.path.splitext(povray_file_name)[0] + ".partial" +
+            self.image_extension
+        )
+
+    def add(self, povray_file_name, included_file_names=()):
+        """add.
+
+        Parameters
+        ----------
+        povray_file_name : str
+            .pov file of the frame.
+        included_file_names :
+            Files included by the .pov file, whose changes also require
+            the frame to be rendered again.
+        """
+        self.jobs.append(
+            (povray_file_name, list(included_file_names))
+        )
+
+    def is_rendered(self, povray_file_name, included_file_names=()):
+        """is_rendered.
+        Whether the image of the frame exists and is newer than the scene
+        files.
+        """
+        image_file_name = self.image_file_name(povray_file_name)
+        if not os.path.exists(image_file_name):
+            return False
+        scene_time = max(
+            os.path.getmtime(file_name)
+            for file_name in [povray_file_name] + list(included_file_names)
+            if os.path.exists(file_name)
+        )
+        return os.path.getmtime(image_file_name) >= scene_time
+
+    def render_frame(self, povray_file_name):
+        """render_frame.
+
+        Returns
+        -------
+        error : Union[str, None]
+            Error message of povray, None if the frame is rendered.
+        """
+        temporary_image_file_name = self.temporary_image_file_name(
+            povray_file_name
+        )
+        cmd = (
+            [self.povray] + self.povray_options + [
+                "Output_File_Name=" + temporary_image_file_name,
+                povray_file_name
+            ]
+        )
+        try:
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                universal_newlines=True
+            )
+        except OSError as error:
+            return str(error)
+        if result.returncode != 0 or not os.path.exists(
+            temporary_image_file_name
+        ):
+            if os.path.exists(temporary_image_file_name):
+                os.remove(temporary_image_file_name)
+            message = result.stderr.strip().splitlines()
+            return "povray exited with status {}{}".format(
+                result.returncode,
+                ": " + message[-1] if len(message) > 0 else ""
+            )
+        os.replace(
+            temporary_image_file_name, self.image_file_name(povray_file_name)
+        )
+        return None
+
+    def run(self,):
+        """run.
+        Render the queued frames which are not rendered yet.
+
+        Yields
+        ------
+        povray_file_name : str
+            Every rendered, skipped or failed frame, in order of
+            completion. Failed frames are collected in failures together
+            with their error message.
+        """
+        jobs, self.jobs = self.jobs, []
+        pending = []
+        for povray_file_name, included_file_names in jobs:
+            if self.is_rendered(povray_file_name, included_file_names):
+                self.n_skipped += 1
+                yield povray_file_name
+            else:
+                pending.append(povray_file_name)
+
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = {
+                executor.submit(self.render_frame, povray_file_name):
+                povray_file_name for povray_file_name in pending
+            }
+            for future in as_completed(futures):
+                error = future.result()
+                if error is not None:
+                    self.failures.append((futures[future], error))
+                yield futures[future]
+
+    def report(self,):
+        """report.
+        Print the number of skipped and failed frames.
+        """
+        print("Skipped {} frames already rendered.".format(self.n_skipped))
+        if len(self.failures) > 0:
+            print("Failed to render {} frames:".format(len(self.failures)))
+            for povray_file_name, error in self.failures:
+                print("  {}: {}".format(povray_file_name, error))
@@ -4,7 +4,7 @@ Created on Feb. 21, 2021
 """
 
 import numpy as np
-from coomm.povray.povray_base import POVRAYBase
+from coomm.povray.povray_base import POVRAYBase, format_rows, lod_indices
 
 class POVRAYRod(POVRAYBase):
     def __init__(self, **kwargs):
@@ -15,12 +15,19 @@ class POVRAYRod(POVRAYBase):
             (position_data[:, :-1]+position_data[:, 1:])/2 
         )
         radius = radius_data
+        indices = lod_indices(
+            np.vstack([position, radius]), self.lod_tolerance, min_points=4
+        )
+        position = position[:, indices]
+        radius = radius[indices]
         n_elements = radius.shape[0]
 
         string = "// rod data\n"
         string += "sphere_sweep{\n\tb_spline %d" % n_elements
-        for n in range(n_elements):
-            string += (",\n\t<%f, %f, %f>, %f" % (position[0, n], position[1, n], position[2, n], radius[n]))
+        string += format_rows(
+            ",\n\t<%f, %f, %f>, %f",
+            np.column_stack([position.T, radius])
+        )
         string += "\n\ttexture{\n"
         string += "\t\tpigment{ color rgb" + self.color_string + " transmit %f }\n" % self.alpha_to_transmit(alpha)
         string += "\t\tfinish{ phong 1 }\n\t}\n"
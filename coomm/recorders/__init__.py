@@ -0,0 +1,6 @@
+from .recorder import *
+from .codec import *
+from .storage import *
+from .reader import *
+from .writer import *
+from .policy import *
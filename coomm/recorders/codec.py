@@ -0,0 +1,251 @@
+__doc__ = """
+Compact quantized encoding of recorded chunks.
+
+Positions are stored as fixed-point integers: the first record of a chunk is
+kept as a keyframe and the following records as differences of consecutive
+quantized records, which are small and compress well. As the differences are
+taken between quantized values, decoding does not accumulate rounding errors:
+every decoded position is within half the resolution of the recorded one.
+
+Directors are stored as unit quaternions quantized to int16, which reproduces
+every entry of the director matrices within `director_tolerance`.
+
+Other floating point keys (velocities, strains, loads, muscle data, ...) are
+stored as fixed-point deltas as well, with a quantization step relative to
+the largest magnitude of the chunk, `relative_resolution`. Time keys are left
+to the raw format, as their steps may be finer than any relative resolution.
+
+Non-finite entries (e.g. of a diverged run) are not quantized: they are
+flagged in a finiteness mask and stored as they are, so that they decode to
+the same NaN or inf. Chunks which cannot be encoded within the tolerance are
+left to the raw format.
+"""
+__all__ = ['encode_chunk', 'decode_chunk', 'director_tolerance']
+
+import numpy as np
+
+quaternion_scale = np.iinfo(np.int16).max
+director_tolerance = 2.0e-4
+# largest quantized position, which keeps the deltas exact in int64
+max_quantized_position = 2.0**52
+
+def smallest_integer_dtype(array):
+    """smallest_integer_dtype.
+    Narrowest signed integer type holding all entries of array.
+    """
+    bound = np.abs(array).max() if array.size > 0 else 0
+    for dtype in (np.int8, np.int16, np.int32):
+        if bound <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def mask_nonfinite(array, mask):
+    """mask_nonfinite.
+
+    Parameters
+    ----------
+    array : np.ndarray
+    mask : np.ndarray
+        Entries of array stored as they are, shape of array.
+
+    Returns
+    -------
+    array : np.ndarray
+        Copy of array with the masked entries set to zero.
+    masked : dict
+        Mask and values of the masked entries to be saved with the chunk,
+        empty if no entry is masked.
+    """
+    if not mask.any():
+        return array, {}
+    masked = dict(nonfinite=mask, nonfinite_values=array[mask])
+    array = array.copy()
+    array[mask] = 0
+    return array, masked
+
+def encode_positions(array, resolution):
+    array, masked = mask_nonfinite(array, ~np.isfinite(array))
+    if array.size > 0 and np.abs(array).max() / resolution > max_quantized_position:
+        # out of the range of fixed-point integers, keep them as they are
+        return None
+    quantized = np.round(array / resolution).astype(np.int64)
+    delta = np.diff(quantized, axis=0)
+    return dict(
+        keyframe=quantized[0],
+        delta=delta.astype(smallest_integer_dtype(delta)),
+        resolution=np.array(resolution),
+        **masked
+    )
+
+def decode_positions(encoded):
+    quantized = np.concatenate([
+        encoded['keyframe'][None, ...],
+        encoded['keyframe'][None, ...] +
+        np.cumsum(encoded['delta'].astype(np.int64), axis=0)
+    ])
+    return quantized * encoded['resolution']
+
+def directors_to_quaternions(directors):
+    """directors_to_quaternions.
+
+    Parameters
+    ----------
+    directors : np.ndarray
+        shape (n, 3, 3, n_elements)
+
+    Returns
+    -------
+    quaternions : np.ndarray
+        shape (n, 4, n_elements), with non-negative scalar part
+    """
+    R = np.moveaxis(directors, (1, 2), (-2, -1))
+    R00, R01, R02 = R[..., 0, 0], R[..., 0, 1], R[..., 0, 2]
+    R10, R11, R12 = R[..., 1, 0], R[..., 1, 1], R[..., 1, 2]
+    R20, R21, R22 = R[..., 2, 0], R[..., 2, 1], R[..., 2, 2]
+
+    # Shepperd's method: divide by the largest component for stability
+    squares = np.stack([
+        1 + R00 + R11 + R22,
+        1 + R00 - R11 - R22,
+        1 - R00 + R11 - R22,
+        1 - R00 - R11 + R22,
+    ]) / 4
+    largest = np.argmax(squares, axis=0)
+    root = np.sqrt(np.maximum(np.max(squares, axis=0), 0.0))
+    quarter = 1 / (4 * root)
+    candidates = np.stack([
+        [root, (R21-R12)*quarter, (R02-R20)*quarter, (R10-R01)*quarter],
+        [(R21-R12)*quarter, root, (R01+R10)*quarter, (R02+R20)*quarter],
+        [(R02-R20)*quarter, (R01+R10)*quarter, root, (R12+R21)*quarter],
+        [(R10-R01)*quarter, (R02+R20)*quarter, (R12+R21)*quarter, root],
+    ])
+    quaternions = np.take_along_axis(
+        candidates, largest[None, None, ...], axis=0
+    )[0]
+    quaternions *= np.where(quaternions[0] < 0, -1.0, 1.0)
+    return np.moveaxis(quaternions, 0, 1)
+
+def quaternions_to_directors(quaternions):
+    """quaternions_to_directors.
+
+    Parameters
+    ----------
+    quaternions : np.ndarray
+        shape (n, 4, n_elements)
+
+    Returns
+    -------
+    directors : np.ndarray
+        shape (n, 3, 3, n_elements)
+    """
+    quaternions = quaternions / np.linalg.norm(
+        quaternions, axis=1, keepdims=True
+    )
+    w, x, y, z = np.moveaxis(quaternions, 1, 0)
+    directors = np.stack([
+        np.stack([1-2*(y*y+z*z), 2*(x*y-z*w), 2*(x*z+y*w)], axis=1),
+        np.stack([2*(x*y+z*w), 1-2*(x*x+z*z), 2*(y*z-x*w)], axis=1),
+        np.stack([2*(x*z-y*w), 2*(y*z+x*w), 1-2*(x*x+y*y)], axis=1),
+    ], axis=1)
+    return directors
+
+def encode_directors(array):
+    # directors with a non-finite entry are stored as they are and encoded
+    # as the identity
+    nonfinite = np.broadcast_to(
+        ~np.isfinite(array).all(axis=(1, 2), keepdims=True), array.shape
+    )
+    array, masked = mask_nonfinite(array, nonfinite)
+    if masked:
+        array[nonfinite] = np.broadcast_to(
+            np.eye(3)[None, :, :, None], array.shape
+        )[nonfinite]
+    quaternions = np.round(
+        directors_to_quaternions(array) * quaternion_scale
+    ).astype(np.int16)
+    encoded = dict(quaternion=quaternions)
+    if np.abs(decode_directors(encoded) - array).max() > director_tolerance:
+        # not rotation matrices, keep them as they are
+        return None
+    encoded.update(masked)
+    return encoded
+
+def decode_directors(encoded):
+    return quaternions_to_directors(
+        encoded['quaternion'].astype(np.float64) / quaternion_scale
+    )
+
+def encode_chunk(key, array, position_resolution, relative_resolution=None):
+    """encode_chunk.
+
+    Parameters
+    ----------
+    key : str
+        Name of the recorded key. Keys ending with "position" are encoded as
+        fixed-point deltas and "director" keys as quaternions.
+    array : np.ndarray
+        Records of the chunk, shape (n, ...).
+    position_resolution : float
+        Quantization step of the positions.
+    relative_resolution : Union[float, None]
+        Quantization step of the other floating point keys relative to the
+        largest magnitude of the chunk, None to leave them to the raw format.
+
+    Returns
+    -------
+    encoded : Union[dict, None]
+        Arrays to be saved for the chunk, or None when the key is not
+        encoded.
+    """
+    array = np.asarray(array)
+    if array.dtype.kind != 'f' or array.shape[0] == 0:
+        return None
+    if key.endswith("position"):
+        encoded = encode_positions(array, position_resolution)
+        if encoded is None:
+            return None
+        encoded['codec'] = np.array("position")
+    elif key == "director" and array.ndim == 4 and array.shape[1:3] == (3, 3):
+        encoded = encode_directors(array)
+        if encoded is None:
+            return None
+        encoded['codec'] = np.array("director")
+    elif relative_resolution is not None and not key.endswith("time"):
+        finite = array[np.isfinite(array)]
+        scale = np.abs(finite).max() if finite.size > 0 else 0.0
+        encoded = encode_positions(
+            array, relative_resolution * (scale if scale > 0 else 1.0)
+        )
+        if encoded is None:
+            return None
+        encoded['codec'] = np.array("fixed")
+    else:
+        return None
+    encoded['shape'] = np.array(array.shape)
+    return encoded
+
+def decode_chunk(encoded):
+    """decode_chunk.
+
+    Parameters
+    ----------
+    encoded :
+        Arrays saved for the chunk, e.g. an opened .npz file.
+
+    Returns
+    -------
+    array : np.ndarray
+        Records of the chunk, shape (n, ...).
+    """
+    if 'codec' not in encoded:
+        return encoded['data']
+    codec = str(encoded['codec'])
+    if codec in ("position", "fixed"):
+        array = decode_positions(encoded)
+    elif codec == "director":
+        array = decode_directors(encoded)
+    else:
+        raise ValueError(f"unknown chunk codec {codec}")
+    if 'nonfinite' in encoded:
+        array[encoded['nonfinite']] = encoded['nonfinite_values']
+    return array
@@ -0,0 +1,157 @@
+__doc__ = """
+Adaptive recording policy and playback interpolation.
+
+Instead of recording every `step_skip` steps, a callback given an
+AdaptiveRecording records when one of the watched quantities (e.g. the
+position of a rod, the activation of a muscle or an external load) changed by
+more than its threshold since the last record. Records are at least
+`min_step_skip` and at most `max_step_skip` steps apart, so quiescent phases
+are sampled sparsely and fast transients densely. Recorded times are stored
+with the data so that playback can interpolate to a fixed frame rate.
+"""
+__all__ = ['AdaptiveRecording', 'interpolate_records', 'resample_records']
+
+import copy
+import numpy as np
+
+class AdaptiveRecording:
+    """AdaptiveRecording.
+    """
+
+    def __init__(
+        self, thresholds: dict, min_step_skip: int = 1,
+        max_step_skip: int = None
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        thresholds : dict
+            Attribute name of the recorded object to the threshold on the
+            maximum absolute change of the attribute since the last record,
+            e.g. dict(position_collection=1e-4, activation=1e-2).
+            Attributes the recorded object does not have are ignored.
+        min_step_skip : int
+            Minimum number of steps between two records.
+        max_step_skip : int
+            Maximum number of steps between two records, None for no limit.
+        """
+        self.thresholds = thresholds
+        self.min_step_skip = min_step_skip
+        self.max_step_skip = max_step_skip
+        self.last_step = None
+        self.last_values = {}
+
+    def new(self,):
+        """new.
+        Policy with the same settings and no record yet, as every callback
+        needs its own.
+        """
+        return AdaptiveRecording(
+            self.thresholds, self.min_step_skip, self.max_step_skip
+        )
+
+    def watched_values(self, objects):
+        return {
+            name: [getattr(obj, name) for obj in objects if hasattr(obj, name)]
+            for name in self.thresholds
+        }
+
+    def changed(self, objects):
+        """changed.
+        Whether a watched attribute changed by more than its threshold.
+        """
+        for name, values in self.watched_values(objects).items():
+            for value, last_value in zip(values, self.last_values[name]):
+                if np.max(np.abs(value - last_value)) > self.thresholds[name]:
+                    return True
+        return False
+
+    def __call__(self, current_step: int, *objects) -> bool:
+        """__call__.
+
+        Parameters
+        ----------
+        current_step : int
+        objects :
+            Objects whose attributes are watched, e.g. a rod or actuations.
+
+        Returns
+        -------
+        record : bool
+            Whether to record at current_step.
+        """
+        if self.last_step is not None:
+            step_skip = current_step - self.last_step
+            if step_skip < self.min_step_skip:
+                return False
+            if (
+                self.max_step_skip is None or step_skip < self.max_step_skip
+            ) and not self.changed(objects):
+                return False
+        self.last_step = current_step
+        self.last_values = copy.deepcopy(self.watched_values(objects))
+        return True
+
+def interpolate_records(time, records, query_time):
+    """interpolate_records.
+
+    Linear interpolation of records taken at (irregular) times.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        shape (n,), increasing
+    records : np.ndarray
+        shape (n, ...)
+    query_time : np.ndarray
+        shape (m,)
+
+    Returns
+    -------
+    records : np.ndarray
+        shape (m, ...)
+    """
+    time = np.asarray(time, dtype=np.float64)
+    records = np.asarray(records)
+    query_time = np.asarray(query_time, dtype=np.float64)
+    if time.shape[0] == 1:
+        return np.repeat(records, query_time.shape[0], axis=0)
+    index = np.clip(
+        np.searchsorted(time, query_time, side="right") - 1,
+        0, time.shape[0] - 2
+    )
+    weight = np.clip(
+        (query_time - time[index]) / (time[index+1] - time[index]), 0, 1
+    ).reshape((-1,) + (1,) * (records.ndim - 1))
+    return records[index] * (1 - weight) + records[index+1] * weight
+
+def resample_records(callback_params, query_time):
+    """resample_records.
+
+    Interpolate every numeric key of callback_params recorded alongside its
+    "time" key, e.g. to play an adaptively recorded run at a fixed frame rate.
+    Directors are interpolated entry-wise, which is accurate only for small
+    rotations between records.
+
+    Parameters
+    ----------
+    callback_params : dict
+    query_time : np.ndarray
+
+    Returns
+    -------
+    resampled : dict
+    """
+    time = np.asarray(callback_params["time"])
+    resampled = dict(time=np.asarray(query_time))
+    for key, value in callback_params.items():
+        if key == "time" or not hasattr(value, "__len__"):
+            continue
+        if len(value) != time.shape[0]:
+            continue
+        array = np.asarray(value)
+        if array.dtype.kind not in 'iuf':
+            continue
+        resampled[key] = interpolate_records(time, array, query_time)
+    return resampled
@@ -0,0 +1,184 @@
+__doc__ = """
+Lazy reader of recorded runs.
+
+Runs streamed into a ChunkedStorage folder are opened without loading any
+record: each key becomes a RecordedColumn whose chunks are memory-mapped on
+demand, so frames can be accessed randomly or iterated with a stride while
+only one chunk per key is held open.
+"""
+__all__ = [
+    'RecordedColumn', 'RecordedGroup', 'open_trajectory', 'load_recorded_data'
+]
+
+import os, json, pickle
+import numpy as np
+
+from coomm.recorders.storage import attributes_file_name, read_chunk_shape
+from coomm.recorders.codec import decode_chunk
+
+class RecordedColumn:
+    """RecordedColumn.
+    Read-only, list-like view of the records of one key.
+    """
+
+    def __init__(self, folder_name):
+        """__init__.
+
+        Parameters
+        ----------
+        folder_name : str
+            Folder holding the chunk files of the key.
+        """
+        self.folder_name = folder_name
+        self.chunk_files = sorted(
+            os.path.join(folder_name, name)
+            for name in os.listdir(folder_name)
+            if name.startswith("chunk_") and not name.endswith(".tmp")
+        )
+        chunk_lengths = [
+            read_chunk_shape(chunk_file)[0] for chunk_file in self.chunk_files
+        ]
+        self.offsets = np.insert(np.cumsum(chunk_lengths), 0, 0)
+        self.cached_index = None
+        self.cached_chunk = None
+
+    def load_chunk(self, chunk_index):
+        """load_chunk.
+        Memory-map (or decompress and decode) a chunk, keeping the last one
+        open.
+        """
+        if chunk_index != self.cached_index:
+            chunk_file = self.chunk_files[chunk_index]
+            if chunk_file.endswith(".npz"):
+                with np.load(chunk_file) as data:
+                    self.cached_chunk = decode_chunk(data)
+            else:
+                self.cached_chunk = np.load(chunk_file, mmap_mode="r")
+            self.cached_index = chunk_index
+        return self.cached_chunk
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return np.array([self[k] for k in range(*key.indices(len(self)))])
+        if key < 0:
+            key += len(self)
+        if not (0 <= key < len(self)):
+            raise IndexError(
+                f"record {key} is out of range for {len(self)} records"
+            )
+        chunk_index = np.searchsorted(self.offsets, key, side="right") - 1
+        return self.load_chunk(chunk_index)[key - self.offsets[chunk_index]]
+
+    def __iter__(self):
+        return self.frames()
+
+    def frames(self, start=0, stop=None, step=1):
+        """frames.
+        Iterate over the records from start to stop with a stride of step.
+        """
+        for k in range(*slice(start, stop, step).indices(len(self))):
+            yield self[k]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(
+            np.concatenate([
+                self.load_chunk(i) for i in range(len(self.chunk_files))
+            ]) if len(self.chunk_files) > 0 else np.empty(0),
+            dtype=dtype
+        )
+
+class RecordedGroup(dict):
+    """RecordedGroup.
+    Dict of the keys (RecordedColumn), nested groups (RecordedGroup) and lists
+    of nested groups recorded under one folder.
+    """
+
+    def __init__(self, folder_name):
+        """__init__.
+
+        Parameters
+        ----------
+        folder_name : str
+        """
+        dict.__init__(self)
+        self.folder_name = folder_name
+        for name in sorted(os.listdir(folder_name)):
+            path = os.path.join(folder_name, name)
+            if os.path.isdir(path):
+                self[name] = open_entry(path)
+
+    def frames(self, start=0, stop=None, step=1):
+        """frames.
+        Iterate over the frames of the keys of this group.
+
+        Yields
+        ------
+        k : int
+            Record index.
+        frame : dict
+            Record k of every key of the group.
+        """
+        columns = {
+            key: value for key, value in self.items()
+            if isinstance(value, RecordedColumn)
+        }
+        n_records = min(len(column) for column in columns.values())
+        for k in range(*slice(start, stop, step).indices(n_records)):
+            yield k, {key: column[k] for key, column in columns.items()}
+
+def is_column_folder(folder_name):
+    return any(
+        name.startswith("chunk_") for name in os.listdir(folder_name)
+    )
+
+def open_entry(folder_name):
+    if is_column_folder(folder_name):
+        return RecordedColumn(folder_name)
+    names = [
+        name for name in os.listdir(folder_name)
+        if os.path.isdir(os.path.join(folder_name, name))
+    ]
+    if len(names) > 0 and all(name.isdigit() for name in names):
+        return [
+            open_entry(os.path.join(folder_name, name))
+            for name in sorted(names, key=int)
+        ]
+    return RecordedGroup(folder_name)
+
+def open_trajectory(folder_name):
+    """open_trajectory.
+    Open a run recorded in a ChunkedStorage folder. The returned group has the
+    same layout as the data pickled by ArmEnvironment.save_data, with the
+    attributes of the run (e.g. recording_fps) as additional entries.
+
+    Parameters
+    ----------
+    folder_name : str
+
+    Returns
+    -------
+    trajectory : RecordedGroup
+    """
+    trajectory = RecordedGroup(folder_name)
+    attributes_file = os.path.join(folder_name, attributes_file_name)
+    if os.path.exists(attributes_file):
+        with open(attributes_file, "r") as f:
+            trajectory.update(json.load(f))
+    return trajectory
+
+def load_recorded_data(filename):
+    """load_recorded_data.
+    Open filename_data as a lazily read trajectory if the run was streamed
+    into a storage folder, otherwise load filename_data.pickle.
+
+    Parameters
+    ----------
+    filename : str
+    """
+    if os.path.isdir(filename+"_data"):
+        return open_trajectory(filename+"_data")
+    with open(filename+"_data.pickle", "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,257 @@
+__doc__ = """
+Preallocated columnar recorder for callback data.
+"""
+__all__ = [
+    'RecordColumn', 'Recorder',
+    'number_of_records', 'record', 'new_callback_params', 'to_arrays',
+    'record_lengths', 'truncate_records',
+]
+
+from collections import defaultdict
+import numpy as np
+
+def number_of_records(total_steps: int, step_skip: int) -> int:
+    """number_of_records.
+
+    Number of records a callback takes when it records at step 0 and then
+    every `step_skip` steps of a run with `total_steps` steps.
+
+    Parameters
+    ----------
+    total_steps : int
+    step_skip : int
+    """
+    return total_steps // step_skip + 1
+
+class RecordColumn:
+    """RecordColumn.
+    Contiguous (n_records, ...) buffer holding the history of one callback key.
+    It keeps the list interface (append, len, indexing, iteration) but every
+    record is written in place into the next slot of the buffer.
+    """
+
+    def __init__(self, n_records: int):
+        """__init__.
+
+        Parameters
+        ----------
+        n_records : int
+            Number of records the buffer is sized for. The buffer is allocated
+            on the first append, once the shape of a record is known.
+        """
+        self.n_records = n_records
+        self.count = 0
+        self.buffer = None
+
+    def allocate(self, value):
+        """allocate.
+
+        Parameters
+        ----------
+        value :
+            First record. Its shape and dtype define the buffer.
+        """
+        value = np.asarray(value)
+        dtype = value.dtype if value.dtype.kind in 'biufc' else object
+        self.buffer = np.empty(
+            (max(self.n_records, 1),) + value.shape, dtype=dtype
+        )
+
+    def grow(self,):
+        """grow.
+        Double the buffer when more records than expected are appended.
+        """
+        self.buffer = np.concatenate(
+            [self.buffer, np.empty_like(self.buffer)]
+        )
+
+    def append(self, value):
+        """append.
+
+        Parameters
+        ----------
+        value :
+            Record to be copied into the next slot.
+        """
+        if self.buffer is None:
+            self.allocate(value)
+        if self.count == self.buffer.shape[0]:
+            self.grow()
+        self.buffer[self.count] = value
+        self.count += 1
+
+    @property
+    def data(self):
+        """data.
+        View of the recorded part of the buffer.
+        """
+        if self.buffer is None:
+            return np.empty(0)
+        return self.buffer[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.data, dtype=dtype)
+
+    def truncate(self, n_records: int):
+        """truncate.
+        Drop the records after the first n_records.
+        """
+        self.count = min(self.count, n_records)
+
+    def __getstate__(self):
+        # only the recorded part of the buffer is worth pickling
+        state = self.__dict__.copy()
+        state['buffer'] = None if self.buffer is None else self.data.copy()
+        return state
+
+class Recorder(dict):
+    """Recorder.
+    Drop-in replacement of `defaultdict(list)` for callback_params. Missing
+    keys create a RecordColumn sized for `n_records` records.
+    """
+
+    def __init__(self, n_records: int):
+        """__init__.
+
+        Parameters
+        ----------
+        n_records : int
+        """
+        dict.__init__(self)
+        self.n_records = n_records
+
+    def __missing__(self, key):
+        column = RecordColumn(self.n_records)
+        self[key] = column
+        return column
+
+    def new_recorder(self, name):
+        """new_recorder.
+        Empty recorder of the same size, used for nested callback_params.
+
+        Parameters
+        ----------
+        name : str
+            Name of the nested recorder relative to this one.
+        """
+        return Recorder(self.n_records)
+
+    def to_dict(self,):
+        """to_dict.
+        Convert the recorder into a plain dict of (n_records, ...) arrays.
+        """
+        return {key: to_arrays(value) for key, value in self.items()}
+
+def record(callback_params, key, value):
+    """record.
+
+    Store `value` under `key` of `callback_params`. List storage keeps
+    references, so arrays are copied before being appended; a RecordColumn
+    copies the value into its buffer by itself.
+
+    Parameters
+    ----------
+    callback_params : Union[defaultdict(list), Recorder]
+    key : str
+    value :
+    """
+    column = callback_params[key]
+    if isinstance(column, list) and isinstance(value, (np.ndarray, list)):
+        value = value.copy()
+    column.append(value)
+
+def new_callback_params(callback_params, name):
+    """new_callback_params.
+
+    Empty callback_params of the same kind as the given one.
+
+    Parameters
+    ----------
+    callback_params : Union[defaultdict(list), Recorder]
+    name : str
+        Name of the new callback_params relative to the given one.
+    """
+    if isinstance(callback_params, Recorder):
+        return callback_params.new_recorder(name)
+    return defaultdict(list)
+
+def to_arrays(callback_params):
+    """to_arrays.
+
+    Replace recorders and record columns in (nested) callback_params with
+    plain dicts and arrays. List storage is returned untouched.
+
+    Parameters
+    ----------
+    callback_params :
+    """
+    if isinstance(callback_params, Recorder):
+        return callback_params.to_dict()
+    if isinstance(callback_params, RecordColumn):
+        return callback_params.data
+    if isinstance(callback_params, list):
+        return [to_arrays(value) for value in callback_params]
+    return callback_params
+
+def is_nested(callback_params):
+    """is_nested.
+    Whether callback_params is a dict or a (nested) list of dicts, rather
+    than the records of one key.
+    """
+    if isinstance(callback_params, dict):
+        return True
+    return isinstance(callback_params, list) and len(callback_params) > 0 and all(
+        is_nested(value) for value in callback_params
+    )
+
+def record_lengths(callback_params):
+    """record_lengths.
+
+    Number of records of every key of (nested) callback_params, used as the
+    recording cursor of a checkpoint.
+
+    Parameters
+    ----------
+    callback_params :
+    """
+    callback_params = getattr(callback_params, 'target', callback_params)
+    if isinstance(callback_params, dict):
+        return {
+            key: record_lengths(value)
+            for key, value in callback_params.items()
+        }
+    if is_nested(callback_params):
+        return [record_lengths(value) for value in callback_params]
+    return len(callback_params)
+
+def truncate_records(callback_params, lengths):
+    """truncate_records.
+
+    Drop the records taken after a checkpoint.
+
+    Parameters
+    ----------
+    callback_params :
+    lengths :
+        Output of record_lengths at the checkpoint.
+    """
+    callback_params = getattr(callback_params, 'target', callback_params)
+    if isinstance(lengths, dict):
+        for key, value in lengths.items():
+            truncate_records(callback_params[key], value)
+    elif isinstance(lengths, list):
+        for value, sub_lengths in zip(callback_params, lengths):
+            truncate_records(value, sub_lengths)
+    elif isinstance(callback_params, list):
+        del callback_params[lengths:]
+    else:
+        callback_params.truncate(lengths)
@@ -0,0 +1,388 @@
+__doc__ = """
+Chunked on-disk storage that callbacks stream their records into.
+
+Layout of a storage folder::
+
+    folder_name/
+        attributes.json
+        systems/0/position/chunk_00000.npy
+        systems/0/position/chunk_00001.npy
+        muscle_groups/0/muscles/0/activation/chunk_00000.npy
+        ...
+
+Every leaf directory is one recorded key; its chunks hold consecutive
+(n, ...) slices of the time axis. Directories named by integers stand for the
+entries of a list. Chunks are written to a temporary file and renamed, so a
+crashed run leaves every chunk that was written readable. With quantize,
+positions and directors are written as compressed chunks in the compact
+encoding of coomm.recorders.codec, and the other keys are compressed.
+"""
+__all__ = ['ChunkedStorage', 'StreamColumn', 'StreamRecorder']
+
+import os, json, shutil, zipfile
+import numpy as np
+
+from coomm.recorders.recorder import RecordColumn, Recorder, to_arrays
+from coomm.recorders.codec import encode_chunk, decode_chunk
+
+attributes_file_name = "attributes.json"
+chunk_file_name = "chunk_{:05d}"
+
+def to_savable_array(value):
+    """to_savable_array.
+    Arrays of python objects (e.g. muscle info strings) are converted to a
+    native dtype so that chunks can be saved and memory-mapped without pickle.
+    """
+    array = np.asarray(value)
+    if array.dtype == object:
+        array = np.array(array.tolist())
+    return array
+
+def read_chunk_shape(file_name):
+    """read_chunk_shape.
+    Shape of a chunk read from its header only.
+    """
+    if file_name.endswith(".npz"):
+        with zipfile.ZipFile(file_name) as zip_file:
+            if "shape.npy" in zip_file.namelist():
+                # encoded chunk, see coomm.recorders.codec
+                with zip_file.open("shape.npy") as shape_file:
+                    return tuple(np.lib.format.read_array(shape_file))
+            with zip_file.open("data.npy") as chunk_file:
+                version = np.lib.format.read_magic(chunk_file)
+                shape, _, _ = np.lib.format._read_array_header(
+                    chunk_file, version
+                )
+        return shape
+    return np.load(file_name, mmap_mode="r").shape
+
+def read_chunk(file_name):
+    """read_chunk.
+    Load (and decode) all records of a chunk.
+    """
+    if file_name.endswith(".npz"):
+        with np.load(file_name) as data:
+            return decode_chunk(data)
+    return np.load(file_name)
+
+class ChunkedStorage:
+    """ChunkedStorage.
+    """
+
+    def __init__(
+        self, folder_name, chunk_size=64, compress=False, mode="w",
+        quantize=False, position_resolution=1.0e-6,
+        relative_resolution=1.0e-6
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        folder_name : str
+        chunk_size : int
+            Number of records buffered in memory per key before a chunk is
+            written to disk.
+        compress : bool
+            Write chunks as compressed .npz instead of .npy files.
+            Compressed chunks cannot be memory-mapped when read back.
+        mode : str
+            "w" cleans up an existing folder, "a" keeps it and appends to
+            the records already written (e.g. to resume a run).
+        quantize : bool
+            Write positions and the other floating point keys as fixed-point
+            deltas and directors as int16 quaternions. All chunks are then
+            compressed.
+        position_resolution : float
+            Quantization step of the positions. Decoded positions are within
+            half of it of the recorded ones.
+        relative_resolution : float
+            Quantization step of the other floating point keys relative to
+            the largest magnitude of each chunk, None to compress them
+            without loss.
+        """
+        self.folder_name = folder_name
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.quantize = quantize
+        self.position_resolution = position_resolution
+        self.relative_resolution = relative_resolution
+        self.recorders = []
+        self.attributes = dict(
+            chunk_size=chunk_size,
+            compress=compress,
+            quantize=quantize,
+            position_resolution=position_resolution,
+            relative_resolution=relative_resolution,
+            complete=False,
+        )
+
+        if mode == "w" and os.path.exists(folder_name):
+            print('Clean up files in: {}/'.format(folder_name))
+            shutil.rmtree(folder_name)
+        attributes_file = os.path.join(folder_name, attributes_file_name)
+        if mode == "a" and os.path.exists(attributes_file):
+            with open(attributes_file, "r") as f:
+                self.attributes = dict(json.load(f), **self.attributes)
+        os.makedirs(folder_name, exist_ok=True)
+        self.write_attributes()
+
+    def recorder(self, group):
+        """recorder.
+
+        Parameters
+        ----------
+        group : str
+            Path of the recorder inside the storage, e.g. "systems/0".
+
+        Returns
+        -------
+        recorder : StreamRecorder
+        """
+        recorder = StreamRecorder(self, group)
+        self.recorders.append(recorder)
+        return recorder
+
+    def column_folder(self, path):
+        return os.path.join(self.folder_name, *path.split("/"))
+
+    def chunk_files(self, path):
+        """chunk_files.
+        Sorted chunk files already written for the key at path.
+        """
+        folder = self.column_folder(path)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if name.startswith("chunk_") and not name.endswith(".tmp")
+        )
+
+    def n_chunks(self, path):
+        """n_chunks.
+        Number of chunks already written for the key at path.
+        """
+        return len(self.chunk_files(path))
+
+    def n_written(self, path):
+        """n_written.
+        Number of records already written for the key at path.
+        """
+        return sum(
+            read_chunk_shape(file_name)[0]
+            for file_name in self.chunk_files(path)
+        )
+
+    def truncate(self, path, n_records):
+        """truncate.
+        Drop the records written after the first n_records of the key at
+        path, e.g. when a run is resumed from a checkpoint.
+
+        Parameters
+        ----------
+        path : str
+        n_records : int
+        """
+        n_written = 0
+        for chunk_index, file_name in enumerate(self.chunk_files(path)):
+            length = read_chunk_shape(file_name)[0]
+            if n_written >= n_records:
+                os.remove(file_name)
+            elif n_written + length > n_records:
+                array = read_chunk(file_name)[:n_records - n_written]
+                os.remove(file_name)
+                self.write_chunk(path, chunk_index, array)
+            n_written += length
+
+    def write_chunk(self, path, chunk_index, array):
+        """write_chunk.
+
+        Parameters
+        ----------
+        path : str
+        chunk_index : int
+        array : np.ndarray
+            Records of the chunk, shape (n, ...).
+        """
+        folder = self.column_folder(path)
+        os.makedirs(folder, exist_ok=True)
+        array = to_savable_array(array)
+        encoded = encode_chunk(
+            path.split("/")[-1], array,
+            self.position_resolution, self.relative_resolution
+        ) if self.quantize else None
+        file_name = os.path.join(
+            folder,
+            chunk_file_name.format(chunk_index) +
+            (".npz" if self.compress or self.quantize else ".npy")
+        )
+        temporary_file_name = file_name + ".tmp"
+        with open(temporary_file_name, "wb") as chunk_file:
+            if encoded is not None:
+                np.savez_compressed(chunk_file, **encoded)
+            elif self.compress or self.quantize:
+                np.savez_compressed(chunk_file, data=array)
+            else:
+                np.save(chunk_file, array)
+            chunk_file.flush()
+            os.fsync(chunk_file.fileno())
+        os.replace(temporary_file_name, file_name)
+
+    def write(self, group, value):
+        """write.
+        Write data held in memory (recorders, dicts of lists/arrays, lists of
+        those) under group in a single chunk per key.
+
+        Parameters
+        ----------
+        group : str
+        value :
+        """
+        if isinstance(value, StreamRecorder):
+            value.flush()
+        elif isinstance(value, dict):
+            for key, sub_value in value.items():
+                self.write(group + "/" + str(key), sub_value)
+        elif isinstance(value, list) and len(value) > 0 and all(
+            isinstance(sub_value, dict) for sub_value in value
+        ):
+            for index, sub_value in enumerate(value):
+                self.write(group + "/" + str(index), sub_value)
+        else:
+            self.write_chunk(
+                group, self.n_chunks(group), to_arrays(value)
+            )
+
+    def set_attributes(self, **attributes):
+        """set_attributes.
+
+        Parameters
+        ----------
+        attributes :
+            Json serializable meta data of the run, e.g. recording_fps.
+        """
+        self.attributes.update(attributes)
+        self.write_attributes()
+
+    def write_attributes(self,):
+        file_name = os.path.join(self.folder_name, attributes_file_name)
+        with open(file_name + ".tmp", "w") as attributes_file:
+            json.dump(self.attributes, attributes_file, indent=4)
+        os.replace(file_name + ".tmp", file_name)
+
+    def flush(self,):
+        """flush.
+        Write all buffered records to disk.
+        """
+        for recorder in self.recorders:
+            recorder.flush()
+
+    def close(self, **attributes):
+        """close.
+
+        Parameters
+        ----------
+        attributes :
+            Json serializable meta data of the run, e.g. recording_fps.
+        """
+        self.flush()
+        self.set_attributes(complete=True, **attributes)
+
+class StreamColumn(RecordColumn):
+    """StreamColumn.
+    RecordColumn holding one chunk of records. Once the chunk is full, it is
+    written to the storage and the buffer is reused for the next chunk.
+    """
+
+    def __init__(self, storage: ChunkedStorage, path: str):
+        """__init__.
+
+        Parameters
+        ----------
+        storage : ChunkedStorage
+        path : str
+        """
+        RecordColumn.__init__(self, storage.chunk_size)
+        self.storage = storage
+        self.path = path
+        self.chunk_index = storage.n_chunks(path)
+        self.n_written = storage.n_written(path)
+
+    def append(self, value):
+        """append.
+
+        Parameters
+        ----------
+        value :
+        """
+        RecordColumn.append(self, value)
+        if self.count == self.n_records:
+            self.flush()
+
+    def flush(self,):
+        """flush.
+        Write the buffered records as a chunk.
+        """
+        if self.count == 0:
+            return
+        self.storage.write_chunk(self.path, self.chunk_index, self.data)
+        self.chunk_index += 1
+        self.n_written += self.count
+        self.count = 0
+
+    def truncate(self, n_records: int):
+        """truncate.
+        Drop the records after the first n_records, on disk included.
+        """
+        if n_records >= self.n_written:
+            self.count = min(self.count, n_records - self.n_written)
+            return
+        self.count = 0
+        self.storage.truncate(self.path, n_records)
+        self.chunk_index = self.storage.n_chunks(self.path)
+        self.n_written = n_records
+
+    def __len__(self):
+        return self.n_written + self.count
+
+class StreamRecorder(Recorder):
+    """StreamRecorder.
+    Recorder whose columns stream their records into a ChunkedStorage.
+    """
+
+    def __init__(self, storage: ChunkedStorage, group: str):
+        """__init__.
+
+        Parameters
+        ----------
+        storage : ChunkedStorage
+        group : str
+        """
+        Recorder.__init__(self, storage.chunk_size)
+        self.storage = storage
+        self.group = group
+
+    def __missing__(self, key):
+        column = StreamColumn(self.storage, self.group + "/" + str(key))
+        self[key] = column
+        return column
+
+    def new_recorder(self, name):
+        """new_recorder.
+
+        Parameters
+        ----------
+        name : str
+            Path of the nested recorder relative to this one.
+        """
+        return StreamRecorder(self.storage, self.group + "/" + name)
+
+    def flush(self,):
+        """flush.
+        """
+        for value in self.values():
+            if isinstance(value, (StreamColumn, StreamRecorder)):
+                value.flush()
+            elif isinstance(value, list):
+                for sub_value in value:
+                    if isinstance(sub_value, StreamRecorder):
+                        sub_value.flush()
@@ -0,0 +1,202 @@
+__doc__ = """
+Background writer that takes recording off the integrator thread.
+
+Callbacks record into an AsyncRecorder as usual. Each record is copied once
+into a preallocated ring buffer slot of its column and queued; a background
+thread drains the queue into the wrapped callback_params (list, Recorder or
+StreamRecorder), which is where the conversion and writing to storage happen.
+When all slots of a column are pending, or the queue is full, the integrator
+waits for the writer (back-pressure), so memory use stays bounded.
+"""
+__all__ = ['BackgroundWriter', 'AsyncRecorder', 'AsyncColumn']
+
+import queue, threading
+import numpy as np
+
+from coomm.recorders.recorder import Recorder, record, new_callback_params, to_arrays
+
+class BackgroundWriter:
+    """BackgroundWriter.
+    """
+
+    def __init__(self, n_slots=16, max_pending=256):
+        """__init__.
+
+        Parameters
+        ----------
+        n_slots : int
+            Size of the ring buffer of each recorded key.
+        max_pending : int
+            Maximum number of records waiting in the queue.
+        """
+        self.n_slots = n_slots
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def recorder(self, callback_params):
+        """recorder.
+
+        Parameters
+        ----------
+        callback_params : Union[defaultdict(list), Recorder]
+            Storage the records are written into by the background thread.
+
+        Returns
+        -------
+        recorder : AsyncRecorder
+        """
+        return AsyncRecorder(self, callback_params)
+
+    def run(self,):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                column, index = item
+                if self.error is None:
+                    record(column.target, column.key, column.buffer[index])
+            except Exception as error:
+                self.error = error
+            finally:
+                if item is not None:
+                    column.free_slots.release()
+                self.queue.task_done()
+
+    def put(self, column, index):
+        self.check_error()
+        if not self.thread.is_alive():
+            raise RuntimeError("background writer is closed")
+        self.queue.put((column, index))
+
+    def check_error(self,):
+        if self.error is not None:
+            raise RuntimeError(
+                "background writer failed while recording"
+            ) from self.error
+
+    def flush(self,):
+        """flush.
+        Wait until every queued record is written.
+        """
+        self.queue.join()
+        self.check_error()
+
+    def close(self,):
+        """close.
+        Flush and stop the background thread. Call it once the recording is
+        done, as the daemon thread would otherwise be stopped at interpreter
+        exit with records still queued.
+        """
+        if self.thread.is_alive():
+            self.flush()
+            self.queue.put(None)
+            self.thread.join()
+
+class AsyncColumn:
+    """AsyncColumn.
+    Ring buffer of one recorded key.
+    """
+
+    def __init__(self, writer: BackgroundWriter, target, key):
+        """__init__.
+
+        Parameters
+        ----------
+        writer : BackgroundWriter
+        target : Union[defaultdict(list), Recorder]
+        key : str
+        """
+        self.writer = writer
+        self.target = target
+        self.key = key
+        self.buffer = None
+        self.head = 0
+        self.free_slots = threading.Semaphore(writer.n_slots)
+
+    def append(self, value):
+        """append.
+
+        Parameters
+        ----------
+        value :
+            Record to be copied into the next free slot and queued.
+        """
+        if self.buffer is None:
+            array = np.asarray(value)
+            dtype = array.dtype if array.dtype.kind in 'biufc' else object
+            self.buffer = np.empty(
+                (self.writer.n_slots,) + array.shape, dtype=dtype
+            )
+        self.free_slots.acquire()
+        self.buffer[self.head] = value
+        self.writer.put(self, self.head)
+        self.head = (self.head + 1) % self.writer.n_slots
+
+    def __len__(self):
+        self.writer.flush()
+        return len(self.target[self.key])
+
+    def __getitem__(self, key):
+        self.writer.flush()
+        return self.target[self.key][key]
+
+class AsyncRecorder(Recorder):
+    """AsyncRecorder.
+    callback_params that hands its records over to a BackgroundWriter.
+    """
+
+    def __init__(self, writer: BackgroundWriter, target):
+        """__init__.
+
+        Parameters
+        ----------
+        writer : BackgroundWriter
+        target : Union[defaultdict(list), Recorder]
+        """
+        Recorder.__init__(self, writer.n_slots)
+        self.writer = writer
+        self.target = target
+
+    def __missing__(self, key):
+        column = AsyncColumn(self.writer, self.target, key)
+        dict.__setitem__(self, key, column)
+        return column
+
+    def __setitem__(self, key, value):
+        # nested callback_params (e.g. the muscles of a muscle group) are
+        # mirrored into the target so that it holds the whole tree
+        dict.__setitem__(self, key, value)
+        if isinstance(value, AsyncRecorder):
+            self.target[key] = value.target
+        elif isinstance(value, list):
+            self.target[key] = [
+                sub_value.target if isinstance(sub_value, AsyncRecorder)
+                else sub_value for sub_value in value
+            ]
+
+    def new_recorder(self, name):
+        """new_recorder.
+
+        Parameters
+        ----------
+        name : str
+            Path of the nested recorder relative to this one.
+        """
+        return AsyncRecorder(
+            self.writer, new_callback_params(self.target, name)
+        )
+
+    def to_dict(self,):
+        """to_dict.
+        Wait for the writer and convert the target into plain arrays.
+        """
+        self.writer.flush()
+        return to_arrays(self.target)
+
+    def __reduce__(self):
+        # the writer thread cannot be pickled, the recorded data is
+        self.writer.flush()
+        return (to_arrays, (self.target,))
@@ -0,0 +1,241 @@
+__doc__ = """
+Parallel, restartable runs of simulation scenarios.
+
+A scenario is a dict of parameters (e.g. the target position, the muscle
+stresses, the damping and the final time) with a unique "name". Each scenario
+is run in a worker process calling `run(scenario, filename)`, which writes
+its output files starting with filename and returns a dict of summary metrics
+(e.g. the final tip error, the solve time and a NaN flag). Every scenario gets
+a fresh worker process, so no state of a simulator leaks into the next one
+and a worker dying (e.g. killed for its memory) only fails its own scenario.
+
+The metrics of a completed scenario are written to `name_summary.json` in the
+output folder; scenarios with such a file are skipped, so an interrupted batch
+can be resumed. A failed scenario is written to `name_failed.json` instead and
+run again by the next batch. The summaries of all completed and failed
+scenarios are collected into one summary CSV, with a "failed" column.
+"""
+__all__ = [
+    'load_scenarios', 'run_scenarios',
+    'is_completed', 'read_summaries', 'write_summary_csv'
+]
+
+import os, csv, json, time, traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+summary_file_name = "{}_summary.json"
+failed_file_name = "{}_failed.json"
+
+def load_scenarios(file_name):
+    """load_scenarios.
+
+    Parameters
+    ----------
+    file_name : str
+        JSON file holding a list of scenarios. Scenarios without a "name"
+        are named by their index, e.g. scenario_0003.
+
+    Returns
+    -------
+    scenarios : list
+    """
+    with open(file_name, 'r') as file:
+        scenarios = json.load(file)
+    scenarios = [
+        dict(dict(name="scenario_{:04d}".format(k)), **scenario)
+        for k, scenario in enumerate(scenarios)
+    ]
+    names = [scenario["name"] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError(
+            "scenario names in {} must be unique".format(file_name)
+        )
+    return scenarios
+
+def is_completed(output_folder, name):
+    """is_completed.
+    Whether the scenario has written its summary.
+    """
+    return os.path.exists(
+        os.path.join(output_folder, summary_file_name.format(name))
+    )
+
+def read_summaries(output_folder, scenarios):
+    """read_summaries.
+
+    Returns
+    -------
+    summaries : list
+        Summary of every completed scenario, or the parameters and the
+        error of the last failure of a scenario that has not completed,
+        in the order of scenarios.
+    """
+    summaries = []
+    for scenario in scenarios:
+        for file_name in (summary_file_name, failed_file_name):
+            file_name = os.path.join(
+                output_folder, file_name.format(scenario["name"])
+            )
+            if os.path.exists(file_name):
+                with open(file_name, 'r') as file:
+                    summaries.append(json.load(file))
+                break
+    return summaries
+
+def csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def write_summary_csv(file_name, summaries):
+    """write_summary_csv.
+
+    Parameters
+    ----------
+    file_name : str
+    summaries : list
+        Dicts of the scenario parameters and metrics, one row each. The
+        columns are the union of their keys; lists are written as JSON.
+    """
+    columns = []
+    for summary in summaries:
+        columns += [key for key in summary if key not in columns]
+    with open(file_name+".tmp", 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        for summary in summaries:
+            writer.writerow(
+                {key: csv_value(value) for key, value in summary.items()}
+            )
+    os.replace(file_name+".tmp", file_name)
+
+def write_json(file_name, data):
+    with open(file_name+".tmp", 'w') as file:
+        json.dump(data, file, indent=2, default=float)
+    os.replace(file_name+".tmp", file_name)
+
+def record_failure(output_folder, scenario, error):
+    """record_failure.
+    Write the scenario and the last line of its error to name_failed.json.
+    """
+    write_json(
+        os.path.join(output_folder, failed_file_name.format(scenario["name"])),
+        dict(scenario, failed=True, error=error.strip().splitlines()[-1]),
+    )
+
+def run_scenario(run, output_folder, scenario):
+    name = scenario["name"]
+    parameters = {key: value for key, value in scenario.items() if key != "name"}
+    start_time = time.perf_counter()
+    try:
+        metrics = run(parameters, os.path.join(output_folder, name))
+    except Exception:
+        error = traceback.format_exc()
+        record_failure(output_folder, scenario, error)
+        return name, None, error
+    summary = dict(
+        scenario,
+        **(metrics if metrics is not None else {}),
+        failed=False,
+        run_time=time.perf_counter()-start_time,
+    )
+    write_json(
+        os.path.join(output_folder, summary_file_name.format(name)), summary
+    )
+    failed_file = os.path.join(output_folder, failed_file_name.format(name))
+    if os.path.exists(failed_file):
+        os.remove(failed_file)
+    return name, summary, None
+
+def run_in_processes(job, scenarios, output_folder, n_workers):
+    # one single worker executor per scenario, so that every scenario runs
+    # in a fresh process and a dying worker only breaks its own executor
+    scenarios = iter(scenarios)
+    running = {}
+    try:
+        while True:
+            while len(running) < n_workers:
+                scenario = next(scenarios, None)
+                if scenario is None:
+                    break
+                executor = ProcessPoolExecutor(max_workers=1)
+                running[executor.submit(job, scenario)] = (executor, scenario)
+            if len(running) == 0:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                executor, scenario = running.pop(future)
+                executor.shutdown(wait=True)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    error = (
+                        "BrokenProcessPool: the worker process of scenario "
+                        "{} terminated abruptly".format(scenario["name"])
+                    )
+                    record_failure(output_folder, scenario, error)
+                    yield scenario["name"], None, error
+    finally:
+        for executor, _ in running.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def run_scenarios(
+    run, scenarios, output_folder, n_workers=None,
+    summary_csv="summary.csv"
+):
+    """run_scenarios.
+
+    Parameters
+    ----------
+    run :
+        Picklable callable run(parameters, filename) (e.g. a module level
+        function) running one scenario, whose parameters are the scenario
+        without its name. It saves its output files starting with filename
+        and returns a dict of summary metrics. Exceptions and workers dying
+        are reported, recorded as failed and the scenario is run again by
+        the next call.
+    scenarios : list
+        Scenarios, see load_scenarios.
+    output_folder : str
+        Folder of the output files, the summaries and the summary CSV.
+    n_workers : int
+        Number of processes, None for the number of CPUs and 1 to run the
+        scenarios one after the other in the calling process.
+    summary_csv : str
+        Name of the summary CSV in output_folder, rewritten after every
+        completed or failed scenario.
+
+    Yields
+    ------
+    name : str
+        Name of every scenario, in order of completion.
+    summary : Union[dict, None]
+        Parameters and metrics of the scenario (with its run_time), None if
+        it failed.
+    error : Union[str, None]
+        Traceback of the failure, None if it completed. Skipped scenarios,
+        which completed in an earlier call, are not yielded.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    pending = [
+        scenario for scenario in scenarios
+        if not is_completed(output_folder, scenario["name"])
+    ]
+    csv_file_name = os.path.join(output_folder, summary_csv)
+    write_summary_csv(csv_file_name, read_summaries(output_folder, scenarios))
+
+    job = partial(run_scenario, run, output_folder)
+    if n_workers == 1:
+        results = map(job, pending)
+    else:
+        results = run_in_processes(
+            job, pending, output_folder,
+            os.cpu_count() if n_workers is None else n_workers
+        )
+    for name, summary, error in results:
+        write_summary_csv(
+            csv_file_name, read_summaries(output_folder, scenarios)
+        )
+        yield name, summary, error
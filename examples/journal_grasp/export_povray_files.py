@@ -3,14 +3,20 @@ Created on Dec. 20, 2021
 @author: Heng-Sheng (Hanson) Chang
 """
 
-import pickle
+import io
 import numpy as np
 from tqdm import tqdm
 
+from coomm.recorders import load_recorded_data
 from coomm._rendering_tool import check_folder
 from coomm.povray import (
     POVRAYFrame,
     POVRAYCamera,
+    POVRAYRenderQueue,
+    POVRAYDeclaredObject,
+    is_static,
+    write_if_changed,
+    draw_sucker,
 )
 from coomm.povray.rod import POVRAYRod
 from coomm.povray.muscles import (
@@ -21,21 +27,20 @@ from coomm.povray.muscles import (
 from coomm.povray.cylinder import POVRAYCylinder
 
 
-def main(filename):
+def main(filename, n_workers=None, resume=False):
     with_sucker=bool(int(input("print sucker? 0: no 1: yes")))
     if with_sucker:
         rod_alpha=1.0
     else:
         rod_alpha=0.3
-    with open(filename+"_data.pickle", "rb") as f:
-        data = pickle.load(f)
-        rod_data = data['systems'][0]
-        cylinder_data = data['systems'][1]
-        muscle_groups_data = data['muscle_groups']
-        
+    data = load_recorded_data(filename)
+    rod_data = data['systems'][0]
+    cylinder_data = data['systems'][1]
+    muscle_groups_data = data['muscle_groups']
+    
     
     povray_data_folder = filename+"_povray"
-    check_folder(povray_data_folder)
+    check_folder(povray_data_folder, clean=not resume)
 
     povray_camera = POVRAYCamera(
         position=[1.5, -5.0, 0.6],
@@ -49,6 +54,7 @@ def main(filename):
         povray_frame = POVRAYFrame(
             included_files=[
                 povray_data_folder+"/camera.inc",
+                povray_data_folder+"/static.inc",
                 povray_data_folder+"/frame0000.inc",
                 povray_data_folder+"/frame_sucker0000.inc",
             ]
@@ -57,6 +63,7 @@ def main(filename):
         povray_frame = POVRAYFrame(
             included_files=[
                 povray_data_folder + "/camera.inc",
+                povray_data_folder + "/static.inc",
                 povray_data_folder + "/frame0000.inc",
             ]
         )
@@ -65,87 +72,117 @@ def main(filename):
     povray_LM = POVRAYLongitudinalMuscle(muscle_color=np.array([1, 0, 0]))
     povray_OM = POVRAYObliqueMuscle(muscle_color=np.array([0, 1, 1]))
     povray_target = POVRAYCylinder(color=np.array([1.0, 0.498039,0.0]))
+    target_data = dict(
+        position_data=cylinder_data["position"],
+        director_data=cylinder_data["director"],
+        height_data=cylinder_data["height"],
+        radius_data=cylinder_data["radius"],
+    )
 
+    # unchanged files are not rewritten, so that rendered frames are kept
     print("Exporting povray files and frames ...")
     frame_camera_name = "camera.inc"
-    with open(povray_data_folder+'/'+frame_camera_name, 'w') as file_camera:
-        povray_camera.write_to(file_camera)
+    file_camera = io.StringIO()
+    povray_camera.write_to(file_camera)
+    write_if_changed(
+        povray_data_folder+'/'+frame_camera_name, file_camera.getvalue()
+    )
+
+    # objects which do not move are declared once and referenced by frames
+    file_static = io.StringIO()
+    if is_static(*target_data.values()):
+        povray_target = POVRAYDeclaredObject(povray_target, "Target")
+        povray_target.declare_to(
+            file=file_static,
+            **{key: value[0] for key, value in target_data.items()},
+            alpha=1.0
+        )
+    write_if_changed(
+        povray_data_folder+'/static.inc', file_static.getvalue()
+    )
+
+    render_queue = POVRAYRenderQueue(
+        povray_options=["-H1080", "-W1080", "Quality=11", "Antialias=on"],
+        n_workers=n_workers
+    )
 
     
     for k in tqdm(range(len(rod_data["time"]))):
         plot_flag = False
         frame_inc_name = "frame%04d.inc" % k
         frame_sucker_inc_name = "frame_sucker%04d.inc" % k
-        with open(povray_data_folder+'/'+frame_inc_name, 'w') as file_inc:
-            povray_rod.write_to(
-                file=file_inc,
-                position_data=rod_data["position"][k],
-                radius_data=rod_data["radius"][k]*1.1,
-                alpha=rod_alpha
-            )
-            if not with_sucker:
-                for muscle_group_data in muscle_groups_data:
-                    for muscle_data in muscle_group_data['muscles']:
-                        modified_activation = (0.5*(1-np.cos(np.pi*muscle_data['activation'][k]))+0.01)/1.01
-                        if 'TM' in muscle_data['muscle_info'][k]:
-                            povray_TM.write_to(
-                                file=file_inc,
-                                position_data=rod_data["position"][k],
-                                director_data=rod_data["director"][k],
-                                muscle_position_data=muscle_data['muscle_position'][k],
-                                radius_data=rod_data["radius"][k]*(0.0045/0.012),
-                                muscle_activation=modified_activation,
-                                alpha=1.0
-                            )
-                        if 'LM' in muscle_data['muscle_info'][k]:
-                            povray_LM.write_to(
-                                file=file_inc,
-                                position_data=rod_data["position"][k],
-                                director_data=rod_data["director"][k],
-                                muscle_position_data=muscle_data['muscle_position'][k],
-                                radius_data=rod_data["radius"][k]*(0.003/0.012),
-                                muscle_activation=modified_activation,
-                                alpha=1.0
-                            )
-                        if 'OM' in muscle_data['muscle_info'][k]:
-                            povray_OM.write_to(
-                                file=file_inc,
-                                position_data=rod_data["position"][k],
-                                director_data=rod_data["director"][k],
-                                muscle_position_data=muscle_data['muscle_position'][k],
-                                radius_data=rod_data["radius"][k]*(0.00075/0.012)*0.8,
-                                muscle_activation=modified_activation,
-                                alpha=1.0
-                            )
-
-            povray_target.write_to(
-                file=file_inc,
-                position_data=cylinder_data["position"][k],
-                director_data=cylinder_data["director"][k],
-                height_data=cylinder_data["height"][k],
-                radius_data=cylinder_data["radius"][k],
-                alpha=1.0
-            )
+        file_inc = io.StringIO()
+        povray_rod.write_to(
+            file=file_inc,
+            position_data=rod_data["position"][k],
+            radius_data=rod_data["radius"][k]*1.1,
+            alpha=rod_alpha
+        )
+        if not with_sucker:
+            for muscle_group_data in muscle_groups_data:
+                for muscle_data in muscle_group_data['muscles']:
+                    modified_activation = (0.5*(1-np.cos(np.pi*muscle_data['activation'][k]))+0.01)/1.01
+                    if 'TM' in muscle_data['muscle_info'][k]:
+                        povray_TM.write_to(
+                            file=file_inc,
+                            position_data=rod_data["position"][k],
+                            director_data=rod_data["director"][k],
+                            muscle_position_data=muscle_data['muscle_position'][k],
+                            radius_data=rod_data["radius"][k]*(0.0045/0.012),
+                            muscle_activation=modified_activation,
+                            alpha=1.0
+                        )
+                    if 'LM' in muscle_data['muscle_info'][k]:
+                        povray_LM.write_to(
+                            file=file_inc,
+                            position_data=rod_data["position"][k],
+                            director_data=rod_data["director"][k],
+                            muscle_position_data=muscle_data['muscle_position'][k],
+                            radius_data=rod_data["radius"][k]*(0.003/0.012),
+                            muscle_activation=modified_activation,
+                            alpha=1.0
+                        )
+                    if 'OM' in muscle_data['muscle_info'][k]:
+                        povray_OM.write_to(
+                            file=file_inc,
+                            position_data=rod_data["position"][k],
+                            director_data=rod_data["director"][k],
+                            muscle_position_data=muscle_data['muscle_position'][k],
+                            radius_data=rod_data["radius"][k]*(0.00075/0.012)*0.8,
+                            muscle_activation=modified_activation,
+                            alpha=1.0
+                        )
+
+        povray_target.write_to(
+            file=file_inc,
+            **{key: value[k] for key, value in target_data.items()},
+            alpha=1.0
+        )
+
+        write_if_changed(
+            povray_data_folder+'/'+frame_inc_name, file_inc.getvalue()
+        )
 
         if with_sucker:
             draw_sucker(k,povray_data_folder,rod_data["position"][k],rod_data["director"][k],rod_data["radius"][k])
 
         frame_povray_name = "frame%04d.pov" % k
-        povray_frame.included_files[1] = povray_data_folder+'/'+frame_inc_name
+        povray_frame.included_files[2] = povray_data_folder+'/'+frame_inc_name
         if with_sucker:
-            povray_frame.included_files[2] = povray_data_folder+'/'+frame_sucker_inc_name
-        with open(povray_data_folder+'/'+frame_povray_name, 'w') as file_frame:
-            povray_frame.write_included_files_to(file_frame)
-
+            povray_frame.included_files[3] = povray_data_folder+'/'+frame_sucker_inc_name
+        file_frame = io.StringIO()
+        povray_frame.write_included_files_to(file_frame)
         povray_frame_file_name = povray_data_folder+'/'+frame_povray_name
-        import subprocess
-        # subprocess.run(["povray", "-H400", "-W600", "Quality=11", "Antialias=on", povray_frame_file_name])
-        subprocess.run(["povray", "-H1080", "-W1080", "Quality=11", "Antialias=on", povray_frame_file_name])
-        # subprocess.run(["povray", "-H2100", "-W3150", "Quality=11", "Antialias=on", povray_frame_file_name])
-        # subprocess.run(["povray", "-H480", "-W480", "Quality=11", "Antialias=on", povray_frame_file_name])
-        # subprocess.run(["povray", "-H960", "-W960", "Quality=11", "Antialias=on", povray_frame_file_name])
-        # subprocess.run(["povray", "-H1920", "-W1920", "Quality=11", "Antialias=on", povray_frame_file_name])
-        # subprocess.run(["povray", "-H3840", "-W3840", "Quality=11", "Antialias=on", povray_frame_file_name])
+        write_if_changed(povray_frame_file_name, file_frame.getvalue())
+        render_queue.add(
+            povray_frame_file_name,
+            included_file_names=povray_frame.included_files
+        )
+
+    print("Rendering frames ...")
+    for _ in tqdm(render_queue.run(), total=len(render_queue.jobs)):
+        pass
+    render_queue.report()
 
 
 if __name__ == "__main__":
@@ -157,5 +194,16 @@ if __name__ == "__main__":
         '--filename', type=str, default='simulation',
         help='a str: data file name',
     )
+    parser.add_argument(
+        '--n_workers', type=int, default=None,
+        help='an int: number of concurrent povray processes',
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='keep the frames of an interrupted run and render the rest',
+    )
     args = parser.parse_args()
-    main(filename=args.filename)
+    main(
+        filename=args.filename, n_workers=args.n_workers,
+        resume=args.resume
+    )
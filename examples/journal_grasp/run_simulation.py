@@ -13,6 +13,7 @@ from tqdm import tqdm
 from coomm.objects import CylinderTarget
 from coomm.algorithms import ForwardBackwardMuscle
 from coomm.callback_func import AlgorithmMuscleCallBack
+from coomm.recorders import ChunkedStorage
 
 from set_environment import Environment
 # from plot_frames import Frame
@@ -64,11 +65,16 @@ def get_algo(rod, muscles, target):
     # target.director_collection[:, :, 0] = director.copy()
     return algo
 
-def main(filename, target_position=None, target_director=None):
+def main(filename, target_position=None, target_director=None, stream=False, quantize=False):
 
     """ Create simulation environment """
     final_time = 15.001
-    env = Environment(final_time)
+    env = Environment(
+        final_time,
+        storage=ChunkedStorage(
+            filename+"_data", quantize=quantize
+        ) if stream or quantize else None
+    )
     total_steps, systems = env.reset()
     controller_Hz = 500
     controller_step_skip = int(1.0 / (controller_Hz * env.time_step))
@@ -128,5 +134,13 @@ if __name__ == "__main__":
         '--filename', type=str, default='simulation',
         help='a str: data file name',
     )
+    parser.add_argument(
+        '--stream', action='store_true',
+        help='stream the recorded data into the chunked folder filename_data',
+    )
+    parser.add_argument(
+        '--quantize', action='store_true',
+        help='stream the recorded data in the compact quantized format',
+    )
     args = parser.parse_args()
-    main(filename=args.filename)
+    main(filename=args.filename, stream=args.stream, quantize=args.quantize)
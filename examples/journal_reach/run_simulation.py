@@ -3,12 +3,15 @@ Created on Sep. 23, 2021
 @author: Heng-Sheng (Hanson) Chang
 """
 
+import time as timer
 import numpy as np
 from tqdm import tqdm
 
 from coomm.algorithms import ForwardBackwardMuscle
 from coomm.objects import PointTarget
 from coomm.callback_func import AlgorithmMuscleCallBack
+from coomm.recorders import ChunkedStorage
+from coomm.scenarios import load_scenarios, run_scenarios
 
 from examples.journal_reach.set_environment import Environment
 
@@ -48,14 +51,28 @@ def get_algo(rod, muscles, target):
     target.director_collection[:, :, 0] = director.copy()
     return algo
 
-def main(filename, target_position=None):
+def main(
+    filename, target_position=None, stream=False, quantize=False, tracking=False,
+    final_time=15.001, damp_coefficient=0.05, max_muscle_stress=None,
+    progress=True
+):
 
     """ Create simulation environment """
-    final_time = 15.001
-    env = Environment(final_time)
+    env = Environment(
+        final_time,
+        storage=ChunkedStorage(
+            filename+"_data", quantize=quantize
+        ) if stream or quantize else None,
+        damp_coefficient=damp_coefficient,
+        max_muscle_stress=max_muscle_stress,
+    )
     total_steps, systems = env.reset()
     controller_Hz = 500
-    controller_step_skip = int(1.0 / (controller_Hz * env.time_step))
+    # rate of the incremental solves when tracking, each taking at most one
+    # period, and the circle the target moves along
+    tracking_Hz = 10
+    tracking_radius = 0.02
+    tracking_period = 5.0
 
     if not (target_position is None):
         env.sphere.position_collection[:, 0] = target_position
@@ -68,7 +85,16 @@ def main(filename, target_position=None):
     )
     algo_callback = AlgorithmMuscleCallBack(step_skip=env.step_skip)
 
-    algo.run(max_iter_number=100_000)
+    solve_start_time = timer.perf_counter()
+    algo.run(max_iter_number=100_000, progress=progress)
+    solve_time = timer.perf_counter() - solve_start_time
+    if tracking:
+        # the incremental solves take the largest step the cost allows,
+        # measure the duration of such an update for their time budget
+        algo.line_search = True
+        algo.iteration_times.clear()
+        algo.timed_update()
+    target_center = systems[1].position_collection[:, 0].copy()
     
     """ Read arm params """
     activations = []
@@ -81,18 +107,35 @@ def main(filename, target_position=None):
     print("Running simulation ...")
     time = np.float64(0.0)
     weight_start_time = np.float64(0.0)
-    for k_sim in tqdm(range(total_steps)):
-
-        if (k_sim % controller_step_skip) == 0:
-            # controller implementation
-            weight = np.min([1., (time-weight_start_time)/1.])
-            for m in range(len(activations)):
-                activations[m] = weight*algo.activations[m]
-
-        algo_callback.make_callback(algo, time, k_sim)
-        time, systems, done = env.step(time, activations)
-        if done:
-            break
+    progress_bar = tqdm(total=total_steps, disable=not progress)
+
+    def controller(time, systems):
+        progress_bar.update(env.current_step - progress_bar.n)
+        tick = int(round(time * controller_Hz))
+        if tracking and tick % (controller_Hz // tracking_Hz) == 0:
+            # move the target and follow it within one tracking period
+            phase = 2 * np.pi * time / tracking_period
+            systems[1].position_collection[:, 0] = target_center + (
+                tracking_radius * np.array([np.sin(phase), 0, 1-np.cos(phase)])
+            )
+            algo.objects.update_pose_from_sphere(systems[1])
+            algo.step_budget(time_budget=1.0/tracking_Hz)
+
+        # controller implementation
+        weight = np.min([1., (time-weight_start_time)/1.])
+        for m in range(len(activations)):
+            activations[m] = weight*algo.activations[m]
+        return activations
+
+    def callback(time, current_step):
+        algo_callback.make_callback(algo, time, current_step)
+
+    time, systems, done = env.run_until(
+        time, final_time, controller=controller, controller_Hz=controller_Hz,
+        callback=callback,
+    )
+    progress_bar.update(env.current_step - progress_bar.n)
+    progress_bar.close()
 
     """ Save the data of the simulation """
     env.save_data(
@@ -100,6 +143,24 @@ def main(filename, target_position=None):
         algo=algo_callback.callback_params,
     )
 
+    """ Return the summary metrics of the simulation """
+    return dict(
+        simulated_time=float(time),
+        tip_error=float(np.linalg.norm(
+            systems[0].position_collection[:, -1]
+            - systems[1].position_collection[:, 0]
+        )),
+        solve_time=solve_time,
+        nan=bool(done),
+    )
+
+def run_scenario(scenario, filename):
+    """ Run one scenario of coomm.scenarios.run_scenarios, the keys of the
+        scenario are the keyword arguments of main, e.g.
+        {"target_position": [0.01, 0.15, 0.06], "final_time": 5.001,
+         "damp_coefficient": 0.05, "max_muscle_stress": {"OM": 50000}} """
+    return main(filename=filename, progress=False, **scenario)
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(
@@ -109,5 +170,45 @@ if __name__ == "__main__":
         '--filename', type=str, default='simulation',
         help='a str: data file name',
     )
+    parser.add_argument(
+        '--stream', action='store_true',
+        help='stream the recorded data into the chunked folder filename_data',
+    )
+    parser.add_argument(
+        '--quantize', action='store_true',
+        help='stream the recorded data in the compact quantized format',
+    )
+    parser.add_argument(
+        '--tracking', action='store_true',
+        help='move the target along a circle and re-solve for it while '
+             'simulating',
+    )
+    parser.add_argument(
+        '--scenarios', type=str, default=None,
+        help='a str: JSON file of scenarios run in parallel instead, '
+             'see run_scenario',
+    )
+    parser.add_argument(
+        '--output_folder', type=str, default='scenarios',
+        help='a str: folder of the scenario data files and summary.csv',
+    )
+    parser.add_argument(
+        '--n_workers', type=int, default=None,
+        help='an int: number of processes running scenarios',
+    )
     args = parser.parse_args()
-    main(filename=args.filename)
+    if args.scenarios is not None:
+        scenarios = load_scenarios(args.scenarios)
+        for name, summary, error in run_scenarios(
+            run_scenario, scenarios, args.output_folder,
+            n_workers=args.n_workers
+        ):
+            if error is not None:
+                print("Scenario", name, "failed:\n"+error)
+            else:
+                print("Scenario", name, "done:", summary)
+    else:
+        main(
+            filename=args.filename, stream=args.stream, quantize=args.quantize,
+            tracking=args.tracking
+        )
@@ -3,7 +3,6 @@ Created on Sep. 23, 2021
 @author: Heng-Sheng (Hanson) Chang
 """
 
-from collections import defaultdict
 import numpy as np
 
 import elastica as el
@@ -34,11 +33,12 @@ class Environment(ArmEnvironment):
              [-1, 0, 0]]
         )
         self.simulator.append(self.sphere)
-        self.sphere_parameters_dict = defaultdict(list)
+        self.sphere_parameters_dict = self.new_callback_params("systems/1")
         self.simulator.collect_diagnostics(self.sphere).using(
             SphereCallBack,
             step_skip=self.step_skip,
-            callback_params=self.sphere_parameters_dict
+            callback_params=self.sphere_parameters_dict,
+            recording_policy=self.new_recording_policy(),
         )
         
         """ Set up boundary conditions """
@@ -5,11 +5,14 @@ Created on Oct. 12, 2021
 
 import pickle
 from collections import defaultdict
+from functools import partial
 import numpy as np
 from tqdm import tqdm
 from matplotlib import rc
 rc('text', usetex=True)
 
+from coomm.recorders import load_recorded_data
+from coomm.frames import render_frames
 from coomm.frames import RodFrame, StrainFrame
 
 
@@ -36,9 +39,9 @@ class Frame(RodFrame, StrainFrame):
         RodFrame.set_labels(self, time)
 
     @classmethod
-    def get_frame(cls, filename):
+    def get_frame(cls, filename, check_folder_flag=True):
         file_dict = defaultdict(list)
-        file_dict['check_folder_flag'] = True
+        file_dict['check_folder_flag'] = check_folder_flag
         file_dict['folder_name'] = filename+"_frames"
         file_dict['figure_name'] = "frame{:04d}.png"
 
@@ -74,22 +77,23 @@ class Frame(RodFrame, StrainFrame):
             fig_dict=fig_dict,
             gs_dict=gs_dict,
             axes_strain_info=axes_strain_info,
-            ax_main_info=ax_main_info
+            ax_main_info=ax_main_info,
+            persistent_artists=True
         )
 
-def main(filename):
+def setup(filename):
 
-    with open(filename+"_data.pickle", "rb") as f:
-        data = pickle.load(f)
-        rod_data = data['systems'][0]
-        spheres_data = data['systems'][1]
-        recording_fps = data['recording_fps']
+    data = load_recorded_data(filename)
+    rod_data = data['systems'][0]
+    spheres_data = data['systems'][1]
 
     with open(filename+"_systems.pickle", "rb") as f:
         data = pickle.load(f)
         rod = data['systems'][0]
     
-    frame = Frame.get_frame(filename=filename)
+    frame = Frame.get_frame(
+        filename=filename, check_folder_flag=False
+    )
 
     L0 = frame.set_ref_configuration(
         position=rod_data["position"][0],
@@ -97,53 +101,88 @@ def main(filename):
         kappa=rod_data['kappa'][0],
     )
 
-    print("Plotting frames ...")
-    for k in tqdm(range(len(rod_data["time"]))):
-    # for k in tqdm([-1]):
+    # transform all frames of the rod at once
+    frame.set_trajectory(
+        position=rod_data["position"],
+        director=rod_data["director"],
+        radius=rod_data["radius"],
+    )
 
-        frame.reset()
-        
-        frame.plot_rod(
-            position=rod_data["position"][0],
-            director=rod_data["director"][0],
-            radius=rod_data["radius"][0],
-            color='orange',
-        )
+    return rod_data, spheres_data, frame, L0
 
-        ax_main = frame.plot_rod(
-            position=rod_data["position"][k],
-            director=rod_data["director"][k],
-            radius=rod_data["radius"][k]
-        )
+def plot_frame(state, k):
+    rod_data, spheres_data, frame, L0 = state
 
-        for sphere_data in spheres_data:
-            ax_main.scatter(
-                sphere_data["position"][k][0, 0]/L0,
-                sphere_data["position"][k][1, 0]/L0,
-                sphere_data["position"][k][2, 0]/L0,
-                color='grey'
-            )
-
-        axes_shear, axes_curvature = frame.plot_strain(
-            shear=rod_data['sigma'][k]+np.array([0, 0, 1])[:, None],
-            kappa=rod_data['kappa'][k]
-        )
+    frame.reset()
+    
+    frame.plot_rod(
+        frame_index=0,
+        color='orange',
+    )
 
-        frame.plot_strain(
-            shear=rod_data['sigma'][0]+np.array([0, 0, 1])[:, None],
-            kappa=rod_data['kappa'][0],
-            color='orange'
-        )
+    ax_main = frame.plot_rod(
+        frame_index=k
+    )
 
-        frame.set_ax_main_lim(
-            x_lim=[-1.1, 1.1],
-            y_lim=[-1.1, 1.1],
-            z_lim=[-1.1, 1.1]
+    for sphere_data in spheres_data:
+        ax_main.scatter(
+            sphere_data["position"][k][0, 0]/L0,
+            sphere_data["position"][k][1, 0]/L0,
+            sphere_data["position"][k][2, 0]/L0,
+            color='grey'
         )
-        frame.set_axes_strain_lim()
 
-        frame.set_labels(rod_data["time"][k])
-        frame.save(show=False)
+    axes_shear, axes_curvature = frame.plot_strain(
+        shear=rod_data['sigma'][k]+np.array([0, 0, 1])[:, None],
+        kappa=rod_data['kappa'][k]
+    )
+
+    frame.plot_strain(
+        shear=rod_data['sigma'][0]+np.array([0, 0, 1])[:, None],
+        kappa=rod_data['kappa'][0],
+        color='orange'
+    )
+
+    frame.set_ax_main_lim(
+        x_lim=[-1.1, 1.1],
+        y_lim=[-1.1, 1.1],
+        z_lim=[-1.1, 1.1]
+    )
+    frame.set_axes_strain_lim()
+
+    frame.set_labels(rod_data["time"][k])
+    frame.save(show=False, frame_count=k)
+
+def main(filename, n_workers=1, stream_movie=False):
+
+    data = load_recorded_data(filename)
+    recording_fps = data['recording_fps']
+    n_frames = len(data['systems'][0]["time"])
+
+    if stream_movie:
+        # render in order in this process and pipe the frames into ffmpeg
+        state = setup(filename)
+        frame = state[-2]
+        with frame.stream_movie(
+            frame_rate=recording_fps,
+            movie_name=filename+"_movie"
+        ):
+            for k in tqdm(range(n_frames)):
+                plot_frame(state, k)
+        return
+
+    # clean up the frame folder before the workers write into it
+    frame = Frame.get_frame(filename=filename)
+
+    print("Plotting frames ...")
+    for _ in tqdm(
+        render_frames(
+            partial(setup, filename), plot_frame,
+            range(n_frames), n_workers=n_workers
+        ),
+        total=n_frames
+    ):
+        pass
 
     frame.movie(
         frame_rate=recording_fps,
@@ -159,5 +198,16 @@ if __name__ == "__main__":
         '--filename', type=str, default='simulation',
         help='a str: data file name',
     )
+    parser.add_argument(
+        '--n_workers', type=int, default=1,
+        help='an int: number of processes rendering the frames',
+    )
+    parser.add_argument(
+        '--stream_movie', action='store_true',
+        help='pipe the frames into ffmpeg instead of saving image files',
+    )
     args = parser.parse_args()
-    main(filename=args.filename)
+    main(
+        filename=args.filename, n_workers=args.n_workers,
+        stream_movie=args.stream_movie
+    )
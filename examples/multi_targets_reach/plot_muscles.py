@@ -5,12 +5,15 @@ Created on Nov. 11, 2021
 
 import pickle
 from collections import defaultdict
+from functools import partial
 import numpy as np
 from tqdm import tqdm
 from matplotlib.lines import Line2D
 from matplotlib import rc
 rc('text', usetex=True)
 
+from coomm.recorders import load_recorded_data
+from coomm.frames import render_frames
 from coomm.frames import (
     RodFrame,
     TransverseMuscleFrame,
@@ -129,9 +132,9 @@ class Frame(RodFrame, TransverseMuscleFrame, LongitudinalMuscleFrame, ObliqueMus
         
 
     @classmethod
-    def get_frame(cls, filename):
+    def get_frame(cls, filename, check_folder_flag=True):
         file_dict = defaultdict(list)
-        file_dict['check_folder_flag'] = True
+        file_dict['check_folder_flag'] = check_folder_flag
         file_dict['folder_name'] = filename+"_frames_muscle"
         file_dict['figure_name'] = "frame{:04d}.png"
 
@@ -282,6 +285,7 @@ class Frame(RodFrame, TransverseMuscleFrame, LongitudinalMuscleFrame, ObliqueMus
             axes_LM_info=axes_LM_info,
             axes_OM_info=axes_OM_info,
             ax_main_info=ax_main_info,
+            persistent_artists=True
         )
 
 def data_for_cylinder_along_z(center_x,center_y,radius,height_z):
@@ -292,22 +296,22 @@ def data_for_cylinder_along_z(center_x,center_y,radius,height_z):
     y_grid = radius*np.sin(theta_grid) + center_y
     return x_grid,y_grid,z_grid
 
-def main(filename):
+def setup(filename):
 
-    with open(filename+"_data.pickle", "rb") as f:
-        data = pickle.load(f)
-        rod_data = data['systems'][0]
-        sphere_data = data['systems'][1]
-        muscle_groups_data = data['muscle_groups']
-        algo_data = data['algo']
-        recording_fps = data['recording_fps']
+    data = load_recorded_data(filename)
+    rod_data = data['systems'][0]
+    sphere_data = data['systems'][1]
+    muscle_groups_data = data['muscle_groups']
+    algo_data = data['algo']
 
     with open(filename+"_systems.pickle", "rb") as f:
         data = pickle.load(f)
         rod = data['systems'][0]
         muscle_groups = data['muscle_groups']
     
-    frame = Frame.get_frame(filename=filename)
+    frame = Frame.get_frame(
+        filename=filename, check_folder_flag=False
+    )
 
     L0 = frame.set_ref_configuration(
         position=rod_data["position"][0],
@@ -315,80 +319,117 @@ def main(filename):
         kappa=rod_data['kappa'][0],
     )
 
-    print("Plotting frames ...")
-    for k in tqdm(range(len(rod_data["time"]))):
-        frame.reset()
-
-        frame.plot_rod(
-            position=rod_data["position"][0],
-            director=rod_data["director"][0],
-            radius=rod_data["radius"][0],
-            color='orange',
-            alpha=0.3
-        )
+    # transform all frames of the rod at once
+    frame.set_trajectory(
+        position=rod_data["position"],
+        director=rod_data["director"],
+        radius=rod_data["radius"],
+    )
+
+    return rod_data, sphere_data, muscle_groups_data, algo_data, frame, L0
+
+def plot_frame(state, k):
+    rod_data, sphere_data, muscle_groups_data, algo_data, frame, L0 = state
+
+    frame.reset()
 
-        ax_main = frame.plot_rod(
-            position=rod_data["position"][k],
-            director=rod_data["director"][k],
-            radius=rod_data["radius"][k]
+    frame.plot_rod(
+        frame_index=0,
+        color='orange',
+        alpha=0.3
+    )
+
+    ax_main = frame.plot_rod(
+        frame_index=k
+    )
+
+    ax_main.scatter(
+        sphere_data["position"][k][0, 0]/L0,
+        sphere_data["position"][k][1, 0]/L0,
+        sphere_data["position"][k][2, 0]/L0,
+        color='grey'
+    )
+
+    for muscle_group_data in muscle_groups_data:
+        muscle_info = muscle_group_data['muscle_group_info'][k].split('_')
+        group_number, muscle_group_type = (
+            int(muscle_info[0]), muscle_info[1]
         )
 
-        ax_main.scatter(
-            sphere_data["position"][k][0, 0]/L0,
-            sphere_data["position"][k][1, 0]/L0,
-            sphere_data["position"][k][2, 0]/L0,
-            color='grey'
+        algo_activation = algo_data["activations"][k][group_number]
+
+        if group_number > 0:
+            group_number -= 1
+        if group_number > 3:
+            group_number -= 4
+
+        frame.plot_muscle_activation(
+            group_number, muscle_group_type, 
+            muscle_group_data["s_activation"][k],
+            muscle_group_data["activation"][k]
         )
 
-        for muscle_group_data in muscle_groups_data:
-            muscle_info = muscle_group_data['muscle_group_info'][k].split('_')
-            group_number, muscle_group_type = (
+        frame.plot_muscle_activation(
+            group_number, muscle_group_type, 
+            muscle_group_data["s_activation"][k],
+            algo_activation,
+            color='black',
+            fill=False
+        )
+   
+        for muscle_data in muscle_group_data['muscles']:
+            muscle_info = muscle_data['muscle_info'][k].split('_')
+            muscle_number, muscle_type = (
                 int(muscle_info[0]), muscle_info[1]
             )
+            frame.plot_muscle_length(
+                group_number, muscle_type, muscle_number,
+                muscle_data["s_activation"][k], muscle_data["muscle_normalized_length"][k]
+            )
+            frame.plot_force_length_weight(
+                group_number, muscle_type, muscle_number,
+                muscle_data["s_activation"][k], muscle_data["force_length_weight"][k]
+            )
 
-            algo_activation = algo_data["activations"][k][group_number]
+    frame.set_ax_main_lim(
+        x_lim=[-1.1, 1.1],
+        y_lim=[-1.1, 1.1],
+        z_lim=[-1.1, 1.1]
+    )
 
-            if group_number > 0:
-                group_number -= 1
-            if group_number > 3:
-                group_number -= 4
+    frame.set_labels(rod_data["time"][k])
+    frame.save(frame_count=k)
 
-            frame.plot_muscle_activation(
-                group_number, muscle_group_type, 
-                muscle_group_data["s_activation"][k],
-                muscle_group_data["activation"][k]
-            )
+def main(filename, n_workers=1, stream_movie=False):
 
-            frame.plot_muscle_activation(
-                group_number, muscle_group_type, 
-                muscle_group_data["s_activation"][k],
-                algo_activation,
-                color='black',
-                fill=False
-            )
-   
-            for muscle_data in muscle_group_data['muscles']:
-                muscle_info = muscle_data['muscle_info'][k].split('_')
-                muscle_number, muscle_type = (
-                    int(muscle_info[0]), muscle_info[1]
-                )
-                frame.plot_muscle_length(
-                    group_number, muscle_type, muscle_number,
-                    muscle_data["s_activation"][k], muscle_data["muscle_normalized_length"][k]
-                )
-                frame.plot_force_length_weight(
-                    group_number, muscle_type, muscle_number,
-                    muscle_data["s_activation"][k], muscle_data["force_length_weight"][k]
-                )
-
-        frame.set_ax_main_lim(
-            x_lim=[-1.1, 1.1],
-            y_lim=[-1.1, 1.1],
-            z_lim=[-1.1, 1.1]
-        )
+    data = load_recorded_data(filename)
+    recording_fps = data['recording_fps']
+    n_frames = len(data['systems'][0]["time"])
+
+    if stream_movie:
+        # render in order in this process and pipe the frames into ffmpeg
+        state = setup(filename)
+        frame = state[-2]
+        with frame.stream_movie(
+            frame_rate=recording_fps,
+            movie_name=filename+"_muscle_movie"
+        ):
+            for k in tqdm(range(n_frames)):
+                plot_frame(state, k)
+        return
 
-        frame.set_labels(rod_data["time"][k])
-        frame.save()
+    # clean up the frame folder before the workers write into it
+    frame = Frame.get_frame(filename=filename)
+
+    print("Plotting frames ...")
+    for _ in tqdm(
+        render_frames(
+            partial(setup, filename), plot_frame,
+            range(n_frames), n_workers=n_workers
+        ),
+        total=n_frames
+    ):
+        pass
 
     frame.movie(
         frame_rate=recording_fps,
@@ -404,5 +445,16 @@ if __name__ == "__main__":
         '--filename', type=str, default='simulation',
         help='a str: data file name',
     )
+    parser.add_argument(
+        '--n_workers', type=int, default=1,
+        help='an int: number of processes rendering the frames',
+    )
+    parser.add_argument(
+        '--stream_movie', action='store_true',
+        help='pipe the frames into ffmpeg instead of saving image files',
+    )
     args = parser.parse_args()
-    main(filename=args.filename)
+    main(
+        filename=args.filename, n_workers=args.n_workers,
+        stream_movie=args.stream_movie
+    )
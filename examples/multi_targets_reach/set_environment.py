@@ -46,11 +46,14 @@ class Environment(ArmEnvironment):
             )
             sphere.director_collection[:, :, 0] = director
             self.simulator.append(sphere)
-            sphere_parameters_dict = defaultdict(list)
+            sphere_parameters_dict = self.new_callback_params(
+                "systems/1/{}".format(len(self.sphere_parameters))
+            )
             self.simulator.collect_diagnostics(sphere).using(
                 SphereCallBack,
                 step_skip=self.step_skip,
-                callback_params=sphere_parameters_dict
+                callback_params=sphere_parameters_dict,
+                recording_policy=self.new_recording_policy(),
             )
 
             self.spheres.append(sphere)
@@ -0,0 +1,542 @@
+"""
+Lock-step ensemble of arm environments.
+
+All arms of the ensemble are systems of one simulator, so pyelastica stores
+their rods in one memory block and integrates them with its rod kernels in
+one pass per stage, instead of one simulator per arm stepped from Python.
+The muscle and drag forcing of the arms is computed the same way: every
+kernel runs once per stage over the arrays of the memory block, with the
+ghost elements between the rods masked, instead of once per arm.
+The state of the rods is exposed stacked along a first batch axis as views
+of the memory block, and the muscle activations of all arms are applied
+before each step. step and run_until of ArmEnvironment return a done flag
+for every arm.
+"""
+
+import numpy as np
+from numba import njit
+
+from elastica._linalg import _batch_cross
+from elastica._calculus import (
+    _isnan_check,
+    quadrature_kernel_for_block_structure,
+    difference_kernel_for_block_structure,
+)
+from elastica.external_forces import NoForces, inplace_addition
+from elastica.memory_block import MemoryBlockCosseratRod
+from elastica.reset_functions_for_block_structure import (
+    _reset_scalar_ghost,
+    _reset_vector_ghost,
+)
+
+from coomm._rod_tool import (
+    _lab_to_material, _material_to_lab, average2D, difference2D,
+    sigma_to_shear,
+)
+from coomm.actuations.muscles import MuscleGroup, ApplyMuscleGroups
+from coomm.actuations.muscles.muscle import MuscleForce
+from coomm.forces import DragForce
+
+from examples.set_arm_environment import ArmEnvironment
+
+def memory_root(array):
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+def batched_view(arrays):
+    """ View of equally shaped arrays, laid out at equal distances in one
+        buffer (e.g. the memory block of the rods), stacked along a new
+        first axis. None if they are not laid out that way. """
+    first = arrays[0]
+    addresses = [array.__array_interface__['data'][0] for array in arrays]
+    distances = np.diff(addresses)
+    if len(arrays) == 1:
+        return first[None, ...]
+    if (
+        any(array.shape != first.shape or array.strides != first.strides
+            for array in arrays) or
+        np.any(distances != distances[0]) or
+        any(memory_root(array) is not memory_root(first) for array in arrays)
+    ):
+        return None
+    return np.lib.stride_tricks.as_strided(
+        first,
+        shape=(len(arrays),)+first.shape,
+        strides=(int(distances[0]),)+first.strides,
+        writeable=True,
+    )
+
+class BatchedRods:
+    """ Rods of an ensemble with their state stacked along a first batch
+        axis, e.g. position_collection has shape (batch_size, 3, n+1).
+        Writing into the stacked arrays changes the rods. """
+
+    batched_attributes = ArmEnvironment.state_attributes + (
+        "radius", "lengths", "tangents", "sigma", "kappa",
+        "internal_forces", "internal_torques",
+        "external_forces", "external_torques",
+    )
+
+    def __init__(self, rods):
+        self.rods = rods
+        for name in self.batched_attributes:
+            view = batched_view([getattr(rod, name) for rod in rods])
+            if view is None:
+                raise ValueError(
+                    "the rods of the ensemble are not laid out in one memory "
+                    "block, {} cannot be stacked as a view".format(name)
+                )
+            setattr(self, name, view)
+
+    def __len__(self):
+        return len(self.rods)
+
+    def __getitem__(self, index):
+        return self.rods[index]
+
+@njit(cache=True)
+def _block_muscle_strain(
+    muscle_strain, muscle_position, sigma, kappa,
+    rest_voronoi_lengths, voronoi_dilatation, ghost_voronoi_idx
+):
+    # Muscle.calculate_muscle_strain on the memory block, the ghost voronoi
+    # are reset before they are averaged into the elements of the rods
+    shear = sigma_to_shear(sigma)
+    muscle_position_derivative = difference2D(muscle_position) / (
+        rest_voronoi_lengths * voronoi_dilatation
+    )
+    muscle_strain[:, :] = shear + quadrature_kernel_for_block_structure(
+        _batch_cross(kappa, average2D(muscle_position))
+        + muscle_position_derivative,
+        ghost_voronoi_idx
+    )
+
+@njit(cache=True)
+def _block_force_and_couple(
+    muscle_force, muscle_tangent, muscle_position,
+    internal_force, internal_couple, external_force, external_couple,
+    director_collection, kappa, tangents,
+    rest_lengths, rest_voronoi_lengths, dilatation, voronoi_dilatation,
+    ghost_nodes_idx, ghost_elems_idx, ghost_voronoi_idx
+):
+    # MuscleForce.calculate_force_and_couple on the memory block
+    internal_force[:, :] = muscle_force * muscle_tangent
+    internal_couple[:, :] = average2D(
+        _batch_cross(muscle_position, internal_force)
+    )
+    _reset_vector_ghost(internal_couple, ghost_voronoi_idx)
+    external_force[:, :] = difference_kernel_for_block_structure(
+        _material_to_lab(director_collection, internal_force),
+        ghost_elems_idx
+    )
+    external_couple[:, :] = (
+        difference_kernel_for_block_structure(
+            internal_couple, ghost_voronoi_idx
+        ) +
+        quadrature_kernel_for_block_structure(
+            _batch_cross(kappa, internal_couple) * rest_voronoi_lengths,
+            ghost_voronoi_idx
+        ) +
+        _batch_cross(
+            _lab_to_material(director_collection, tangents * dilatation),
+            internal_force
+        ) * rest_lengths
+    )
+    _reset_vector_ghost(external_force, ghost_nodes_idx)
+    _reset_vector_ghost(external_couple, ghost_elems_idx)
+
+@njit(cache=True)
+def _block_drag_force(
+    scale_per, scale_tan, director, velocity,
+    velocity_material_frame, drag_force_material_frame, drag_force,
+    ghost_nodes_idx, ghost_elems_idx
+):
+    # DragForce.calculate_drag_force on the memory block
+    velocity_material_frame[:, :] = (
+        _lab_to_material(director, average2D(velocity))
+    )
+    _reset_vector_ghost(velocity_material_frame, ghost_elems_idx)
+    square_velocity_with_direction = (
+        np.abs(velocity_material_frame) * velocity_material_frame
+    )
+    drag_force_material_frame[:2, :] = (
+        - scale_per * square_velocity_with_direction[:2, :]
+    )
+    drag_force_material_frame[2, :] = (
+        - scale_tan * square_velocity_with_direction[2, :]
+    )
+    drag_force[:, :] = quadrature_kernel_for_block_structure(
+        _material_to_lab(director, drag_force_material_frame),
+        ghost_elems_idx
+    )
+    _reset_vector_ghost(drag_force, ghost_nodes_idx)
+
+class BlockArrays:
+    """ Arrays of one quantity of every arm (e.g. a muscle or the drag
+        force) laid out like the memory block of the rods. The arrays of
+        the objects of the arms are replaced by views of these, so their
+        records, activations and checkpoints stay valid. """
+
+    def __init__(self, block, slices, objects):
+        """ slices[location][b] are the indices of the nodes, elements
+            or voronoi of arm b in the block, objects[b] is the object of
+            arm b """
+        self.block = block
+        self.slices = slices
+        self.objects = objects
+
+    def gather(self, name, location, fill=0.0, rebind=True):
+        """ Copy the arrays name of the objects into one block array and,
+            if rebind, replace them by views of it """
+        size = dict(
+            nodes=self.block.n_nodes, elements=self.block.n_elems,
+            voronoi=self.block.n_voronoi,
+        )[location]
+        arrays = [
+            np.broadcast_to(
+                getattr(obj, name),
+                np.shape(getattr(self.objects[0], name))[:-1] + (
+                    self.slices[location][b].stop
+                    - self.slices[location][b].start,
+                )
+            ) for b, obj in enumerate(self.objects)
+        ]
+        block_array = np.full(arrays[0].shape[:-1] + (size,), fill)
+        for b, obj in enumerate(self.objects):
+            block_array[..., self.slices[location][b]] = arrays[b]
+            if rebind:
+                setattr(obj, name, block_array[..., self.slices[location][b]])
+        setattr(self, name, block_array)
+        return block_array
+
+class BatchedArmForcing(NoForces):
+    """ Forcing of the rods of all arms of an ensemble. The muscle groups
+        (ApplyMuscleGroups) and the drag (DragForce) of the arms are
+        computed by one call of each kernel per stage over the memory block
+        of the rods, other forcing is applied rod by rod. The block entries
+        outside the rods of the arms, i.e. the ghosts between the rods, are
+        reset by the kernels so they neither spread into the rods nor carry
+        NaN. """
+
+    def __init__(self, simulator, rods, arm_forcings):
+        """ arm_forcings[b] are the (forcing_cls, kwargs) of the rod of
+            arm b, in the order they were added """
+        if any(
+            [cls for cls, _ in forcings] != [cls for cls, _ in arm_forcings[0]]
+            for forcings in arm_forcings
+        ):
+            raise ValueError("the arms of the ensemble have different forcing")
+        self.rods = rods
+        # forcings[k][b] is the k-th forcing of arm b
+        self.forcings = [
+            [cls(**kwargs) for cls, kwargs in forcings]
+            for forcings in zip(*arm_forcings)
+        ]
+        block = [
+            memory_block for memory_block in simulator._memory_blocks
+            if isinstance(memory_block, MemoryBlockCosseratRod)
+        ][0]
+        self.block = block
+        self.slices = dict(
+            nodes=self.rod_slices(block.position_collection, "position_collection"),
+            elements=self.rod_slices(block.radius, "radius"),
+            voronoi=self.rod_slices(block.rest_voronoi_lengths, "rest_voronoi_lengths"),
+        )
+        # indices of the block outside the rods of the arms
+        self.ghost_idx = {
+            location: np.setdiff1d(
+                np.arange(size),
+                np.concatenate([
+                    np.arange(rod_slice.start, rod_slice.stop)
+                    for rod_slice in self.slices[location]
+                ])
+            ) for location, size in (
+                ("nodes", block.n_nodes), ("elements", block.n_elems),
+                ("voronoi", block.n_voronoi),
+            )
+        }
+        self.batches = [
+            self.batch_muscle_groups(forcings)
+            if type(forcings[0]) is ApplyMuscleGroups else
+            self.batch_drag_force(forcings)
+            if type(forcings[0]) is DragForce else None
+            for forcings in self.forcings
+        ]
+
+    def rod_slices(self, block_array, name):
+        """ Indices of the arrays name of the rods in block_array """
+        slices = []
+        for rod in self.rods:
+            array = getattr(rod, name)
+            start = (
+                array.__array_interface__['data'][0]
+                - block_array.__array_interface__['data'][0]
+            ) // block_array.strides[-1]
+            slices.append(slice(start, start + array.shape[-1]))
+        return slices
+
+    def block_arrays(self, objects):
+        return BlockArrays(self.block, self.slices, objects)
+
+    def batch_muscle_groups(self, forcings):
+        """ Block arrays of the muscle groups of all arms, None if the arms
+            have different muscles or muscles with their own __call__ """
+        groups = [forcing.actuations for forcing in forcings]
+        if any(
+            len(arm_groups) != len(groups[0]) or any(
+                type(group) is not MuscleGroup or
+                len(group.muscles) != len(groups[0][g].muscles) or any(
+                    type(muscle) is not type(groups[0][g].muscles[m]) or
+                    type(muscle).__call__ is not MuscleForce.__call__ or
+                    muscle.force_length_weight
+                    is not groups[0][g].muscles[m].force_length_weight
+                    for m, muscle in enumerate(group.muscles)
+                ) for g, group in enumerate(arm_groups)
+            ) for arm_groups in groups
+        ):
+            return None
+        batch = []
+        for g in range(len(groups[0])):
+            group_arrays = self.block_arrays([arm_groups[g] for arm_groups in groups])
+            group_arrays.gather("internal_force", "elements")
+            group_arrays.gather("internal_couple", "voronoi")
+            group_arrays.gather("external_force", "nodes")
+            group_arrays.gather("external_couple", "elements")
+            muscles = []
+            for m in range(len(groups[0][g].muscles)):
+                muscle_arrays = self.block_arrays(
+                    [arm_groups[g].muscles[m] for arm_groups in groups]
+                )
+                for name in (
+                    "rest_muscle_area", "muscle_area", "muscle_length",
+                    "muscle_normalized_length", "muscle_force", "activation",
+                ):
+                    muscle_arrays.gather(name, "elements")
+                muscle_arrays.gather("muscle_rest_length", "elements", fill=1.0)
+                muscle_arrays.gather("max_muscle_stress", "elements", rebind=False)
+                for name in (
+                    "ratio_muscle_position", "muscle_position",
+                    "muscle_strain", "muscle_tangent",
+                    "internal_force", "external_couple",
+                ):
+                    muscle_arrays.gather(name, "elements")
+                muscle_arrays.gather("internal_couple", "voronoi")
+                muscle_arrays.gather("external_force", "nodes")
+                muscles.append(muscle_arrays)
+            group_arrays.muscles = muscles
+            batch.append(group_arrays)
+        return batch
+
+    def batch_drag_force(self, forcings):
+        """ Block arrays of the drag force of all arms """
+        drag_arrays = self.block_arrays(forcings)
+        for drag_force, rod in zip(forcings, self.rods):
+            # the drag coefficients of every element of the arm
+            drag_force.block_scale_per = np.full(rod.n_elems, drag_force.scale_per)
+            drag_force.block_scale_tan = np.full(rod.n_elems, drag_force.scale_tan)
+        drag_arrays.gather("block_scale_per", "elements", rebind=False)
+        drag_arrays.gather("block_scale_tan", "elements", rebind=False)
+        drag_arrays.gather("velocity_material_frame", "elements")
+        drag_arrays.gather("drag_force_material_frame", "elements")
+        drag_arrays.gather("drag_force", "nodes")
+        return drag_arrays
+
+    def apply_muscle_groups(self, batch):
+        block = self.block
+        ghost_nodes_idx = self.ghost_idx["nodes"]
+        ghost_elems_idx = self.ghost_idx["elements"]
+        ghost_voronoi_idx = self.ghost_idx["voronoi"]
+        for group in batch:
+            group.internal_force[:, :] = 0
+            group.internal_couple[:, :] = 0
+            group.external_force[:, :] = 0
+            group.external_couple[:, :] = 0
+            for muscle in group.muscles:
+                muscle_cls = type(muscle.objects[0])
+                muscle_cls.calculate_muscle_area(
+                    muscle.rest_muscle_area, muscle.muscle_area, block.dilatation
+                )
+                _reset_scalar_ghost(muscle.muscle_area, ghost_elems_idx)
+                muscle_cls.calculate_muscle_position(
+                    muscle.muscle_position, block.radius,
+                    muscle.ratio_muscle_position
+                )
+                _block_muscle_strain(
+                    muscle.muscle_strain, muscle.muscle_position,
+                    block.sigma, block.kappa,
+                    block.rest_voronoi_lengths, block.voronoi_dilatation,
+                    ghost_voronoi_idx
+                )
+                # unit strain of the ghosts, whose muscle force is zero
+                _reset_vector_ghost(muscle.muscle_strain, ghost_elems_idx, 1.0)
+                muscle_cls.calculate_muscle_tangent(
+                    muscle.muscle_tangent, muscle.muscle_strain
+                )
+                muscle_cls.calculate_muscle_length(
+                    muscle.muscle_length, muscle.muscle_strain
+                )
+                muscle_cls.calculate_muscle_normalized_length(
+                    muscle.muscle_normalized_length, muscle.muscle_length,
+                    muscle.muscle_rest_length
+                )
+                muscle_cls.calculate_muscle_force(
+                    muscle.muscle_force, muscle.activation,
+                    muscle.max_muscle_stress,
+                    muscle.objects[0].force_length_weight(
+                        muscle.muscle_normalized_length
+                    ),
+                    muscle.muscle_area,
+                )
+                _block_force_and_couple(
+                    muscle.muscle_force, muscle.muscle_tangent,
+                    muscle.muscle_position,
+                    muscle.internal_force, muscle.internal_couple,
+                    muscle.external_force, muscle.external_couple,
+                    block.director_collection, block.kappa, block.tangents,
+                    block.rest_lengths, block.rest_voronoi_lengths,
+                    block.dilatation, block.voronoi_dilatation,
+                    ghost_nodes_idx, ghost_elems_idx, ghost_voronoi_idx
+                )
+                inplace_addition(group.internal_force, muscle.internal_force)
+                inplace_addition(group.external_force, muscle.external_force)
+                inplace_addition(group.internal_couple, muscle.internal_couple)
+                inplace_addition(group.external_couple, muscle.external_couple)
+            inplace_addition(block.external_forces, group.external_force)
+            inplace_addition(block.external_torques, group.external_couple)
+
+    def apply_drag_force(self, batch):
+        block = self.block
+        Pa = 2 * block.radius * block.lengths
+        Sa = Pa * np.pi
+        _block_drag_force(
+            batch.block_scale_per*Pa, batch.block_scale_tan*Sa,
+            block.director_collection, block.velocity_collection,
+            batch.velocity_material_frame,
+            batch.drag_force_material_frame, batch.drag_force,
+            self.ghost_idx["nodes"], self.ghost_idx["elements"]
+        )
+        inplace_addition(block.external_forces, batch.drag_force)
+
+    def apply_torques(self, system, time: np.float64 = 0.0):
+        for forcings, batch in zip(self.forcings, self.batches):
+            if batch is None:
+                for forcing, rod in zip(forcings, self.rods):
+                    forcing.apply_forces(rod, time)
+                    forcing.apply_torques(rod, time)
+            elif type(forcings[0]) is ApplyMuscleGroups:
+                self.apply_muscle_groups(batch)
+                for forcing in forcings:
+                    if forcing.callback_params_list is not None:
+                        forcing.make_callback(time)
+            else:
+                self.apply_drag_force(batch)
+                for forcing, rod in zip(forcings, self.rods):
+                    forcing.callback(rod, time)
+
+class ArmEnsembleEnvironment(ArmEnvironment):
+
+    def __init__(self, final_time, batch_size, **kwargs):
+        """ batch_size arms stepped together, the keyword arguments are the
+            ones of ArmEnvironment """
+        ArmEnvironment.__init__(self, final_time, **kwargs)
+        self.batch_size = batch_size
+        self.arm_index = 0
+
+    def new_callback_params(self, name):
+        # records of arm b are saved under arms/b
+        return ArmEnvironment.new_callback_params(
+            self, "arms/{}/{}".format(self.arm_index, name)
+        )
+
+    def setup_arm(self, arm_index):
+        """ Set up arm arm_index, override to add targets or to change the
+            parameters of each arm """
+        self.set_arm()
+
+    def get_arm_data(self,):
+        """ Callback params of the systems of the arm just set up """
+        return ArmEnvironment.get_data(self)
+
+    def add_forcing(self, forced_system, forcing_cls, **kwargs):
+        # the forcing of the rods is applied by one BatchedArmForcing
+        if forced_system is self.shearable_rod:
+            self.arm_forcings[-1].append((forcing_cls, kwargs))
+        else:
+            ArmEnvironment.add_forcing(
+                self, forced_system, forcing_cls, **kwargs
+            )
+
+    def setup(self):
+        self.arms = []
+        self.arm_forcings = []
+        for arm_index in range(self.batch_size):
+            self.arm_index = arm_index
+            self.arm_forcings.append([])
+            self.setup_arm(arm_index)
+            self.arms.append(dict(
+                rod=self.shearable_rod,
+                muscle_groups=self.muscle_groups,
+                data=self.get_arm_data(),
+                muscle_callback_params_list=self.muscle_callback_params_list,
+            ))
+        # all muscle groups for checkpoints, the records nested per arm
+        self.muscle_groups = [
+            muscle_group
+            for arm in self.arms for muscle_group in arm["muscle_groups"]
+        ]
+        self.muscle_callback_params_list = [
+            arm["muscle_callback_params_list"] for arm in self.arms
+        ]
+        self.simulator.add_forcing_to(self.arms[0]["rod"]).using(
+            BatchedArmForcing,
+            simulator=self.simulator,
+            rods=[arm["rod"] for arm in self.arms],
+            arm_forcings=self.arm_forcings,
+        )
+
+    def get_data(self,):
+        return [arm["data"] for arm in self.arms]
+
+    def get_systems(self,):
+        return self.rods
+
+    def get_operators(self,):
+        # the forcing objects of the arms instead of their batch
+        operators = []
+        for operator in ArmEnvironment.get_operators(self):
+            if isinstance(operator, BatchedArmForcing):
+                operators += [
+                    forcing
+                    for forcings in operator.forcings for forcing in forcings
+                ]
+            else:
+                operators.append(operator)
+        return operators
+
+    def reset(self):
+        self.rods = None
+        total_steps, _ = ArmEnvironment.reset(self)
+        self.rods = BatchedRods([arm["rod"] for arm in self.arms])
+
+        """ Return
+            (1) total time steps for the simulation step iterations
+            (2) batched rods for controller design
+        """
+        return total_steps, self.get_systems()
+
+    def apply_activations(self, muscle_activations):
+        """ Set muscle activations, muscle_activations[b] are the
+            activations of the muscle groups of arm b """
+        for arm, arm_activations in zip(self.arms, muscle_activations):
+            for muscle_group, activation in zip(
+                arm["muscle_groups"], arm_activations
+            ):
+                muscle_group.apply_activation(activation)
+
+    def is_done(self,):
+        """ Done flags the arms whose position became NaN, the arms share
+            one simulator so the ensemble has to be reset if any is done """
+        return np.array([
+            _isnan_check(rod.position_collection) for rod in self.rods.rods
+        ])
@@ -3,6 +3,7 @@ Created on Sep. 23, 2021
 @author: Heng-Sheng (Hanson) Chang
 """
 
+import copy
 from collections import defaultdict
 import numpy as np
 
@@ -21,12 +22,33 @@ from coomm.actuations.muscles import (
 
 from coomm.forces import DragForce
 from coomm.callback_func import RodCallBack, CylinderCallBack
+from coomm.recorders import Recorder, number_of_records, to_arrays
+from coomm.recorders import record_lengths, truncate_records
+from coomm.recorders import new_callback_params, AdaptiveRecording
+from coomm.recorders import ChunkedStorage, BackgroundWriter
 
 class BaseSimulator(BaseSystemCollection, Constraints, Connections, Forcing, CallBacks):
     pass
 
 class ArmEnvironment:
-    def __init__(self, final_time, time_step=1.0e-5, recording_fps=30):
+
+    # dynamic state of the systems saved in a checkpoint
+    state_attributes = (
+        "position_collection", "velocity_collection",
+        "director_collection", "omega_collection",
+        "acceleration_collection", "alpha_collection",
+    )
+    # recording cursors of the forcing and callback objects
+    cursor_attributes = ("current_step", "step", "recording_policy")
+    # maximum stress [Pa] of the transverse, longitudinal and oblique muscles
+    default_max_muscle_stress = dict(TM=15_000.0, LM=10_000.0, OM=100_000.0)
+
+    def __init__(
+        self, final_time, time_step=1.0e-5, recording_fps=30,
+        preallocate_records=False, storage: ChunkedStorage = None,
+        async_recording=False, recording_policy: AdaptiveRecording = None,
+        damp_coefficient=0.05, max_muscle_stress: dict = None
+    ):
         # Integrator type
         self.StatefulStepper = PositionVerlet()
 
@@ -35,6 +57,18 @@ class ArmEnvironment:
         self.total_steps = int(self.final_time/self.time_step)
         self.recording_fps = recording_fps
         self.step_skip = int(1.0 / (self.recording_fps * self.time_step))
+        self.n_records = number_of_records(self.total_steps, self.step_skip)
+        self.preallocate_records = preallocate_records
+        self.storage = storage
+        if self.storage is not None:
+            self.storage.set_attributes(recording_fps=self.recording_fps)
+        self.writer = BackgroundWriter() if async_recording else None
+        self.recording_policy = recording_policy
+        self.damp_coefficient = damp_coefficient
+        self.max_muscle_stress = dict(
+            self.default_max_muscle_stress,
+            **({} if max_muscle_stress is None else max_muscle_stress)
+        )
 
     def get_systems(self,):
         return self.simulator
@@ -42,6 +76,33 @@ class ArmEnvironment:
     def get_data(self,):
         return [self.rod_parameters_dict]
 
+    def get_callback_params(self,):
+        return dict(
+            systems=self.get_data(),
+            muscle_groups=self.muscle_callback_params_list,
+        )
+
+    def new_callback_params(self, name):
+        """ Storage for the data recorded by a callback, name is the
+            path of the data in the saved file, e.g. systems/0 """
+        if self.storage is not None:
+            callback_params = self.storage.recorder(name)
+        elif self.preallocate_records:
+            callback_params = Recorder(self.n_records)
+        else:
+            callback_params = defaultdict(list)
+        if self.writer is not None:
+            # records are written by a background thread
+            return self.writer.recorder(callback_params)
+        return callback_params
+
+    def new_recording_policy(self,):
+        """ Recording policy of a callback, None to record every
+            step_skip steps """
+        if self.recording_policy is None:
+            return None
+        return self.recording_policy.new()
+
     def set_arm(self):
         base_length, radius = self.set_rod()
         self.set_muscles(radius[0], self.shearable_rod)
@@ -61,7 +122,7 @@ class ArmEnvironment:
         radius_tip = 0.0012     # radius of the arm at the tip
         radius = np.linspace(radius_base, radius_tip, n_elements+1)
         radius_mean = (radius[:-1]+radius[1:])/2
-        damp_coefficient = 0.05
+        damp_coefficient = self.damp_coefficient
         
         self.shearable_rod = CosseratRod.straight_rod(
             n_elements=n_elements,
@@ -79,11 +140,12 @@ class ArmEnvironment:
         )
         self.simulator.append(self.shearable_rod)
 
-        self.rod_parameters_dict = defaultdict(list)
+        self.rod_parameters_dict = self.new_callback_params("systems/0")
         self.simulator.collect_diagnostics(self.shearable_rod).using(
             RodCallBack,
             step_skip=self.step_skip,
-            callback_params=self.rod_parameters_dict
+            callback_params=self.rod_parameters_dict,
+            recording_policy=self.new_recording_policy(),
         )
 
         """ Set up boundary conditions """
@@ -126,9 +188,9 @@ class ArmEnvironment:
             # TM_max_muscle_stress = 15_000.0
             # LM_max_muscle_stress = 50_000.0
             # OM_max_muscle_stress = 500_000.0
-            TM_max_muscle_stress =  15_000.0
-            LM_max_muscle_stress =  10_000.0
-            OM_max_muscle_stress = 100_000.0
+            TM_max_muscle_stress = float(self.max_muscle_stress["TM"])
+            LM_max_muscle_stress = float(self.max_muscle_stress["LM"])
+            OM_max_muscle_stress = float(self.max_muscle_stress["OM"])
 
             muscle_dict = dict(
                 force_length_weight=force_length_weight_poly,
@@ -208,13 +270,16 @@ class ArmEnvironment:
             base_radius, arm
         )
         self.muscle_callback_params_list = [
-            defaultdict(list) for _ in self.muscle_groups
+            self.new_callback_params("muscle_groups/{}".format(m))
+            for m in range(len(self.muscle_groups))
         ]
-        self.simulator.add_forcing_to(self.shearable_rod).using(
+        self.add_forcing(
+            self.shearable_rod,
             ApplyMuscleGroups,
             muscle_groups=self.muscle_groups,
             step_skip=self.step_skip,
             callback_params_list=self.muscle_callback_params_list,
+            recording_policy=self.new_recording_policy(),
         )
 
     def set_drag_force(self,
@@ -228,15 +293,31 @@ class ArmEnvironment:
         sea_water_dentsity = 1022
         c_per = 0.41 / sea_water_dentsity / r_bar / dl * fluid_factor
         c_tan = 0.033 / sea_water_dentsity / np.pi / r_bar / dl * fluid_factor
-        
-        self.simulator.add_forcing_to(arm).using(
+
+        if self.recording_policy is not None:
+            # drag force records are taken at their own times
+            arm_parameters_dict["drag_force"] = new_callback_params(
+                arm_parameters_dict, "drag_force"
+            )
+            arm_parameters_dict = arm_parameters_dict["drag_force"]
+
+        self.add_forcing(
+            arm,
             DragForce,
             rho_environment=sea_water_dentsity,
             c_per=c_per,
             c_tan=c_tan,
             system=arm,
             step_skip=self.step_skip,
-            callback_params=arm_parameters_dict # self.rod_parameters_dict
+            callback_params=arm_parameters_dict, # self.rod_parameters_dict
+            recording_policy=self.new_recording_policy(),
+        )
+
+    def add_forcing(self, forced_system, forcing_cls, **kwargs):
+        """ Add a forcing of forcing_cls(**kwargs) to forced_system,
+            override to apply the forcing of several systems together """
+        self.simulator.add_forcing_to(forced_system).using(
+            forcing_cls, **kwargs
         )
 
     def reset(self):
@@ -249,6 +330,7 @@ class ArmEnvironment:
         self.do_step, self.stages_and_updates = extend_stepper_interface(
             self.StatefulStepper, self.simulator
         )
+        self.current_step = 0
 
         """ Return 
             (1) total time steps for the simulation step iterations
@@ -256,11 +338,19 @@ class ArmEnvironment:
         """
         return self.total_steps, self.get_systems()
 
-    def step(self, time, muscle_activations):
-
+    def apply_activations(self, muscle_activations):
         """ Set muscle activations """
         for muscle_group, activation in zip(self.muscle_groups, muscle_activations):
             muscle_group.apply_activation(activation)
+
+    def is_done(self,):
+        """ Position of the rod cannot be NaN, it is not valid """
+        return _isnan_check(self.shearable_rod.position_collection)
+
+    def step(self, time, muscle_activations):
+
+        """ Set muscle activations """
+        self.apply_activations(muscle_activations)
         
         """ Run the simulation for one step """
         time = self.do_step(
@@ -270,15 +360,13 @@ class ArmEnvironment:
             time,
             self.time_step,
         )
+        self.current_step += 1
 
         """ Done is a boolean to reset the environment before episode is completed """
-        done = False
-        # Position of the rod cannot be NaN, it is not valid, stop the simulation
-        invalid_values_condition = _isnan_check(self.shearable_rod.position_collection)
-
-        if invalid_values_condition == True:
+        done = self.is_done()
+        # stop the simulation when the rod is not valid
+        if np.any(done):
             print("NaN detected in the simulation !!!!!!!!")
-            done = True
 
         """ Return
             (1) current simulation time
@@ -287,26 +375,204 @@ class ArmEnvironment:
         """
         return time, self.get_systems(), done
 
-    def save_data(self, filename="simulation", **kwargs):
-        
-        import pickle
+    def run_until(
+        self, time, t_end, controller=None, controller_Hz=None, callback=None
+    ):
+        """ Run the simulation from time to t_end without returning to the
+            caller at every step. Steps are taken in chunks up to the next
+            event: a controller tick, a recording step of callback or t_end.
+
+            controller(time, systems) is called every 1/controller_Hz
+            seconds of simulation time (on the steps which are multiples of
+            the controller step skip, as in a loop over step) and returns
+            the muscle activations applied until the next tick, or None to
+            keep the current ones. controller_Hz must be positive and at
+            most 1/time_step.
+            callback(time, current_step) is called on every step_skip-th
+            step, e.g. to record a controller alongside the systems.
+            NaN is checked once per chunk, so the simulation stops at the
+            end of the chunk where the rod became invalid. """
+        end_step = int(t_end / self.time_step)
+        # step skips of the events
+        every = []
+        if controller is not None:
+            if controller_Hz is None or not controller_Hz > 0:
+                raise ValueError(
+                    "a controller needs a positive controller_Hz, "
+                    "got {}".format(controller_Hz)
+                )
+            if controller_Hz * self.time_step > 1:
+                raise ValueError(
+                    "controller_Hz {} exceeds the step rate 1/time_step "
+                    "{}".format(controller_Hz, 1.0 / self.time_step)
+                )
+            controller_step_skip = max(
+                1, int(1.0 / (controller_Hz * self.time_step))
+            )
+            every.append(controller_step_skip)
+        if callback is not None:
+            if self.step_skip < 1:
+                raise ValueError(
+                    "recording_fps {} exceeds the step rate 1/time_step "
+                    "{}".format(self.recording_fps, 1.0 / self.time_step)
+                )
+            every.append(self.step_skip)
 
-        print("Saving data to pickle files ...", end='\r')
+        do_step = self.do_step
+        stepper = self.StatefulStepper
+        stages_and_updates = self.stages_and_updates
+        simulator = self.simulator
+        time_step = self.time_step
 
-        with open(filename+"_data.pickle", "wb") as data_file:
-            data = dict(
-                recording_fps=self.recording_fps,
-                systems=self.get_data(),
-                muscle_groups=self.muscle_callback_params_list,
-                **kwargs
+        done = False
+        while self.current_step < end_step:
+            current_step = self.current_step
+            if controller is not None and current_step % controller_step_skip == 0:
+                muscle_activations = controller(time, self.get_systems())
+                if muscle_activations is not None:
+                    self.apply_activations(muscle_activations)
+            if callback is not None and current_step % self.step_skip == 0:
+                callback(time, current_step)
+
+            next_step = min(
+                [end_step] + [
+                    (current_step // step_skip + 1) * step_skip
+                    for step_skip in every
+                ]
             )
-            pickle.dump(data, data_file)
+            for _ in range(next_step - current_step):
+                time = do_step(
+                    stepper, stages_and_updates, simulator, time, time_step
+                )
+            self.current_step = next_step
 
-        with open(filename+"_systems.pickle", "wb") as system_file:
-            data = dict(
-                systems=self.get_systems(),
-                muscle_groups=self.muscle_groups,
-            )
-            pickle.dump(data, system_file)
+            done = self.is_done()
+            if np.any(done):
+                print("NaN detected in the simulation !!!!!!!!")
+                break
+
+        """ Return
+            (1) current simulation time
+            (2) current systems
+            (3) a flag denotes whether the simulation runs correlectly
+        """
+        return time, self.get_systems(), done
+
+    def get_operators(self,):
+        """ Forcing and callback objects of the simulator """
+        return [
+            operator for _, operator in self.simulator._ext_forces_torques
+        ] + [
+            operator for _, operator in self.simulator._callback_list
+        ]
+
+    def checkpoint(self, time):
+        """ Dynamic state of the simulation at time: the state of the
+            systems, the muscle activations and the recording cursors.
+            Records taken so far are flushed to the storage, if any. """
+        if self.writer is not None:
+            self.writer.flush()
+        if self.storage is not None:
+            self.storage.flush()
+        return dict(
+            time=time,
+            current_step=self.current_step,
+            systems=[
+                {
+                    name: getattr(system, name).copy()
+                    for name in self.state_attributes
+                    if hasattr(system, name)
+                } for system in self.simulator
+            ],
+            muscle_groups=[
+                dict(
+                    activation=muscle_group.activation.copy(),
+                    muscles=[
+                        muscle.activation.copy()
+                        for muscle in muscle_group.muscles
+                    ],
+                ) for muscle_group in self.muscle_groups
+            ],
+            cursors=[
+                {
+                    name: copy.deepcopy(getattr(operator, name))
+                    for name in self.cursor_attributes
+                    if hasattr(operator, name)
+                } for operator in self.get_operators()
+            ],
+            records=record_lengths(self.get_callback_params()),
+        )
+
+    def restore(self, checkpoint):
+        """ Resume the simulation from a checkpoint and return its time.
+            The arrays are copied in place, so the simulator is neither
+            rebuilt nor finalized again. Records taken after the checkpoint
+            are dropped. To resume in a new process, call reset() first and
+            stream the records into a ChunkedStorage opened with mode="a". """
+        for system, state in zip(self.simulator, checkpoint["systems"]):
+            for name, value in state.items():
+                getattr(system, name)[...] = value
+        for muscle_group, state in zip(
+            self.muscle_groups, checkpoint["muscle_groups"]
+        ):
+            muscle_group.activation[...] = state["activation"]
+            for muscle, activation in zip(muscle_group.muscles, state["muscles"]):
+                muscle.activation[...] = activation
+        for operator, cursors in zip(
+            self.get_operators(), checkpoint["cursors"]
+        ):
+            for name, value in cursors.items():
+                setattr(operator, name, copy.deepcopy(value))
+        if self.writer is not None:
+            self.writer.flush()
+        truncate_records(self.get_callback_params(), checkpoint["records"])
+        self.current_step = checkpoint["current_step"]
+        return checkpoint["time"]
+
+    def save_checkpoint(self, filename, time):
+        import os, pickle
+
+        file_name = filename+"_checkpoint.pickle"
+        with open(file_name+".tmp", "wb") as checkpoint_file:
+            pickle.dump(self.checkpoint(time), checkpoint_file)
+        os.replace(file_name+".tmp", file_name)
+
+    def load_checkpoint(self, filename):
+        import pickle
 
-        print("Saving data to pickle files ... Done!")
+        with open(filename+"_checkpoint.pickle", "rb") as checkpoint_file:
+            return self.restore(pickle.load(checkpoint_file))
+
+    def save_data(self, filename="simulation", save_systems=True, **kwargs):
+        
+        import pickle
+
+        if self.writer is not None:
+            # write the queued records and stop the writer thread
+            self.writer.close()
+
+        if self.storage is not None:
+            print("Saving data to", self.storage.folder_name, "...", end='\r')
+            for key, value in kwargs.items():
+                self.storage.write(key, value)
+            self.storage.close()
+            print("Saving data to", self.storage.folder_name, "... Done!")
+        else:
+            print("Saving data to pickle files ...", end='\r')
+            with open(filename+"_data.pickle", "wb") as data_file:
+                data = dict(
+                    recording_fps=self.recording_fps,
+                    systems=to_arrays(self.get_data()),
+                    muscle_groups=to_arrays(self.muscle_callback_params_list),
+                    **{key: to_arrays(value) for key, value in kwargs.items()}
+                )
+                pickle.dump(data, data_file)
+            print("Saving data to pickle files ... Done!")
+
+        if save_systems:
+            with open(filename+"_systems.pickle", "wb") as system_file:
+                data = dict(
+                    systems=self.get_systems(),
+                    muscle_groups=self.muscle_groups,
+                )
+                pickle.dump(data, system_file)